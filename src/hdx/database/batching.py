@@ -0,0 +1,251 @@
+"""Bulk loading utilities: batch sizing, retries and checkpoints"""
+
+import json
+import logging
+import sqlite3
+from os import remove, replace
+from os.path import exists
+from typing import Any, Dict, Optional
+
+from sqlalchemy.exc import DBAPIError
+
+logger = logging.getLogger(__name__)
+
+# PostgreSQL wire protocol limits a statement to 65535 bind parameters. SQLite
+# limits bound variables to 32766 from version 3.32.0 and 999 before that.
+if sqlite3.sqlite_version_info >= (3, 32, 0):
+    SQLITE_MAX_VARIABLES = 32766
+else:
+    SQLITE_MAX_VARIABLES = 999
+DIALECT_MAX_PARAMETERS = {
+    "postgresql": 65535,
+    "sqlite": SQLITE_MAX_VARIABLES,
+}
+
+# SQLSTATEs of errors that may succeed if retried: serialization failure,
+# deadlock, lock not available, connection failures and admin shutdown
+TRANSIENT_SQLSTATES = {
+    "40001",
+    "40P01",
+    "55P03",
+    "08000",
+    "08001",
+    "08003",
+    "08004",
+    "08006",
+    "57P01",
+    "57P02",
+    "57P03",
+}
+TRANSIENT_MESSAGES = (
+    "database is locked",
+    "server closed the connection",
+    "connection already closed",
+    "connection reset",
+    "terminating connection",
+    "ssl syscall error",
+    "could not receive data from server",
+)
+
+
+def get_max_parameters(dialect: str) -> Optional[int]:
+    """Gets the maximum number of bind parameters allowed in one statement for
+    the given dialect.
+
+    Args:
+        dialect (str): Database dialect eg. "postgresql"
+
+    Returns:
+        Optional[int]: Maximum number of parameters or None if unknown
+    """
+    return DIALECT_MAX_PARAMETERS.get(dialect)
+
+
+def get_max_batch_size(dialect: str, num_columns: int) -> Optional[int]:
+    """Gets the maximum number of rows of the given width that fit into one
+    statement for the given dialect.
+
+    Args:
+        dialect (str): Database dialect eg. "postgresql"
+        num_columns (int): Number of columns in each row
+
+    Returns:
+        Optional[int]: Maximum batch size or None if unbounded
+    """
+    max_parameters = get_max_parameters(dialect)
+    if max_parameters is None:
+        return None
+    return max(1, max_parameters // max(1, num_columns))
+
+
+class AdaptiveBatchSizer:
+    """Chooses batch sizes for bulk inserts, tuning them from the measured
+    latency of each batch so that batches take roughly target_seconds. Batch
+    sizes are bounded by min_batch_size, max_batch_size and the bind parameter
+    limit of the dialect given the row width.
+
+    Args:
+        dialect (str): Database dialect eg. "postgresql"
+        num_columns (int): Number of columns in each row
+        initial_batch_size (int): Starting batch size. Defaults to 1000.
+        min_batch_size (int): Minimum batch size. Defaults to 10.
+        max_batch_size (Optional[int]): Maximum batch size. Defaults to None (dialect limit).
+        target_seconds (float): Target time per batch in seconds. Defaults to 0.5.
+        adaptive (bool): Whether to tune batch size. Defaults to True.
+    """
+
+    # Maximum factor by which the batch size can change between batches
+    max_growth = 2.0
+
+    def __init__(
+        self,
+        dialect: str,
+        num_columns: int,
+        initial_batch_size: int = 1000,
+        min_batch_size: int = 10,
+        max_batch_size: Optional[int] = None,
+        target_seconds: float = 0.5,
+        adaptive: bool = True,
+    ) -> None:
+        self.adaptive = adaptive
+        self.target_seconds = target_seconds
+        self.min_batch_size = max(1, min(min_batch_size, initial_batch_size))
+        limit = get_max_batch_size(dialect, num_columns)
+        if adaptive and limit is not None:
+            if max_batch_size is None or max_batch_size > limit:
+                max_batch_size = limit
+        self.max_batch_size = max_batch_size
+        if max_batch_size is not None:
+            self.min_batch_size = min(self.min_batch_size, max_batch_size)
+        self.batch_size = self._clamp(initial_batch_size)
+        self.metrics: Dict[str, Any] = {
+            "dialect": dialect,
+            "num_columns": num_columns,
+            "adaptive": adaptive,
+            "max_batch_size": self.max_batch_size,
+            "batch_sizes": [],
+            "batch_seconds": [],
+            "rows": 0,
+            "seconds": 0.0,
+        }
+
+    def _clamp(self, batch_size: float) -> int:
+        batch_size = max(self.min_batch_size, int(batch_size))
+        if self.max_batch_size is not None:
+            batch_size = min(batch_size, self.max_batch_size)
+        return batch_size
+
+    def next_batch_size(self) -> int:
+        """Gets the size to use for the next batch.
+
+        Returns:
+            int: Batch size
+        """
+        return self.batch_size
+
+    def record(self, rows: int, seconds: float) -> None:
+        """Records how long a batch took and, if adaptive, retunes the batch
+        size towards the target time per batch.
+
+        Args:
+            rows (int): Number of rows in batch
+            seconds (float): Time taken to execute batch
+
+        Returns:
+            None
+        """
+        self.metrics["batch_sizes"].append(rows)
+        self.metrics["batch_seconds"].append(seconds)
+        self.metrics["rows"] += rows
+        self.metrics["seconds"] += seconds
+        if not self.adaptive or rows < self.batch_size:
+            return
+        if seconds <= 0:
+            factor = self.max_growth
+        else:
+            factor = self.target_seconds / seconds
+            factor = min(self.max_growth, max(1 / self.max_growth, factor))
+        batch_size = self._clamp(self.batch_size * factor)
+        if batch_size != self.batch_size:
+            logger.debug(f"Batch size changed from {self.batch_size} to {batch_size}")
+        self.batch_size = batch_size
+
+
+def is_transient_error(ex: BaseException) -> bool:
+    """Checks if an error raised by SQLAlchemy is transient ie. the operation
+    may succeed if retried. Examples are dropped connections (eg. a failed SSH
+    tunnel), serialization failures, deadlocks and locked SQLite databases.
+
+    Args:
+        ex (BaseException): Exception to check
+
+    Returns:
+        bool: True if error is transient, False if not
+    """
+    if not isinstance(ex, DBAPIError):
+        return False
+    if ex.connection_invalidated:
+        return True
+    orig = ex.orig
+    sqlstate = getattr(orig, "sqlstate", None) or getattr(orig, "pgcode", None)
+    if sqlstate in TRANSIENT_SQLSTATES:
+        return True
+    message = str(orig).lower()
+    return any(text in message for text in TRANSIENT_MESSAGES)
+
+
+class Checkpoint:
+    """Persists the offset of the last committed batch of a bulk load to a
+    JSON file so that a failed load can be restarted from that point.
+
+    Args:
+        path (str): Path to checkpoint file
+        table_name (str): Name of table being loaded
+    """
+
+    def __init__(self, path: str, table_name: str) -> None:
+        self.path = path
+        self.table_name = table_name
+
+    def load(self) -> int:
+        """Loads offset from checkpoint file. Returns 0 if there is no
+        checkpoint file or it is for a different table.
+
+        Returns:
+            int: Offset of first row not yet committed
+        """
+        if not exists(self.path):
+            return 0
+        with open(self.path, encoding="utf-8") as f:
+            checkpoint = json.load(f)
+        if checkpoint.get("table") != self.table_name:
+            logger.warning(
+                f"Ignoring checkpoint {self.path} for table {checkpoint.get('table')}"
+            )
+            return 0
+        offset = checkpoint["offset"]
+        logger.info(f"Resuming load of {self.table_name} from row {offset}")
+        return offset
+
+    def save(self, offset: int) -> None:
+        """Saves offset to checkpoint file. The file is replaced atomically.
+
+        Args:
+            offset (int): Offset of first row not yet committed
+
+        Returns:
+            None
+        """
+        temp_path = f"{self.path}.tmp"
+        with open(temp_path, "w", encoding="utf-8") as f:
+            json.dump({"table": self.table_name, "offset": offset}, f)
+        replace(temp_path, self.path)
+
+    def clear(self) -> None:
+        """Removes checkpoint file.
+
+        Returns:
+            None
+        """
+        if exists(self.path):
+            remove(self.path)
@@ -0,0 +1,200 @@
+"""Bulk delete and update of rows identified by sets of keys"""
+
+import logging
+from itertools import islice
+from typing import Any, Dict, Iterable, List, Optional, Sequence
+
+from sqlalchemy import (
+    ARRAY,
+    Column,
+    Connection,
+    MetaData,
+    Table,
+    and_,
+    any_,
+    bindparam,
+    delete,
+    tuple_,
+    update,
+)
+
+from .batching import get_max_parameters
+from .columnar import insert_columns
+
+logger = logging.getLogger(__name__)
+
+# Keys per statement when not limited by bind parameters
+DEFAULT_CHUNK_SIZE = 100000
+STAGING_TABLE = "hdx_staged_keys"
+
+
+def get_key_columns(table: Table, key_columns: Optional[Sequence[str]]) -> List[str]:
+    """Get names of key columns: those given or the primary key of table.
+
+    Args:
+        table (Table): SQLAlchemy table
+        key_columns (Optional[Sequence[str]]): Names of key columns
+
+    Returns:
+        List[str]: Names of key columns
+    """
+    if key_columns:
+        return list(key_columns)
+    key_columns = [column.name for column in table.primary_key]
+    if not key_columns:
+        raise ValueError(f"Table {table.name} has no primary key!")
+    return key_columns
+
+
+def get_chunk_size(
+    dialect: str,
+    num_key_columns: int,
+    num_values: int = 0,
+    chunk_size: Optional[int] = None,
+) -> int:
+    """Get the number of keys per statement. In PostgreSQL, keys are passed
+    as one array parameter or staged in a temporary table so chunk_size (or
+    DEFAULT_CHUNK_SIZE) is used. Otherwise, keys are bind parameters of an IN
+    clause so the chunk size is limited by the bind parameter limit of the
+    dialect.
+
+    Args:
+        dialect (str): Database dialect eg. "postgresql"
+        num_key_columns (int): Number of key columns
+        num_values (int): Number of other bind parameters. Defaults to 0.
+        chunk_size (Optional[int]): Requested chunk size. Defaults to None.
+
+    Returns:
+        int: Chunk size
+    """
+    if chunk_size is None:
+        chunk_size = DEFAULT_CHUNK_SIZE
+    if dialect == "postgresql":
+        return chunk_size
+    max_parameters = get_max_parameters(dialect)
+    if max_parameters is None:
+        return min(chunk_size, 1000)
+    return max(1, min(chunk_size, (max_parameters - num_values) // num_key_columns))
+
+
+def _chunks(keys: Iterable[Any], chunk_size: int) -> Iterable[List[Any]]:
+    iterator = iter(keys)
+    while chunk := list(islice(iterator, chunk_size)):
+        yield chunk
+
+
+def _stage_keys(
+    connection: Connection, table: Table, key_columns: List[str], chunk: List[Any]
+) -> Table:
+    staging = Table(
+        STAGING_TABLE,
+        MetaData(),
+        *(Column(name, table.c[name].type) for name in key_columns),
+        prefixes=["TEMPORARY"],
+        postgresql_on_commit="DROP",
+    )
+    staging.create(connection)
+    columns = {name: [key[i] for key in chunk] for i, name in enumerate(key_columns)}
+    insert_columns(connection, staging, columns, 0, len(chunk))
+    return staging
+
+
+def _apply_by_keys(
+    connection: Connection,
+    table: Table,
+    keys: Iterable[Any],
+    key_columns: Optional[Sequence[str]],
+    chunk_size: Optional[int],
+    values: Optional[Dict[str, Any]],
+) -> int:
+    key_columns = get_key_columns(table, key_columns)
+    dialect = connection.dialect.name
+    num_values = len(values) if values else 0
+    chunk_size = get_chunk_size(dialect, len(key_columns), num_values, chunk_size)
+    if values is None:
+        statement = delete(table)
+        action = "Deleted"
+    else:
+        statement = update(table).values(values)
+        action = "Updated"
+    count = 0
+    for chunk in _chunks(keys, chunk_size):
+        staging = None
+        if len(key_columns) == 1:
+            column = table.c[key_columns[0]]
+            chunk = [key[0] if isinstance(key, tuple) else key for key in chunk]
+            if dialect == "postgresql":
+                keys_param = bindparam("keys", chunk, type_=ARRAY(column.type))
+                condition = column == any_(keys_param)
+            else:
+                condition = column.in_(chunk)
+        elif dialect == "postgresql":
+            staging = _stage_keys(connection, table, key_columns, chunk)
+            condition = and_(
+                *(table.c[name] == staging.c[name] for name in key_columns)
+            )
+        else:
+            columns = tuple_(*(table.c[name] for name in key_columns))
+            condition = columns.in_([tuple(key) for key in chunk])
+        result = connection.execute(statement.where(condition))
+        count += result.rowcount
+        if staging is not None:
+            staging.drop(connection)
+    logger.info(f"{action} {count} rows of {table.name}")
+    return count
+
+
+def delete_by_keys(
+    connection: Connection,
+    table: Table,
+    keys: Iterable[Any],
+    key_columns: Optional[Sequence[str]] = None,
+    chunk_size: Optional[int] = None,
+) -> int:
+    """Delete rows whose keys are in keys with one set based statement per
+    chunk of keys. Keys are values for a single key column or tuples for
+    several. In PostgreSQL, a single key column is matched against an array
+    parameter with = ANY and several key columns are matched by joining to a
+    temporary table into which the keys are copied (with COPY if using
+    psycopg). Otherwise, keys are matched with IN in chunks that respect the
+    bind parameter limit of the dialect.
+
+    Args:
+        connection (Connection): SQLAlchemy connection
+        table (Table): SQLAlchemy table
+        keys (Iterable[Any]): Key values or tuples of key values
+        key_columns (Optional[Sequence[str]]): Key columns. Defaults to None (primary key).
+        chunk_size (Optional[int]): Keys per statement. Defaults to None (dialect dependent).
+
+    Returns:
+        int: Number of rows deleted
+    """
+    return _apply_by_keys(connection, table, keys, key_columns, chunk_size, None)
+
+
+def update_by_keys(
+    connection: Connection,
+    table: Table,
+    keys: Iterable[Any],
+    values: Dict[str, Any],
+    key_columns: Optional[Sequence[str]] = None,
+    chunk_size: Optional[int] = None,
+) -> int:
+    """Set columns to the given values for rows whose keys are in keys with
+    one set based statement per chunk of keys. Keys are matched as for
+    delete_by_keys.
+
+    Args:
+        connection (Connection): SQLAlchemy connection
+        table (Table): SQLAlchemy table
+        keys (Iterable[Any]): Key values or tuples of key values
+        values (Dict[str, Any]): Column name to new value
+        key_columns (Optional[Sequence[str]]): Key columns. Defaults to None (primary key).
+        chunk_size (Optional[int]): Keys per statement. Defaults to None (dialect dependent).
+
+    Returns:
+        int: Number of rows updated
+    """
+    if not values:
+        raise ValueError("No values to update!")
+    return _apply_by_keys(connection, table, keys, key_columns, chunk_size, values)
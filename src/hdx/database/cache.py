@@ -0,0 +1,437 @@
+"""Result cache for repeated read queries"""
+
+import hashlib
+import logging
+import re
+import shelve
+import threading
+import time
+from collections import OrderedDict
+from typing import Any, Dict, FrozenSet, Iterable, List, Optional, Set
+
+from sqlalchemy import Dialect, Engine, Executable, Table, TableClause, event
+from sqlalchemy.sql import visitors
+
+logger = logging.getLogger(__name__)
+
+_WRITE_PATTERN = re.compile(
+    r"^\s*(?:INSERT\s+INTO|UPDATE|DELETE\s+FROM|TRUNCATE(?:\s+TABLE)?|COPY|REPLACE\s+INTO)\s+(?:ONLY\s+)?([\w.\"]+)",
+    re.IGNORECASE,
+)
+_DDL_PATTERN = re.compile(r"^\s*(?:CREATE|DROP|ALTER)\s", re.IGNORECASE)
+
+# Table name standing for all tables, written to by DDL and read by
+# statements whose tables are unknown
+ALL_TABLES = "*"
+
+
+def get_statement_tables(statement: Executable) -> FrozenSet[str]:
+    """Get names of tables and views referenced by a statement. Views made
+    with hdx.database.views.view also contribute the tables they select from.
+    If the tables cannot be determined, for example for text statements or
+    lightweight tables that may be views, ALL_TABLES is returned so that the
+    statement depends on every table.
+
+    Args:
+        statement (Executable): SQLAlchemy statement
+
+    Returns:
+        FrozenSet[str]: Table names
+    """
+    tables = set()
+    for element in visitors.iterate(statement):
+        if not isinstance(element, TableClause):
+            continue
+        info = getattr(element, "info", {})
+        if "view" in info:
+            # Reflected views are marked with None as their select is unknown
+            if info["view"] is None:
+                return frozenset((ALL_TABLES,))
+            tables.update(get_statement_tables(info["view"]))
+        elif not isinstance(element, Table):
+            return frozenset((ALL_TABLES,))
+        tables.add(element.name)
+    if not tables:
+        return frozenset((ALL_TABLES,))
+    return frozenset(tables)
+
+
+def _get_table_name(table: str) -> str:
+    return table.split(".")[-1].strip('"')
+
+
+def get_written_tables(sql: str) -> FrozenSet[str]:
+    """Get names of tables written to by an SQL statement: the table of an
+    INSERT, UPDATE, DELETE, TRUNCATE or COPY or ALL_TABLES for DDL (CREATE,
+    DROP or ALTER). Schemas and quotes are removed.
+
+    Args:
+        sql (str): SQL statement
+
+    Returns:
+        FrozenSet[str]: Table names (empty if the statement does not write)
+    """
+    match = _WRITE_PATTERN.match(sql)
+    if match:
+        return frozenset((_get_table_name(match.group(1)),))
+    if _DDL_PATTERN.match(sql):
+        return frozenset((ALL_TABLES,))
+    return frozenset()
+
+
+class QueryCache:
+    """Cache of the results of read queries keyed by compiled statement and
+    parameters. Entries are evicted in least recently used order once there
+    are more than max_entries and expire after ttl seconds if ttl is given. If
+    path is given, entries are also stored on disk using shelve so that they
+    survive restarts. Entries are invalidated per table using an index from
+    table to keys which for an on disk store is rebuilt when it is opened.
+    The cache can be shared between threads.
+
+    Writers call begin_write when they first write to a table in a
+    transaction and end_write once it has committed or rolled back. Readers
+    get a version with get_version before querying and pass it to set, so
+    that rows read while a write is pending or which may predate a write
+    that ended meanwhile are not cached.
+
+    Args:
+        max_entries (int): Maximum number of entries in memory. Defaults to 1024.
+        ttl (Optional[float]): Time to live of entries in seconds. Defaults to None.
+        path (Optional[str]): Path of on disk store. Defaults to None.
+    """
+
+    def __init__(
+        self,
+        max_entries: int = 1024,
+        ttl: Optional[float] = None,
+        path: Optional[str] = None,
+    ) -> None:
+        self.max_entries = max_entries
+        self.ttl = ttl
+        self._lock = threading.RLock()
+        self._entries = OrderedDict()
+        self._index: Dict[str, Set[str]] = {}
+        self._writing: Dict[str, int] = {}
+        self._version = 0
+        if path:
+            self._store = shelve.open(path)
+            for key, entry in self._store.items():
+                self._add_to_index(key, entry[1])
+        else:
+            self._store = None
+        self.hits = 0
+        self.misses = 0
+
+    @staticmethod
+    def get_key(statement: Executable, dialect: Dialect) -> str:
+        """Get cache key for statement from its compiled form and parameters.
+
+        Args:
+            statement (Executable): SQLAlchemy statement
+            dialect (Dialect): SQLAlchemy dialect
+
+        Returns:
+            str: Cache key
+        """
+        compiled = statement.compile(dialect=dialect)
+        params = sorted(compiled.params.items())
+        key = f"{compiled}\n{params!r}"
+        return hashlib.sha256(key.encode("utf-8")).hexdigest()
+
+    def _add_to_index(self, key: str, tables: FrozenSet[str]) -> None:
+        for table in tables:
+            self._index.setdefault(table, set()).add(key)
+
+    def _remove_from_index(self, key: str, tables: FrozenSet[str]) -> None:
+        for table in tables:
+            keys = self._index.get(table)
+            if keys is not None:
+                keys.discard(key)
+                if not keys:
+                    del self._index[table]
+
+    def get(self, key: str) -> Optional[List]:
+        """Get cached rows for key, counting a hit or miss.
+
+        Args:
+            key (str): Cache key
+
+        Returns:
+            Optional[List]: Rows or None if not cached
+        """
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None and self._store is not None:
+                entry = self._store.get(key)
+                if entry is not None:
+                    self._entries[key] = entry
+            if entry is not None:
+                expires, _, rows = entry
+                if expires is None or expires > time.time():
+                    self._entries.move_to_end(key)
+                    self.hits += 1
+                    return rows
+                self._remove(key)
+            self.misses += 1
+            return None
+
+    def get_version(self, tables: Iterable[str]) -> Optional[int]:
+        """Get version to pass to set for rows about to be read from the
+        given tables or None if they should not be cached because a write to
+        any of the tables is pending.
+
+        Args:
+            tables (Iterable[str]): Names of tables from which rows are read
+
+        Returns:
+            Optional[int]: Version or None
+        """
+        tables = frozenset(tables)
+        with self._lock:
+            if self._writing.get(ALL_TABLES):
+                return None
+            if ALL_TABLES in tables and self._writing:
+                return None
+            for table in tables:
+                if self._writing.get(table):
+                    return None
+            return self._version
+
+    def set(
+        self,
+        key: str,
+        tables: Iterable[str],
+        rows: List,
+        version: Optional[int] = None,
+    ) -> None:
+        """Cache rows for key noting the tables on which they depend. If
+        version from get_version is given, rows are only cached if no write
+        has ended or is pending since.
+
+        Args:
+            key (str): Cache key
+            tables (Iterable[str]): Names of tables on which rows depend
+            rows (List): Rows
+            version (Optional[int]): Version from get_version. Defaults to None.
+
+        Returns:
+            None
+        """
+        tables = frozenset(tables)
+        with self._lock:
+            if version is not None and version != self.get_version(tables):
+                return
+            if self.ttl is None:
+                expires = None
+            else:
+                expires = time.time() + self.ttl
+            entry = (expires, tables, rows)
+            self._remove(key)
+            self._entries[key] = entry
+            if self._store is not None:
+                self._store[key] = entry
+            self._add_to_index(key, tables)
+            while len(self._entries) > self.max_entries:
+                key, entry = self._entries.popitem(last=False)
+                if self._store is None:
+                    self._remove_from_index(key, entry[1])
+
+    def _remove(self, key: str) -> None:
+        entry = self._entries.pop(key, None)
+        if self._store is not None and key in self._store:
+            entry = self._store.pop(key)
+        if entry is not None:
+            self._remove_from_index(key, entry[1])
+
+    def invalidate(self, tables: Optional[Iterable[str]] = None) -> None:
+        """Invalidate entries that depend on any of the given tables or all
+        entries if tables is None or contains ALL_TABLES. Entries depending on
+        ALL_TABLES are invalidated by any table.
+
+        Args:
+            tables (Optional[Iterable[str]]): Table names. Defaults to None (all).
+
+        Returns:
+            None
+        """
+        if tables is not None:
+            tables = {_get_table_name(table) for table in tables}
+        with self._lock:
+            if tables is None or ALL_TABLES in tables:
+                self._entries.clear()
+                self._index.clear()
+                if self._store is not None:
+                    self._store.clear()
+                return
+            keys = set()
+            if tables:
+                keys.update(self._index.get(ALL_TABLES, ()))
+            for table in tables:
+                keys.update(self._index.get(table, ()))
+            for key in keys:
+                self._remove(key)
+        if keys:
+            logger.debug(f"Invalidated {len(keys)} cache entries for {tables}")
+
+    def invalidate_sql(self, sql: str) -> None:
+        """Invalidate entries affected by an SQL statement: those depending on
+        the table written to by an INSERT, UPDATE, DELETE, TRUNCATE or COPY or
+        all entries for DDL (CREATE, DROP or ALTER).
+
+        Args:
+            sql (str): SQL statement
+
+        Returns:
+            None
+        """
+        tables = get_written_tables(sql)
+        if tables:
+            self.invalidate(tables)
+
+    def begin_write(self, tables: Iterable[str]) -> None:
+        """Note that a transaction has started writing to the given tables,
+        invalidating their entries. Until end_write is called, rows read from
+        them are not cached.
+
+        Args:
+            tables (Iterable[str]): Table names or ALL_TABLES
+
+        Returns:
+            None
+        """
+        tables = frozenset(tables)
+        with self._lock:
+            for table in tables:
+                self._writing[table] = self._writing.get(table, 0) + 1
+            self.invalidate(tables)
+
+    def end_write(self, tables: Iterable[str]) -> None:
+        """Note that a transaction writing to the given tables has committed
+        or rolled back, invalidating their entries again.
+
+        Args:
+            tables (Iterable[str]): Table names or ALL_TABLES
+
+        Returns:
+            None
+        """
+        tables = frozenset(tables)
+        with self._lock:
+            for table in tables:
+                count = self._writing.get(table, 0) - 1
+                if count > 0:
+                    self._writing[table] = count
+                else:
+                    self._writing.pop(table, None)
+            self._version += 1
+            self.invalidate(tables)
+
+    def get_stats(self) -> Dict[str, Any]:
+        """Get cache statistics: hits, misses, hit rate and number of entries.
+
+        Returns:
+            Dict[str, Any]: Cache statistics
+        """
+        with self._lock:
+            lookups = self.hits + self.misses
+            return {
+                "hits": self.hits,
+                "misses": self.misses,
+                "hit_rate": self.hits / lookups if lookups else 0.0,
+                "entries": len(self._entries),
+            }
+
+    def close(self) -> None:
+        """Close on disk store if there is one.
+
+        Returns:
+            None
+        """
+        with self._lock:
+            if self._store is not None:
+                self._store.close()
+                self._store = None
+
+
+class CacheInvalidator:
+    """Keep a query cache consistent with writes made through an engine.
+    Tables written to are collected per connection and their entries are
+    invalidated when the first write happens and again once the transaction
+    has committed or rolled back. Until then, rows read from those tables are
+    not cached by any connection.
+
+    Args:
+        engine (Engine): SQLAlchemy engine
+        query_cache (QueryCache): Query cache
+    """
+
+    _writes = "hdx_cache_writes"
+    _committed = "hdx_cache_committed"
+
+    def __init__(self, engine: Engine, query_cache: QueryCache) -> None:
+        self._engine = engine
+        self._query_cache = query_cache
+        self._listeners = (
+            ("after_cursor_execute", self._after_cursor_execute),
+            ("commit", self._commit),
+            ("rollback", self._rollback),
+            ("begin", self._begin),
+            ("checkin", self._checkin),
+        )
+        for name, listener in self._listeners:
+            event.listen(engine, name, listener)
+
+    def _after_cursor_execute(
+        self,
+        connection: Any,
+        cursor: Any,
+        statement: str,
+        parameters: Any,
+        context: Any,
+        executemany: bool,
+    ) -> None:
+        tables = get_written_tables(statement)
+        if not tables:
+            return
+        writes = connection.info.setdefault(self._writes, set())
+        tables = tables - writes
+        if tables:
+            writes.update(tables)
+            self._query_cache.begin_write(tables)
+
+    def _commit(self, connection: Any) -> None:
+        # The commit event comes before the database commits, so the write
+        # only ends once the connection begins again or is returned to the
+        # pool
+        writes = connection.info.pop(self._writes, None)
+        if writes:
+            connection.info.setdefault(self._committed, set()).update(writes)
+            self._query_cache.invalidate(writes)
+
+    def _rollback(self, connection: Any) -> None:
+        writes = connection.info.pop(self._writes, None)
+        if writes:
+            self._query_cache.end_write(writes)
+
+    def _begin(self, connection: Any) -> None:
+        writes = connection.info.pop(self._committed, None)
+        if writes:
+            self._query_cache.end_write(writes)
+
+    def _checkin(self, dbapi_connection: Any, connection_record: Any) -> None:
+        # Uncommitted writes are rolled back when a connection is returned
+        if connection_record is None:
+            return
+        for name in (self._committed, self._writes):
+            writes = connection_record.info.pop(name, None)
+            if writes:
+                self._query_cache.end_write(writes)
+
+    def remove(self) -> None:
+        """Remove event listeners from engine.
+
+        Returns:
+            None
+        """
+        for name, listener in self._listeners:
+            event.remove(self._engine, name, listener)
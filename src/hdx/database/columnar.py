@@ -0,0 +1,160 @@
+"""Utilities for loading column oriented data (mappings of column name to
+sequence or NumPy array and Arrow record batches or tables) without building
+a dictionary per row"""
+
+from collections.abc import Mapping
+from typing import Any, Dict, List, Sequence
+
+from sqlalchemy import Connection, Dialect, Table, bindparam, insert
+
+
+def is_columnar(rows: Any) -> bool:
+    """Checks if rows are column oriented ie. a mapping of column name to
+    sequence or an Arrow RecordBatch or Table.
+
+    Args:
+        rows (Any): Rows to check
+
+    Returns:
+        bool: True if rows are column oriented, False if not
+    """
+    if isinstance(rows, Mapping):
+        return True
+    return hasattr(rows, "column_names") and hasattr(rows, "num_rows")
+
+
+def get_columns(rows: Any) -> Dict[str, Sequence]:
+    """Gets dictionary of column name to column from column oriented rows.
+
+    Args:
+        rows (Any): Mapping of column name to sequence or Arrow RecordBatch or Table
+
+    Returns:
+        Dict[str, Sequence]: Dictionary of column name to column
+    """
+    if isinstance(rows, Mapping):
+        return dict(rows)
+    return {name: rows.column(i) for i, name in enumerate(rows.column_names)}
+
+
+def get_num_rows(columns: Dict[str, Sequence]) -> int:
+    """Gets number of rows in columns, checking that all columns have the
+    same length.
+
+    Args:
+        columns (Dict[str, Sequence]): Dictionary of column name to column
+
+    Returns:
+        int: Number of rows
+    """
+    lengths = {len(column) for column in columns.values()}
+    if len(lengths) > 1:
+        raise ValueError(f"Columns have different lengths: {sorted(lengths)}")
+    if not lengths:
+        return 0
+    return lengths.pop()
+
+
+def slice_column(column: Sequence, start: int, stop: int) -> List:
+    """Gets a slice of a column as a list of Python objects. NumPy arrays and
+    Arrow arrays are converted so that their values can be passed to database
+    drivers.
+
+    Args:
+        column (Sequence): Column (sequence, NumPy array or Arrow array)
+        start (int): Start row
+        stop (int): Stop row (exclusive)
+
+    Returns:
+        List: Values in slice
+    """
+    if hasattr(column, "to_pylist"):
+        return column.slice(start, stop - start).to_pylist()
+    values = column[start:stop]
+    if hasattr(values, "tolist"):
+        return values.tolist()
+    return list(values)
+
+
+def _process_columns(
+    table: Table, dialect: Dialect, names: List[str], values: List[List]
+) -> List[List]:
+    processed = []
+    for name, column in zip(names, values):
+        processor = table.c[name].type.bind_processor(dialect)
+        if processor:
+            column = [processor(value) for value in column]
+        processed.append(column)
+    return processed
+
+
+def has_missing_defaults(table: Table, names: List[str]) -> bool:
+    """Checks if any column of table that is not in names has a Python side
+    default (or sequence) which SQLAlchemy must supply on insert.
+
+    Args:
+        table (Table): Table into which to insert
+        names (List[str]): Names of columns being inserted
+
+    Returns:
+        bool: True if a missing column has a Python side default
+    """
+    return any(
+        column.default is not None
+        for column in table.columns
+        if column.key not in names
+    )
+
+
+def insert_columns(
+    connection: Connection,
+    table: Table,
+    columns: Dict[str, Sequence],
+    start: int,
+    stop: int,
+) -> None:
+    """Inserts a range of rows from columns into table. Bind processing (eg.
+    ConversionNoTZ) is applied column by column. With PostgreSQL and psycopg,
+    rows are streamed with COPY unless a column that is not supplied has a
+    Python side default, which COPY would not apply. Otherwise, rows are
+    passed as tuples to the driver's executemany if the dialect uses
+    positional parameters with dictionaries used only as a fallback.
+
+    Args:
+        connection (Connection): SQLAlchemy connection
+        table (Table): Table into which to insert
+        columns (Dict[str, Sequence]): Dictionary of column name to column
+        start (int): Start row
+        stop (int): Stop row (exclusive)
+
+    Returns:
+        None
+    """
+    dialect = connection.dialect
+    names = list(columns)
+    values = [slice_column(columns[name], start, stop) for name in names]
+    if (
+        dialect.name == "postgresql"
+        and dialect.driver == "psycopg"
+        and not has_missing_defaults(table, names)
+    ):
+        preparer = dialect.identifier_preparer
+        column_names = ", ".join(preparer.quote(name) for name in names)
+        copy_sql = f"COPY {preparer.format_table(table)} ({column_names}) FROM STDIN"
+        with connection.connection.driver_connection.cursor() as cursor:
+            with cursor.copy(copy_sql) as copy:
+                for row in zip(*_process_columns(table, dialect, names, values)):
+                    copy.write_row(row)
+        return
+    statement = insert(table).values({name: bindparam(name) for name in names})
+    compiled = statement.compile(dialect=dialect)
+    if compiled.positional and set(compiled.positiontup) == set(names):
+        values = _process_columns(table, dialect, names, values)
+        indices = [names.index(name) for name in compiled.positiontup]
+        rows = list(zip(*(values[index] for index in indices)))
+        connection.exec_driver_sql(compiled.string, rows)
+    else:
+        # Fall back to dictionaries eg. for drivers with named parameters or
+        # tables with Python side defaults
+        rows = [dict(zip(names, row)) for row in zip(*values)]
+        connection.execute(insert(table), rows)
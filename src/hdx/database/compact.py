@@ -0,0 +1,165 @@
+"""Compact row objects for high volume reads without ORM identity tracking"""
+
+import keyword
+from collections import namedtuple
+from datetime import datetime
+from typing import Any, Callable, Iterator, List, Optional, Sequence
+
+from sqlalchemy import Connection, DateTime, Select
+
+from .no_timezone import ConversionNoTZ
+from .utils import get_python_type
+
+ROW_TYPES = ("slots", "namedtuple")
+
+
+def get_attribute_names(names: Sequence[str]) -> List[str]:
+    """Get valid, unique Python attribute names for column names. Invalid
+    names are replaced by _ followed by their position.
+
+    Args:
+        names (Sequence[str]): Column names
+
+    Returns:
+        List[str]: Attribute names
+    """
+    attribute_names = []
+    for i, name in enumerate(names):
+        if (
+            not name.isidentifier()
+            or keyword.iskeyword(name)
+            or name.startswith("_")
+            or name in attribute_names
+        ):
+            name = f"_{i}"
+        attribute_names.append(name)
+    return attribute_names
+
+
+def make_slots_class(name: str, names: Sequence[str]) -> type:
+    """Make a class with __slots__ for the given attribute names whose
+    constructor takes values in the same order.
+
+    Args:
+        name (str): Class name
+        names (Sequence[str]): Attribute names
+
+    Returns:
+        type: Class with __slots__
+    """
+    slots = tuple(get_attribute_names(names))
+
+    def __init__(self, *values: Any) -> None:
+        for slot, value in zip(slots, values):
+            setattr(self, slot, value)
+
+    def __repr__(self) -> str:
+        fields = ", ".join(f"{slot}={getattr(self, slot)!r}" for slot in slots)
+        return f"{name}({fields})"
+
+    def __eq__(self, other: Any) -> bool:
+        if type(other) is not type(self):
+            return NotImplemented
+        return all(getattr(self, slot) == getattr(other, slot) for slot in slots)
+
+    def _astuple(self) -> tuple:
+        return tuple(getattr(self, slot) for slot in slots)
+
+    return type(
+        name,
+        (),
+        {
+            "__slots__": slots,
+            "__init__": __init__,
+            "__repr__": __repr__,
+            "__eq__": __eq__,
+            "__hash__": None,
+            "_astuple": _astuple,
+        },
+    )
+
+
+def make_row_class(name: str, names: Sequence[str], row_type: str = "slots") -> type:
+    """Make a compact row class: a class with __slots__ or a named tuple.
+
+    Args:
+        name (str): Class name
+        names (Sequence[str]): Column names
+        row_type (str): slots or namedtuple. Defaults to "slots".
+
+    Returns:
+        type: Row class
+    """
+    if row_type == "slots":
+        return make_slots_class(name, names)
+    if row_type == "namedtuple":
+        return namedtuple(name, get_attribute_names(names))
+    raise ValueError(f"Unknown row type {row_type}!")
+
+
+def get_datetime_converters(
+    statement: Select,
+) -> List[Optional[Callable[[Any], Any]]]:
+    """Get converters to apply ConversionNoTZ to timezoneless datetime
+    columns that do not already use it (eg. reflected columns).
+
+    Args:
+        statement (Select): SQLAlchemy select
+
+    Returns:
+        List[Optional[Callable[[Any], Any]]]: Converter for each column or None
+    """
+    conversion = ConversionNoTZ()
+    converters = []
+    for column in statement.selected_columns:
+        column_type = column.type
+        if (
+            get_python_type(column) is datetime
+            and isinstance(column_type, DateTime)
+            and not column_type.timezone
+        ):
+            converters.append(conversion.process_result_value)
+        else:
+            converters.append(None)
+    return converters
+
+
+def read_compact(
+    connection: Connection,
+    statement: Select,
+    row_class: type,
+    convert_datetimes: bool = False,
+    batch_size: int = 10000,
+) -> Iterator[Any]:
+    """Stream the results of a select as instances of a compact row class.
+
+    Args:
+        connection (Connection): SQLAlchemy connection
+        statement (Select): SQLAlchemy select
+        row_class (type): Row class taking column values in order
+        convert_datetimes (bool): Apply ConversionNoTZ to timezoneless datetimes. Defaults to False.
+        batch_size (int): Rows fetched per batch. Defaults to 10000.
+
+    Returns:
+        Iterator[Any]: Rows
+    """
+    if convert_datetimes:
+        converters = get_datetime_converters(statement)
+        if not any(converters):
+            convert_datetimes = False
+    if row_class.__base__ is tuple:
+        make_row = row_class._make
+    else:
+
+        def make_row(values: Sequence) -> Any:
+            return row_class(*values)
+
+    result = connection.execution_options(stream_results=True).execute(statement)
+    for rows in result.partitions(batch_size):
+        for row in rows:
+            if convert_datetimes:
+                row = [
+                    value if converter is None else converter(value, None)
+                    for converter, value in zip(converters, row)
+                ]
+            yield make_row(row)
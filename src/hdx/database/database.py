@@ -1,19 +1,75 @@
 """Database utilities"""
 
 import logging
-from typing import Any, Dict, List, Optional, Tuple, Type, Union
+import time
+from concurrent.futures import ThreadPoolExecutor
+from contextlib import contextmanager
+from typing import (
+    Any,
+    Dict,
+    Iterable,
+    Iterator,
+    List,
+    Mapping,
+    Optional,
+    Sequence,
+    Tuple,
+    Type,
+    Union,
+)
 
-from sqlalchemy import Engine, TableClause, create_engine, insert
+from sqlalchemy import (
+    Engine,
+    Executable,
+    MetaData,
+    Row,
+    Select,
+    Table,
+    TableClause,
+    create_engine,
+    insert,
+    inspect,
+    make_url,
+    select,
+)
 from sqlalchemy.exc import SQLAlchemyError
 from sqlalchemy.ext.automap import automap_base
 from sqlalchemy.orm import DeclarativeBase, Session
-from sqlalchemy.pool import NullPool
+from sqlalchemy.pool import NullPool, QueuePool
 from sqlalchemy.sql.ddl import CreateSchema, DropSchema
 
+from .batching import AdaptiveBatchSizer, Checkpoint, is_transient_error
+from .bulk import delete_by_keys, update_by_keys
+from .cache import CacheInvalidator, QueryCache, get_statement_tables
+from .columnar import (
+    get_columns,
+    get_num_rows,
+    insert_columns,
+    is_columnar,
+    slice_column,
+)
+from .compact import make_row_class, read_compact
 from .dburi import get_connection_uri
+from .export import export_table
+from .loaders import load_file
+from .maintenance import MaintenanceScheduler, analyze_tables
+from .mirror import SQLiteMirror
+from .multitable import can_load_concurrently, get_load_levels, insert_rows
 from .no_timezone import Base as NoTZBase
+from .pagination import Page, paginate
+from .partitioning import create_partitions, drop_partitions, get_partitioning
 from .postgresql import restore_from_pgfile, wait_for_postgresql
-from .views import view
+from .reflection import reflect_schemas
+from .sqlite import (
+    apply_sqlite_pragmas,
+    backup_to_file,
+    create_memory_engine,
+    get_sqlite_pragmas,
+)
+from .timeouts import StatementTimeouts
+from .utils import get_python_type
+from .views import mark_reflected_views, view
+from .warmup import get_pool_size, prewarm_relations, warm_connections
 from .with_timezone import Base as TZBase
 
 logger = logging.getLogger(__name__)
@@ -40,16 +96,52 @@ class Database:
     reflection). If table_base is supplied, db_has_tz is ignored.
 
     The database can be restored from a given pg_restore file supplied in the
-    parameter pg_restore_file.
+    parameter pg_restore_file. If pg_restore_checksum is True, the restore is
+    skipped if the file is unchanged since it was last restored unless
+    pg_restore_force is True.
 
     There is an option to wipe and create an empty schema in the database by
     setting recreate_schema to True and setting a schema_name ("public" is the
     default).
+    Alternatively, to only delete all data leaving tables and views in place,
+    set truncate_schema to True.
 
     If a prepare function is supplied in prepare_fn, it will be executed before
     Base.metadata.create_all and the results of it returned in instance variable
     prepare_results.
 
+    If reflect_schemas is a list of schema names, each schema is reflected
+    concurrently on its own connection and the reflected classes are
+    namespaced by schema eg. reflected_classes.schema.table.
+
+    If query_cache is supplied, the results of execute_cached are cached and
+    invalidated when tables are written to through this Database.
+
+    If maintenance_threshold is supplied, planner statistics are refreshed
+    (with ANALYZE or also VACUUM if maintenance_vacuum is True) for tables
+    once that many rows have been loaded into them by batch_populate or
+    load_file, in a background thread if maintenance_background is True.
+
+    For SQLite, sqlite_profile set to True applies pragmas for speed (WAL
+    journal, synchronous NORMAL, memory mapping, a larger cache and in memory
+    temporary tables) to every connection. A dictionary of pragmas can be
+    given instead to override those. If sqlite_in_memory is True, the
+    database file is copied into memory, worked on there and backed up to the
+    file on cleanup.
+
+    statement_timeout and lock_timeout set default timeouts in seconds for
+    statements and for waiting on locks on every connection. They can be
+    overridden per call with the timeout context manager. The statement
+    running on this Database's session can be cancelled from another thread
+    with cancel.
+
+    By default, connections are not pooled. If pool_size is given (and an
+    engine is not supplied), that many connections are kept in a pool. If
+    warmup is True or a dictionary of arguments to the warmup method, the
+    pool is filled with connections opened in parallel, warmup queries are
+    run and tables and indexes are optionally loaded into PostgreSQL shared
+    buffers before the Database is returned.
+
     Args:
         engine (Optional[Engine]): SQLAlchemy engine to use.
         db_uri (Optional[str]): Connection URI.
@@ -65,9 +157,24 @@ class Database:
         reflect (bool): Whether to reflect existing tables. Defaults to False.
         **kwargs: See below
         pg_restore_file (str): Restore database from pg_restore file
+        pg_restore_jobs (int): Number of parallel pg_restore jobs (not for .xz files)
+        pg_restore_checksum (bool): Skip restore if file unchanged. Defaults to False.
+        pg_restore_force (bool): Restore even if file unchanged. Defaults to False.
         recreate_schema (bool): Whether to recreate schema
+        truncate_schema (bool): Whether to delete all data in schema
         schema_name (str): Database schema name. Defaults to "public".
         prepare_fn (Callable[[], None]]): Function to call before Base.metadata.create_all.
+        reflect_schemas (List[str]): Schemas to reflect concurrently into namespaced classes
+        query_cache (Union[QueryCache, bool]): Query cache for execute_cached or True for default cache
+        maintenance_threshold (int): Rows loaded into a table that trigger ANALYZE
+        maintenance_vacuum (bool): Whether maintenance also vacuums. Defaults to False.
+        maintenance_background (bool): Whether maintenance runs in background thread. Defaults to False.
+        sqlite_profile (Union[bool, Dict]): SQLite performance pragmas or True for defaults
+        sqlite_in_memory (bool): Work on in memory copy of SQLite database. Defaults to False.
+        statement_timeout (float): Default statement timeout in seconds
+        lock_timeout (float): Default lock timeout in seconds
+        pool_size (int): Number of pooled connections
+        warmup (Union[bool, Dict]): Warm up on creation or dictionary of warmup arguments
         ssh_host (str): SSH host (the server to connect to)
         ssh_port (int): SSH port. Defaults to 22.
         ssh_username (str): SSH username
@@ -98,13 +205,43 @@ class Database:
         schema_name = None
         if len(kwargs) == 0:
             pg_restore_file = None
+            pg_restore_jobs = None
+            pg_restore_checksum = False
+            pg_restore_force = False
             recreate_schema = False
+            truncate_schema = False
             prepare_fn = do_nothing_fn
+            query_cache = None
+            maintenance_threshold = None
+            maintenance_vacuum = False
+            maintenance_background = False
+            sqlite_profile = None
+            sqlite_in_memory = False
+            statement_timeout = None
+            lock_timeout = None
+            pool_size = None
+            warmup = None
+            schemas_to_reflect = None
         else:
             pg_restore_file = kwargs.pop("pg_restore_file", None)
+            pg_restore_jobs = kwargs.pop("pg_restore_jobs", None)
+            pg_restore_checksum = kwargs.pop("pg_restore_checksum", False)
+            pg_restore_force = kwargs.pop("pg_restore_force", False)
             recreate_schema = kwargs.pop("recreate_schema", False)
+            truncate_schema = kwargs.pop("truncate_schema", False)
             schema_name = kwargs.pop("schema", "public")
             prepare_fn = kwargs.pop("prepare_fn", do_nothing_fn)
+            query_cache = kwargs.pop("query_cache", None)
+            maintenance_threshold = kwargs.pop("maintenance_threshold", None)
+            maintenance_vacuum = kwargs.pop("maintenance_vacuum", False)
+            maintenance_background = kwargs.pop("maintenance_background", False)
+            sqlite_profile = kwargs.pop("sqlite_profile", None)
+            sqlite_in_memory = kwargs.pop("sqlite_in_memory", False)
+            statement_timeout = kwargs.pop("statement_timeout", None)
+            lock_timeout = kwargs.pop("lock_timeout", None)
+            pool_size = kwargs.pop("pool_size", None)
+            warmup = kwargs.pop("warmup", None)
+            schemas_to_reflect = kwargs.pop("reflect_schemas", None)
         if len(kwargs) != 0:
             try:
                 import sshtunnel
@@ -149,27 +286,90 @@ class Database:
         if not engine and dialect == "postgresql":
             wait_for_postgresql(db_uri)
         if pg_restore_file and db_uri:
-            restore_from_pgfile(db_uri, pg_restore_file)
+            restore_from_pgfile(
+                db_uri,
+                pg_restore_file,
+                jobs=pg_restore_jobs,
+                record_checksum=pg_restore_checksum,
+                force=pg_restore_force,
+            )
         if not table_base:
             if db_has_tz:
                 table_base = TZBase
             else:
                 table_base = NoTZBase
-        if not engine:
-            engine = create_engine(db_uri, poolclass=NullPool, echo=False)
+        if sqlite_profile:
+            sqlite_pragmas = get_sqlite_pragmas(sqlite_profile)
+        else:
+            sqlite_pragmas = None
+        self._sqlite_path = None
+        if sqlite_in_memory:
+            url = make_url(db_uri) if db_uri else engine.url
+            if url.get_backend_name() != "sqlite":
+                raise DatabaseError("sqlite_in_memory requires a SQLite database!")
+            self._sqlite_path = url.database
+            if engine:
+                engine.dispose()
+            engine = create_memory_engine(self._sqlite_path, sqlite_pragmas)
+        elif not engine:
+            if pool_size:
+                engine = create_engine(
+                    db_uri, poolclass=QueuePool, pool_size=pool_size, echo=False
+                )
+            else:
+                engine = create_engine(db_uri, poolclass=NullPool, echo=False)
+            if sqlite_pragmas and engine.dialect.name == "sqlite":
+                apply_sqlite_pragmas(engine, sqlite_pragmas)
+        elif sqlite_pragmas and engine.dialect.name == "sqlite":
+            apply_sqlite_pragmas(engine, sqlite_pragmas)
         self._engine: Engine = engine
+        self._db_has_tz = db_has_tz
+        if query_cache is True:
+            query_cache = QueryCache()
+        self._query_cache: Optional[QueryCache] = query_cache
+        if query_cache is None:
+            self._cache_invalidator = None
+        else:
+            self._cache_invalidator = CacheInvalidator(engine, query_cache)
+        if maintenance_threshold is None:
+            self._maintenance = None
+        else:
+            self._maintenance = MaintenanceScheduler(
+                engine,
+                maintenance_threshold,
+                vacuum=maintenance_vacuum,
+                background=maintenance_background,
+            )
+        self._mirrors: List[SQLiteMirror] = []
+        self._timeouts = StatementTimeouts(
+            engine, statement_timeout=statement_timeout, lock_timeout=lock_timeout
+        )
         if recreate_schema:
             self.recreate_schema(engine, schema_name)
+        elif truncate_schema:
+            self.truncate_schema(engine, schema_name)
         self._prepare_results = prepare_fn()
-        self._session, self._base = self.create_session(
-            engine,
-            table_base=table_base,
-            reflect=reflect,
-        )
-        if reflect:
-            self._reflected_classes = self._base.classes
+        if schemas_to_reflect:
+            self._session = Session(engine)
+            self._base = reflect_schemas(engine, schemas_to_reflect)
+            self._reflected_classes = self._base.by_module
         else:
-            self._reflected_classes = None
+            self._session, self._base = self.create_session(
+                engine,
+                table_base=table_base,
+                reflect=reflect,
+            )
+            if reflect:
+                self._reflected_classes = self._base.classes
+            else:
+                self._reflected_classes = None
+        self._timeouts.add_session(self._session)
+        self._batch_metrics = None
+        self._warmup_timings = None
+        if warmup:
+            if warmup is True:
+                warmup = {}
+            self.warmup(**warmup)
 
     def cleanup(self) -> None:
         """Cleanup SQLAlchemy.
@@ -177,7 +377,17 @@ class Database:
         Returns:
             sqlalchemy.Engine: SQLAlchemy engine
         """
+        if self._maintenance is not None:
+            self._maintenance.wait()
+        for mirror in self._mirrors:
+            mirror.close()
         self._session.close()
+        if self._query_cache is not None:
+            self._cache_invalidator.remove()
+            self._query_cache.close()
+        if self._sqlite_path:
+            self.backup_sqlite()
+        self._timeouts.remove()
         self._engine.dispose()
         if self._server is not None:
             self._server.stop()
@@ -196,6 +406,197 @@ class Database:
         """
         self._base.metadata.drop_all(self._engine)
 
+    def get_query_cache(self) -> Optional[QueryCache]:
+        """Returns query cache if one was configured with query_cache.
+
+        Returns:
+            Optional[QueryCache]: Query cache or None
+        """
+        return self._query_cache
+
+    def invalidate_cache(self, tables: Optional[List[str]] = None) -> None:
+        """Invalidate query cache entries depending on any of the given tables
+        or all entries if tables is None. Writes through this Database are
+        detected automatically, so this is only needed for writes made in
+        other ways.
+
+        Args:
+            tables (Optional[List[str]]): Table names. Defaults to None (all).
+
+        Returns:
+            None
+        """
+        if self._query_cache is not None:
+            self._query_cache.invalidate(tables)
+
+    def execute_cached(self, statement: Executable) -> List[Row]:
+        """Execute read statement returning its rows, using the query cache if
+        one was configured with query_cache. Results are keyed by compiled
+        statement and parameters. ORM selects return rows of column values
+        rather than ORM instances. Rows are not cached while a write to any of
+        the tables they are read from is pending in this or another
+        transaction.
+
+        Args:
+            statement (Executable): SQLAlchemy statement
+
+        Returns:
+            List[Row]: Rows
+        """
+        connection = self._session.connection()
+        if self._query_cache is None:
+            return connection.execute(statement).all()
+        key = self._query_cache.get_key(statement, self._engine.dialect)
+        rows = self._query_cache.get(key)
+        if rows is None:
+            tables = get_statement_tables(statement)
+            version = self._query_cache.get_version(tables)
+            rows = connection.execute(statement).all()
+            if version is not None:
+                self._query_cache.set(key, tables, rows, version)
+        return rows
+
+    @contextmanager
+    def timeout(
+        self,
+        statement_timeout: Optional[float] = None,
+        lock_timeout: Optional[float] = None,
+    ) -> Iterator[Session]:
+        """Context manager that overrides the statement and lock timeouts for
+        statements executed through the session within it. The override is
+        applied to each transaction the session begins in the block, so it
+        continues after a commit or rollback. Statements running past their
+        timeout raise sqlalchemy.exc.OperationalError after which the session
+        must be rolled back.
+
+        Args:
+            statement_timeout (Optional[float]): Statement timeout in seconds. Defaults to None (no timeout).
+            lock_timeout (Optional[float]): Lock timeout in seconds. Defaults to None (default lock timeout).
+
+        Returns:
+            Iterator[Session]: SQLAlchemy session
+        """
+        with self._timeouts.timeout(self._session, statement_timeout, lock_timeout):
+            yield self._session
+
+    def cancel(self, session: Optional[Session] = None) -> int:
+        """Cancel the statement running on the connection of a session, by
+        default this Database's session. Other connections such as those of
+        other threads are unaffected. This is intended to be called from
+        another thread. In PostgreSQL, a cancel request is sent to the server
+        and in SQLite, the connection is interrupted. A cancelled statement
+        raises sqlalchemy.exc.OperationalError after which the session must
+        be rolled back.
+
+        Args:
+            session (Optional[Session]): SQLAlchemy session. Defaults to None (this Database's session).
+
+        Returns:
+            int: Number of connections cancelled (0 or 1)
+        """
+        if session is None:
+            session = self._session
+        return self._timeouts.cancel(session)
+
+    def backup_sqlite(self, path: Optional[str] = None) -> None:
+        """Back up the in memory copy of a SQLite database created with
+        sqlite_in_memory to its file (or another path). This happens
+        automatically on cleanup. Changes should be committed first.
+
+        Args:
+            path (Optional[str]): Path to back up to. Defaults to None (original file).
+
+        Returns:
+            None
+        """
+        if path is None:
+            path = self._sqlite_path
+        if not path:
+            raise DatabaseError("No path to back up SQLite database to!")
+        backup_to_file(self._engine, path)
+
+    def warmup(
+        self,
+        connections: Optional[int] = None,
+        queries: Optional[Sequence[Union[str, Executable]]] = None,
+        prewarm: Optional[Sequence[str]] = None,
+    ) -> Dict[str, float]:
+        """Warm up the database: open connections in parallel to fill the
+        pool, run warmup queries on each connection (eg. to populate catalog
+        caches) and in PostgreSQL, load tables and indexes into shared buffers
+        with pg_prewarm (which must be installed). The connections are held
+        open together so a ValueError is raised if there are more than the
+        pool size plus its maximum overflow.
+
+        Args:
+            connections (Optional[int]): Number of connections. Defaults to None (pool size).
+            queries (Optional[Sequence[Union[str, Executable]]]): Warmup queries. Defaults to None.
+            prewarm (Optional[Sequence[str]]): Tables and indexes to prewarm. Defaults to None.
+
+        Returns:
+            Dict[str, float]: Time in seconds taken by each step
+        """
+        start = time.perf_counter()
+        if connections is None:
+            connections = get_pool_size(self._engine)
+        timings = warm_connections(self._engine, connections, queries)
+        if prewarm:
+            prewarm_start = time.perf_counter()
+            prewarm_relations(self._engine, prewarm)
+            timings["prewarm"] = time.perf_counter() - prewarm_start
+        timings["total"] = time.perf_counter() - start
+        logger.info(f"Warmup took {timings['total']:.3f} seconds")
+        self._warmup_timings = timings
+        return timings
+
+    def get_warmup_timings(self) -> Optional[Dict[str, float]]:
+        """Returns the time in seconds taken by each step of the last warmup.
+
+        Returns:
+            Optional[Dict[str, float]]: Timings or None if not warmed up
+        """
+        return self._warmup_timings
+
+    def create_mirror(
+        self,
+        path: str,
+        tables: List[Union[Type[DeclarativeBase], TableClause]],
+        timestamp_columns: Optional[Dict[str, str]] = None,
+        refresh_interval: Optional[float] = None,
+        batch_size: int = 10000,
+    ) -> SQLiteMirror:
+        """Create a local SQLite mirror of tables or views from this database
+        and populate it. Reads can then be served locally with the mirror's
+        get_session using the same declarative models. Tables with a change
+        timestamp column in timestamp_columns are refreshed incrementally and
+        others by comparing a hash of their contents. Refreshes happen every
+        refresh_interval seconds in a background thread if given or on demand
+        with the mirror's refresh. The mirror is closed on cleanup.
+
+        Args:
+            path (str): Path to local SQLite file
+            tables (List[Union[Type[DeclarativeBase], TableClause]]): Tables or views to mirror
+            timestamp_columns (Optional[Dict[str, str]]): Table name to change timestamp column. Defaults to None.
+            refresh_interval (Optional[float]): Seconds between refreshes. Defaults to None.
+            batch_size (int): Rows copied per batch. Defaults to 10000.
+
+        Returns:
+            SQLiteMirror: Local mirror
+        """
+        mirror = SQLiteMirror(
+            self._engine,
+            path,
+            tables,
+            timestamp_columns=timestamp_columns,
+            batch_size=batch_size,
+        )
+        mirror.refresh()
+        if refresh_interval:
+            mirror.refresh_interval = refresh_interval
+            mirror.start()
+        self._mirrors.append(mirror)
+        return mirror
+
     def get_engine(self) -> Engine:
         """Returns SQLAlchemy engine.
 
@@ -228,27 +629,561 @@ class Database:
         """
         return self._prepare_results
 
+    def _after_load(self, table: Table, rows: int) -> None:
+        if self._maintenance is not None:
+            self._maintenance.record(table.fullname, rows)
+
+    def run_maintenance(
+        self, tables: List[Union[Type[DeclarativeBase], Table]], vacuum: bool = False
+    ) -> float:
+        """Refresh planner statistics for tables: ANALYZE (or VACUUM ANALYZE if
+        vacuum is True) in PostgreSQL or ANALYZE and PRAGMA optimize in SQLite.
+
+        Args:
+            tables (List[Union[Type[DeclarativeBase], Table]]): Database tables
+            vacuum (bool): Whether to also vacuum. Defaults to False.
+
+        Returns:
+            float: Time taken in seconds
+        """
+        table_names = [getattr(table, "__table__", table).fullname for table in tables]
+        return analyze_tables(self._engine, table_names, vacuum=vacuum)
+
+    def get_maintenance_timings(self) -> List[Dict]:
+        """Returns the tables and time taken in seconds of each run of post
+        load maintenance triggered by maintenance_threshold.
+
+        Returns:
+            List[Dict]: List of dictionaries with keys tables and seconds
+        """
+        if self._maintenance is None:
+            return []
+        self._maintenance.wait()
+        return self._maintenance.timings
+
+    def get_batch_metrics(self) -> Optional[Dict[str, Any]]:
+        """Returns metrics from the last call to batch_populate including the
+        batch sizes chosen and the time taken by each batch.
+
+        Returns:
+            Optional[Dict[str, Any]]: Batch metrics or None if no batch populate run
+        """
+        return self._batch_metrics
+
     def batch_populate(
         self,
-        rows: List[Dict],
+        rows: Union[List[Dict], Mapping[str, Sequence], Any],
         dbtable: Type[DeclarativeBase],
         batch_size: int = 1000,
+        adaptive: bool = False,
+        target_batch_seconds: float = 0.5,
+        commit_every: Optional[int] = None,
+        checkpoint_file: Optional[str] = None,
+        retries: int = 0,
+        retry_backoff: float = 1.0,
     ) -> None:
-        """Batch populate database table.
+        """Batch populate database table. If adaptive is True, batch_size is
+        the starting batch size which is then tuned from the measured time
+        taken by each batch (aiming for target_batch_seconds) and capped by the
+        bind parameter limit of the database dialect given the row width. The
+        batch sizes used are available from get_batch_metrics.
+
+        For tables declared with partition_by_range or partition_by_list in
+        PostgreSQL, any partitions needed for the rows in each batch are
+        created before the batch is inserted.
+
+        Rows can be a list of dictionaries or column oriented: a mapping of
+        column name to sequence or NumPy array or an Arrow RecordBatch or
+        Table. Column oriented rows are loaded without creating a dictionary
+        per row, using COPY for PostgreSQL with psycopg.
+
+        By default, there is one commit at the end. If commit_every is given,
+        there is a commit after that many batches and if checkpoint_file is
+        also given, the offset of the last committed row is saved to it. If
+        the checkpoint file exists when called, the load resumes from the saved
+        offset. The checkpoint file is removed once the load completes.
+        Transient errors (eg. dropped connections, serialization failures or
+        deadlocks) are retried up to retries times with exponential backoff
+        starting at retry_backoff seconds, resuming from the last commit.
 
         Args:
-            rows (List[Dict]): List of rows
+            rows (Union[List[Dict], Mapping[str, Sequence], Any]): List of rows or columns
             dbtable (Type[DeclarativeBase]): Database table
             batch_size (int): Batch size. Defaults to 1000.
+            adaptive (bool): Whether to tune batch size. Defaults to False.
+            target_batch_seconds (float): Target time per batch if adaptive. Defaults to 0.5.
+            commit_every (Optional[int]): Commit every n batches. Defaults to None (commit at end).
+            checkpoint_file (Optional[str]): File in which to save checkpoints. Defaults to None.
+            retries (int): Number of retries for transient errors. Defaults to 0.
+            retry_backoff (float): Initial delay between retries in seconds. Defaults to 1.0.
 
         Returns:
-            Tuple[Session, Any]: (SQLAlchemy session, base)
+            None
+        """
+        if is_columnar(rows):
+            columns = get_columns(rows)
+            num_rows = get_num_rows(columns)
+            num_columns = len(columns)
+        else:
+            columns = None
+            num_rows = len(rows)
+            if rows:
+                num_columns = len(rows[0])
+            else:
+                num_columns = len(dbtable.__table__.columns)
+        sizer = AdaptiveBatchSizer(
+            self._engine.dialect.name,
+            num_columns,
+            initial_batch_size=batch_size,
+            target_seconds=target_batch_seconds,
+            adaptive=adaptive,
+        )
+        self._batch_metrics = sizer.metrics
+        table = dbtable.__table__
+        partitioning = get_partitioning(table)
+        if partitioning and self._engine.dialect.name == "postgresql":
+            partition_column = partitioning["column"]
+        else:
+            partition_column = None
+        if checkpoint_file:
+            checkpoint = Checkpoint(checkpoint_file, dbtable.__table__.name)
+            committed = checkpoint.load()
+        else:
+            checkpoint = None
+            committed = 0
+        attempt = 0
+        self._batch_metrics["retries"] = 0
+        while True:
+            i = committed
+            batches = 0
+            try:
+                while i < num_rows:
+                    stop = min(num_rows, i + sizer.next_batch_size())
+                    start = time.perf_counter()
+                    if partition_column:
+                        if columns is None:
+                            values = (row.get(partition_column) for row in rows[i:stop])
+                        else:
+                            values = slice_column(columns[partition_column], i, stop)
+                        create_partitions(self._session.connection(), table, values)
+                    if columns is None:
+                        self._session.execute(insert(dbtable), rows[i:stop])
+                    else:
+                        insert_columns(
+                            self._session.connection(),
+                            dbtable.__table__,
+                            columns,
+                            i,
+                            stop,
+                        )
+                    sizer.record(stop - i, time.perf_counter() - start)
+                    i = stop
+                    batches += 1
+                    if commit_every and batches % commit_every == 0:
+                        self._session.commit()
+                        committed = i
+                        attempt = 0
+                        if checkpoint:
+                            checkpoint.save(committed)
+                self._session.commit()
+                break
+            except SQLAlchemyError as ex:
+                self._session.rollback()
+                if attempt >= retries or not is_transient_error(ex):
+                    raise
+                delay = retry_backoff * 2**attempt
+                attempt += 1
+                self._batch_metrics["retries"] += 1
+                logger.warning(
+                    f"Transient error loading {dbtable.__table__.name}: {ex}. Retry {attempt} of {retries} in {delay}s from row {committed}."
+                )
+                time.sleep(delay)
+        self.invalidate_cache([table.name])
+        self._after_load(table, num_rows)
+        if checkpoint:
+            checkpoint.clear()
+
+    def populate_tables(
+        self,
+        tables: Mapping[Union[Type[DeclarativeBase], Table], Any],
+        batch_size: int = 1000,
+        atomic: bool = True,
+        parallel: int = 1,
+    ) -> Dict[str, int]:
+        """Populate several related tables in foreign key order (as given by
+        metadata.sorted_tables) from a mapping of table to rows. Rows for each
+        table can be an iterable (eg. a generator) of dictionaries or column
+        oriented (see batch_populate).
+
+        If atomic is True, all tables are loaded in one transaction on the
+        session's connection which is committed at the end or rolled back if
+        any table fails. Otherwise, there is a commit after each table. In
+        that case, if parallel is more than 1, tables that do not depend on
+        each other are loaded concurrently on separate connections in up to
+        parallel threads (except in SQLite which only allows one writer). If
+        loading fails for any reason including an exception raised by a
+        generator of rows, the current transaction is rolled back.
+
+        Args:
+            tables (Mapping[Union[Type[DeclarativeBase], Table], Any]): Database table to rows
+            batch_size (int): Batch size. Defaults to 1000.
+            atomic (bool): Whether to load all tables in one transaction. Defaults to True.
+            parallel (int): Number of tables to load concurrently if not atomic. Defaults to 1.
+
+        Returns:
+            Dict[str, int]: Number of rows loaded into each table
+        """
+        table_rows = {
+            getattr(table, "__table__", table): rows for table, rows in tables.items()
+        }
+        levels = get_load_levels(table_rows)
+        counts = {}
+
+        def load_table(table: Table) -> None:
+            with self._engine.begin() as connection:
+                count = insert_rows(connection, table, table_rows[table], batch_size)
+            counts[table.fullname] = count
+
+        try:
+            if atomic:
+                connection = self._session.connection()
+                for level in levels:
+                    for table in level:
+                        counts[table.fullname] = insert_rows(
+                            connection, table, table_rows[table], batch_size
+                        )
+                self._session.commit()
+            elif parallel > 1 and can_load_concurrently(self._engine):
+                with ThreadPoolExecutor(max_workers=parallel) as executor:
+                    for level in levels:
+                        futures = [executor.submit(load_table, t) for t in level]
+                        for future in futures:
+                            future.result()
+            else:
+                for level in levels:
+                    for table in level:
+                        connection = self._session.connection()
+                        counts[table.fullname] = insert_rows(
+                            connection, table, table_rows[table], batch_size
+                        )
+                        self._session.commit()
+        except Exception:
+            # Includes errors raised by generators of rows
+            self._session.rollback()
+            if atomic:
+                counts = {}
+            raise
+        finally:
+            loaded = [table for table in table_rows if table.fullname in counts]
+            self.invalidate_cache([table.name for table in loaded])
+            for table in loaded:
+                self._after_load(table, counts[table.fullname])
+        return counts
+
+    def delete_by_keys(
+        self,
+        dbtable: Type[DeclarativeBase],
+        keys: Iterable[Any],
+        key_columns: Optional[Sequence[str]] = None,
+        chunk_size: Optional[int] = None,
+    ) -> int:
+        """Delete rows whose keys are in keys, committing at the end. Keys are
+        values for a single key column or tuples for several. Rather than one
+        statement per row, there is one set based statement per chunk of keys:
+        in PostgreSQL, the keys are passed as an array parameter (or copied
+        into a temporary table for several key columns) and otherwise, they
+        are matched with IN in chunks that respect the bind parameter limit.
+
+        Args:
+            dbtable (Type[DeclarativeBase]): Database table
+            keys (Iterable[Any]): Key values or tuples of key values
+            key_columns (Optional[Sequence[str]]): Key columns. Defaults to None (primary key).
+            chunk_size (Optional[int]): Keys per statement. Defaults to None (dialect dependent).
+
+        Returns:
+            int: Number of rows deleted
+        """
+        table = dbtable.__table__
+        try:
+            count = delete_by_keys(
+                self._session.connection(), table, keys, key_columns, chunk_size
+            )
+            self._session.commit()
+        except SQLAlchemyError:
+            self._session.rollback()
+            raise
+        self.invalidate_cache([table.name])
+        return count
+
+    def update_by_keys(
+        self,
+        dbtable: Type[DeclarativeBase],
+        keys: Iterable[Any],
+        values: Dict[str, Any],
+        key_columns: Optional[Sequence[str]] = None,
+        chunk_size: Optional[int] = None,
+    ) -> int:
+        """Set columns to the given values for rows whose keys are in keys,
+        committing at the end. Keys are matched as for delete_by_keys.
+
+        Args:
+            dbtable (Type[DeclarativeBase]): Database table
+            keys (Iterable[Any]): Key values or tuples of key values
+            values (Dict[str, Any]): Column name to new value
+            key_columns (Optional[Sequence[str]]): Key columns. Defaults to None (primary key).
+            chunk_size (Optional[int]): Keys per statement. Defaults to None (dialect dependent).
+
+        Returns:
+            int: Number of rows updated
+        """
+        table = dbtable.__table__
+        try:
+            count = update_by_keys(
+                self._session.connection(),
+                table,
+                keys,
+                values,
+                key_columns,
+                chunk_size,
+            )
+            self._session.commit()
+        except SQLAlchemyError:
+            self._session.rollback()
+            raise
+        self.invalidate_cache([table.name])
+        return count
+
+    def load_file(
+        self,
+        path: str,
+        dbtable: Type[DeclarativeBase],
+        file_format: Optional[str] = None,
+        compression: Optional[str] = None,
+        column_map: Optional[Dict[str, str]] = None,
+        delimiter: str = ",",
+        batch_size: int = 10000,
+    ) -> int:
+        """Load a CSV or JSON Lines file (csv or jsonl inferred from the
+        extension if file_format is not given), optionally compressed with
+        gzip, xz or bz2, into a database table with constant memory use.
+        Headers are mapped to columns by name (ignoring case and converting to
+        snake case) or using column_map. With PostgreSQL, if every CSV header
+        maps to a column, the file is streamed straight into COPY. Otherwise,
+        values are parsed according to the column types and inserted in
+        batches of batch_size.
+
+        Args:
+            path (str): Path to file
+            dbtable (Type[DeclarativeBase]): Database table
+            file_format (Optional[str]): csv or jsonl. Defaults to None (infer from extension).
+            compression (Optional[str]): Compression. Defaults to None (infer from extension).
+            column_map (Optional[Dict[str, str]]): Header to column name. Defaults to None.
+            delimiter (str): CSV delimiter. Defaults to ",".
+            batch_size (int): Rows per batch. Defaults to 10000.
+
+        Returns:
+            int: Number of rows loaded
+        """
+        table = dbtable.__table__
+        try:
+            count = load_file(
+                self._session.connection(),
+                table,
+                path,
+                file_format=file_format,
+                compression=compression,
+                column_map=column_map,
+                delimiter=delimiter,
+                batch_size=batch_size,
+            )
+            self._session.commit()
+        except Exception:
+            self._session.rollback()
+            raise
+        self.invalidate_cache([table.name])
+        self._after_load(table, count)
+        return count
+
+    def export_table(
+        self,
+        dbtable: Union[Type[DeclarativeBase], Table],
+        path: str,
+        file_format: str = "csv",
+        compression: Optional[str] = None,
+        parallel: int = 1,
+        key_column: Optional[str] = None,
+        batch_size: int = 10000,
+    ) -> int:
+        """Export database table to a CSV or Parquet file. For CSV with
+        PostgreSQL, COPY TO STDOUT is used. CSV output is compressed if
+        compression (gzip, xz or bz2) is given or inferred from the file
+        extension. For Parquet (which requires pyarrow), compression is the
+        Parquet codec (defaulting to snappy).
+
+        If parallel is more than 1, the table is split into ranges of an
+        integer key column (key_column or the primary key if it is a single
+        column) which are read in parallel on separate connections. With
+        PostgreSQL, the connections share a snapshot so the output is
+        consistent. Other dialects cannot share snapshots so rows written
+        during a parallel export may be seen by some connections only.
+
+        Args:
+            dbtable (Union[Type[DeclarativeBase], Table]): Database table
+            path (str): Path to output file
+            file_format (str): csv or parquet. Defaults to "csv".
+            compression (Optional[str]): Compression. Defaults to None.
+            parallel (int): Number of parallel readers. Defaults to 1.
+            key_column (Optional[str]): Key column for ranges. Defaults to None (primary key).
+            batch_size (int): Rows per batch. Defaults to 10000.
+
+        Returns:
+            int: Number of rows exported
+        """
+        table = getattr(dbtable, "__table__", dbtable)
+        if key_column:
+            column = table.c[key_column]
+        elif len(table.primary_key.columns) == 1:
+            column = table.primary_key.columns[0]
+        elif parallel > 1:
+            raise DatabaseError(
+                f"Table {table.name} needs a key column for parallel export!"
+            )
+        else:
+            column = None
+        if parallel > 1 and get_python_type(column) is not int:
+            raise DatabaseError(
+                f"Key column {column.name} must be an integer for parallel export!"
+            )
+        return export_table(
+            self._engine,
+            table,
+            path,
+            file_format=file_format,
+            compression=compression,
+            key_column=column,
+            parallel=parallel,
+            batch_size=batch_size,
+        )
+
+    def create_partitions(
+        self, dbtable: Type[DeclarativeBase], values: Iterable[Any]
+    ) -> List[str]:
+        """Create any partitions of a table declared with partition_by_range or
+        partition_by_list needed to hold the given values of the partition
+        column. Only PostgreSQL is supported.
+
+        Args:
+            dbtable (Type[DeclarativeBase]): Partitioned database table
+            values (Iterable[Any]): Values of partition column
+
+        Returns:
+            List[str]: Names of partitions created
         """
+        with self._engine.begin() as connection:
+            return create_partitions(connection, dbtable.__table__, values)
+
+    def drop_partitions(
+        self,
+        dbtable: Type[DeclarativeBase],
+        before: Optional[Any] = None,
+        values: Optional[Iterable[Any]] = None,
+    ) -> List[str]:
+        """Drop whole partitions of a table declared with partition_by_range or
+        partition_by_list as a bulk retention operation: range partitions that
+        lie entirely before the value before or list partitions for the given
+        values. For dialects other than PostgreSQL, the corresponding rows are
+        deleted. Exactly the argument matching the partitioning strategy must
+        be given: before for range and values for list.
 
-        for i in range(0, len(rows), batch_size):
-            batch = rows[i : i + batch_size]
-            self._session.execute(insert(dbtable), batch)
-        self._session.commit()
+        Args:
+            dbtable (Type[DeclarativeBase]): Partitioned database table
+            before (Optional[Any]): Drop range partitions before this. Defaults to None.
+            values (Optional[Iterable[Any]]): Drop list partitions for these. Defaults to None.
+
+        Returns:
+            List[str]: Names of partitions dropped
+        """
+        with self._engine.begin() as connection:
+            return drop_partitions(
+                connection, dbtable.__table__, before=before, values=values
+            )
+
+    def paginate(
+        self,
+        selectable: Union[Type[DeclarativeBase], Select],
+        page_size: int = 1000,
+        order_by: Optional[Sequence[Any]] = None,
+        token: Optional[str] = None,
+        secret: Union[str, bytes, None] = None,
+    ) -> Iterator[Page]:
+        """Iterate through pages of the results of a mapped table or select
+        using keyset pagination. Rows are ordered by the primary key (or the
+        unique ordering given in order_by) and each page starts after the key
+        of the last row of the previous page using WHERE (k1, k2) > (:last)
+        rather than OFFSET, so deep pages are as fast as the first. Each page
+        is a named tuple of rows (ORM instances for mapped tables) and an
+        opaque continuation token for the next page (None for the last page).
+        Passing a token starts from the page it refers to, so APIs can hand
+        tokens to clients. If secret is given, tokens are signed with
+        HMAC-SHA256 and tokens that have been tampered with raise ValueError.
+
+        Args:
+            selectable (Union[Type[DeclarativeBase], Select]): Mapped table or select
+            page_size (int): Rows per page. Defaults to 1000.
+            order_by (Optional[Sequence[Any]]): Unique ordering. Defaults to None (primary key).
+            token (Optional[str]): Continuation token. Defaults to None (first page).
+            secret (Union[str, bytes, None]): Secret for signing tokens. Defaults to None.
+
+        Returns:
+            Iterator[Page]: Pages
+        """
+        return paginate(
+            self._session,
+            selectable,
+            page_size=page_size,
+            order_by=order_by,
+            token=token,
+            secret=secret,
+        )
+
+    def read_compact(
+        self,
+        selectable: Union[Type[DeclarativeBase], Table, Select],
+        row_type: str = "slots",
+        batch_size: int = 10000,
+    ) -> Iterator[Any]:
+        """Stream rows from a table, view or select as lightweight objects
+        instead of ORM instances. There is no session identity tracking.
+        row_type can be slots (instances of a generated class with __slots__)
+        or namedtuple. Unless db_has_tz is True, ConversionNoTZ is applied to
+        timezoneless datetime columns including reflected ones.
+
+        Args:
+            selectable (Union[Type[DeclarativeBase], Table, Select]): Table, view or select
+            row_type (str): slots or namedtuple. Defaults to "slots".
+            batch_size (int): Rows fetched per batch. Defaults to 10000.
+
+        Returns:
+            Iterator[Any]: Rows
+        """
+        if isinstance(selectable, Select):
+            statement = selectable
+            name = "Row"
+        else:
+            table = getattr(selectable, "__table__", selectable)
+            statement = select(table)
+            name = "".join(part.capitalize() for part in table.name.split("_"))
+        row_class = make_row_class(
+            name, list(statement.selected_columns.keys()), row_type
+        )
+        with self._engine.connect() as connection:
+            yield from read_compact(
+                connection,
+                statement,
+                row_class,
+                convert_datetimes=not self._db_has_tz,
+                batch_size=batch_size,
+            )
 
     @staticmethod
     def create_session(
@@ -280,6 +1215,7 @@ class Database:
         if reflect:
             Base = automap_base(declarative_base=table_base)
             Base.prepare(autoload_with=engine, reflection_options={"views": True})
+            mark_reflected_views(Base.metadata, engine)
             table_base = Base
         else:
             table_base.metadata.create_all(engine)
@@ -331,6 +1267,70 @@ class Database:
         except SQLAlchemyError:
             return False
 
+    @staticmethod
+    def truncate_schema(
+        engine: Engine,
+        schema_name: str = "public",
+        vacuum: bool = False,
+        batch_size: int = 100000,
+    ) -> bool:
+        """Delete all data from the tables in a schema leaving tables, indexes
+        and views in place, which is much faster than recreating the schema. In
+        PostgreSQL, all tables are truncated in dependency order in one
+        TRUNCATE statement with RESTART IDENTITY. In SQLite, rows are deleted in
+        batches of batch_size from child tables before parents, autoincrement
+        counters are reset and the database is optionally vacuumed.
+
+        Args:
+            engine (Engine): SQLAlchemy engine to use.
+            schema_name (str): Schema name. Defaults to "public".
+            vacuum (bool): Whether to VACUUM afterwards (SQLite). Defaults to False.
+            batch_size (int): Rows deleted per batch (SQLite). Defaults to 100000.
+
+        Returns:
+            bool: True if all successful, False if not
+        """
+        dialect = engine.dialect
+        if dialect.name == "sqlite" and schema_name == "public":
+            schema_name = None
+        try:
+            metadata = MetaData()
+            metadata.reflect(bind=engine, schema=schema_name)
+            tables = metadata.sorted_tables
+            if not tables:
+                return True
+            preparer = dialect.identifier_preparer
+            with engine.connect() as connection:
+                if dialect.name == "postgresql":
+                    table_names = ", ".join(
+                        preparer.format_table(table) for table in tables
+                    )
+                    connection.exec_driver_sql(
+                        f"TRUNCATE {table_names} RESTART IDENTITY"
+                    )
+                else:
+                    for table in reversed(tables):
+                        table_name = preparer.format_table(table)
+                        if dialect.name == "sqlite":
+                            sql = f"DELETE FROM {table_name} WHERE rowid IN (SELECT rowid FROM {table_name} LIMIT {batch_size})"
+                            while connection.exec_driver_sql(sql).rowcount:
+                                pass
+                        else:
+                            connection.execute(table.delete())
+                    if dialect.name == "sqlite" and inspect(connection).has_table(
+                        "sqlite_sequence"
+                    ):
+                        connection.exec_driver_sql("DELETE FROM sqlite_sequence")
+                connection.commit()
+            if vacuum and dialect.name == "sqlite":
+                with engine.connect() as connection:
+                    connection.execution_options(
+                        isolation_level="AUTOCOMMIT"
+                    ).exec_driver_sql("VACUUM")
+            return True
+        except SQLAlchemyError:
+            return False
+
     @staticmethod
     def prepare_view(view_params: Dict) -> TableClause:
         """Prepare SQLAlchemy view from dictionary with keys: name, metadata and
@@ -0,0 +1,311 @@
+"""Bulk export of tables to CSV or Parquet files"""
+
+import csv
+import io
+import logging
+from concurrent.futures import ThreadPoolExecutor
+from contextlib import contextmanager
+from datetime import date, datetime
+from queue import Queue
+from typing import Any, BinaryIO, Callable, Iterator, List, Optional, Tuple, Union
+
+from sqlalchemy import Column, Connection, Engine, Select, Table, func, select
+
+from .no_timezone import ConversionNoTZ
+from .utils import get_python_type, open_compressed
+
+logger = logging.getLogger(__name__)
+
+_DONE = object()
+
+
+def open_output(path: str, compression: Optional[str] = None) -> BinaryIO:
+    """Opens a binary output stream, compressing with gzip, xz or bz2 if
+    compression is given or inferred from the file extension.
+
+    Args:
+        path (str): Path to output file
+        compression (Optional[str]): gzip, xz, bz2 or None. Defaults to None (infer from extension).
+
+    Returns:
+        BinaryIO: Output stream
+    """
+    return open_compressed(path, "wb", compression)
+
+
+def get_key_ranges(
+    bind: Union[Engine, Connection], key_column: Column, parts: int
+) -> List[Optional[Tuple[int, int]]]:
+    """Splits the values of an integer key column into contiguous ranges of
+    roughly equal width. Each range is (start inclusive, stop exclusive).
+
+    Args:
+        bind (Union[Engine, Connection]): SQLAlchemy engine or connection
+        key_column (Column): Integer key column
+        parts (int): Number of ranges
+
+    Returns:
+        List[Optional[Tuple[int, int]]]: Key ranges or [None] if table is empty
+    """
+    statement = select(func.min(key_column), func.max(key_column))
+    if isinstance(bind, Engine):
+        with bind.connect() as connection:
+            minimum, maximum = connection.execute(statement).one()
+    else:
+        minimum, maximum = bind.execute(statement).one()
+    if minimum is None:
+        return [None]
+    step = max(1, -(-(maximum - minimum + 1) // parts))
+    ranges = []
+    for start in range(minimum, maximum + 1, step):
+        ranges.append((start, min(start + step, maximum + 1)))
+    return ranges
+
+
+@contextmanager
+def shared_snapshot(
+    engine: Engine, key_column: Optional[Column], parallel: int
+) -> Iterator[Tuple[List[Optional[Tuple[int, int]]], Optional[str]]]:
+    """Context manager giving the key ranges for parallel readers and, for
+    PostgreSQL, the id of a snapshot exported from a repeatable read
+    transaction which is held open until exit. The key ranges are computed
+    in that snapshot.
+
+    Args:
+        engine (Engine): SQLAlchemy engine
+        key_column (Optional[Column]): Integer key column
+        parallel (int): Number of parallel readers
+
+    Returns:
+        Iterator[Tuple[List[Optional[Tuple[int, int]]], Optional[str]]]: (Key ranges, snapshot id or None)
+    """
+    if parallel <= 1 or key_column is None:
+        yield [None], None
+        return
+    if engine.dialect.name != "postgresql":
+        yield get_key_ranges(engine, key_column, parallel), None
+        return
+    with engine.connect() as connection:
+        connection.execution_options(isolation_level="REPEATABLE READ")
+        snapshot = connection.exec_driver_sql(
+            "SELECT pg_export_snapshot()"
+        ).scalar_one()
+        yield get_key_ranges(connection, key_column, parallel), snapshot
+
+
+@contextmanager
+def _connect(engine: Engine, snapshot: Optional[str]) -> Iterator[Connection]:
+    with engine.connect() as connection:
+        if snapshot is not None:
+            # Must be the first statement of the repeatable read transaction
+            connection.execution_options(isolation_level="REPEATABLE READ")
+            connection.exec_driver_sql(f"SET TRANSACTION SNAPSHOT '{snapshot}'")
+        yield connection
+
+
+def _range_select(
+    table: Table, key_column: Optional[Column], key_range: Optional[Tuple[int, int]]
+) -> Select:
+    statement = select(table)
+    if key_column is None:
+        return statement
+    if key_range is not None:
+        start, stop = key_range
+        statement = statement.where(key_column >= start, key_column < stop)
+    return statement.order_by(key_column)
+
+
+def _read_csv(
+    connection: Connection,
+    statement: Select,
+    batch_size: int,
+    put: Callable[[Any], None],
+) -> int:
+    dialect = connection.dialect
+    if dialect.name == "postgresql" and dialect.driver == "psycopg":
+        query = statement.compile(
+            dialect=dialect, compile_kwargs={"literal_binds": True}
+        )
+        driver_connection = connection.connection.driver_connection
+        with driver_connection.cursor() as cursor:
+            with cursor.copy(f"COPY ({query}) TO STDOUT WITH (FORMAT csv)") as copy:
+                for data in copy:
+                    put(bytes(data))
+            return cursor.rowcount
+    result = connection.execution_options(stream_results=True).execute(statement)
+    count = 0
+    for rows in result.partitions(batch_size):
+        buffer = io.StringIO()
+        csv.writer(buffer).writerows(rows)
+        put(buffer.getvalue().encode("utf-8"))
+        count += len(rows)
+    return count
+
+
+def _read_record_batches(
+    connection: Connection,
+    statement: Select,
+    schema: Any,
+    batch_size: int,
+    put: Callable[[Any], None],
+) -> int:
+    import pyarrow
+
+    result = connection.execution_options(stream_results=True).execute(statement)
+    count = 0
+    for rows in result.partitions(batch_size):
+        columns = list(zip(*rows))
+        put(pyarrow.RecordBatch.from_arrays(columns, schema=schema))
+        count += len(rows)
+    return count
+
+
+def get_arrow_schema(table: Table) -> Any:
+    """Gets Arrow schema for table from the Python types of its columns.
+    Columns whose Python type cannot be determined are written as strings.
+
+    Args:
+        table (Table): SQLAlchemy table
+
+    Returns:
+        pyarrow.Schema: Arrow schema
+    """
+    import pyarrow
+
+    types = {
+        bool: pyarrow.bool_(),
+        int: pyarrow.int64(),
+        float: pyarrow.float64(),
+        str: pyarrow.string(),
+        bytes: pyarrow.binary(),
+        date: pyarrow.date32(),
+    }
+    fields = []
+    for column in table.columns:
+        python_type = get_python_type(column)
+        if python_type is datetime:
+            # ConversionNoTZ returns datetimes in UTC
+            if isinstance(column.type, ConversionNoTZ) or getattr(
+                column.type, "timezone", False
+            ):
+                timezone = "UTC"
+            else:
+                timezone = None
+            arrow_type = pyarrow.timestamp("us", tz=timezone)
+        else:
+            arrow_type = types.get(python_type, pyarrow.string())
+        fields.append(pyarrow.field(column.name, arrow_type))
+    return pyarrow.schema(fields)
+
+
+def export_table(
+    engine: Engine,
+    table: Table,
+    path: str,
+    file_format: str = "csv",
+    compression: Optional[str] = None,
+    key_column: Optional[Column] = None,
+    parallel: int = 1,
+    batch_size: int = 10000,
+) -> int:
+    """Exports a table to a CSV or Parquet file. For CSV with PostgreSQL and
+    psycopg, COPY TO STDOUT is used. Otherwise rows are streamed in batches of
+    batch_size. CSV output is compressed if compression (gzip, xz or bz2) is
+    given or inferred from the file extension. For Parquet, compression is
+    the Parquet codec (defaulting to snappy).
+
+    If parallel is more than 1, the table is split into that many ranges of
+    the integer key_column, each of which is read on its own connection. Rows
+    are ordered by key within each range but ranges are interleaved in the
+    output. Memory use is bounded by a queue between the readers and the
+    single writer. For PostgreSQL, the readers share a snapshot exported by
+    shared_snapshot so the output is consistent as if read in one
+    transaction. Other dialects have no shared snapshots so rows written
+    while a parallel export runs may be seen by some readers and not others.
+
+    Args:
+        engine (Engine): SQLAlchemy engine
+        table (Table): Table to export
+        path (str): Path to output file
+        file_format (str): csv or parquet. Defaults to "csv".
+        compression (Optional[str]): Compression. Defaults to None.
+        key_column (Optional[Column]): Integer key column. Defaults to None.
+        parallel (int): Number of parallel readers. Defaults to 1.
+        batch_size (int): Rows per batch. Defaults to 10000.
+
+    Returns:
+        int: Number of rows exported
+    """
+    if file_format == "csv":
+        schema = None
+        output = open_output(path, compression)
+        buffer = io.StringIO()
+        csv.writer(buffer).writerow(table.columns.keys())
+        output.write(buffer.getvalue().encode("utf-8"))
+
+        def write(data: bytes) -> None:
+            output.write(data)
+
+        def close() -> None:
+            output.close()
+
+    elif file_format == "parquet":
+        try:
+            import pyarrow.parquet
+        except ImportError:
+            # dependency missing, log an error
+            logger.error(
+                "pyarrow not found! Please install hdx-python-database[pyarrow] to enable."
+            )
+            raise
+        schema = get_arrow_schema(table)
+        writer = pyarrow.parquet.ParquetWriter(
+            path, schema, compression=compression or "snappy"
+        )
+        write = writer.write_batch
+        close = writer.close
+    else:
+        raise ValueError(f"Unknown file format {file_format}!")
+
+    def read(
+        key_range: Optional[Tuple[int, int]], snapshot: Optional[str], queue: Queue
+    ) -> int:
+        statement = _range_select(table, key_column, key_range)
+        try:
+            with _connect(engine, snapshot) as connection:
+                if schema is None:
+                    return _read_csv(connection, statement, batch_size, queue.put)
+                return _read_record_batches(
+                    connection, statement, schema, batch_size, queue.put
+                )
+        finally:
+            queue.put(_DONE)
+
+    try:
+        with shared_snapshot(engine, key_column, parallel) as (ranges, snapshot):
+            queue = Queue(maxsize=2 * len(ranges))
+            with ThreadPoolExecutor(max_workers=len(ranges)) as executor:
+                futures = [
+                    executor.submit(read, key_range, snapshot, queue)
+                    for key_range in ranges
+                ]
+                remaining = len(futures)
+                error = None
+                while remaining:
+                    item = queue.get()
+                    if item is _DONE:
+                        remaining -= 1
+                    elif error is None:
+                        # On a write error, keep draining the queue so that the
+                        # readers can finish
+                        try:
+                            write(item)
+                        except Exception as ex:
+                            error = ex
+                if error is not None:
+                    raise error
+                count = sum(future.result() for future in futures)
+    finally:
+        close()
+    logger.info(f"Exported {count} rows from {table.name} to {path}")
+    return count
@@ -0,0 +1,373 @@
+"""Streaming loaders from CSV and JSON Lines files into tables"""
+
+import csv
+import io
+import json
+import logging
+from datetime import date, datetime
+from decimal import Decimal
+from typing import Any, BinaryIO, Callable, Dict, Iterator, List, Optional, Tuple
+
+from sqlalchemy import Connection, Dialect, Table, TypeDecorator
+
+from .columnar import insert_columns
+from .partitioning import create_partitions, get_partitioning
+from .utils import (
+    COMPRESSION_SUFFIXES,
+    camel_to_snake_case,
+    get_python_type,
+    open_compressed,
+)
+
+logger = logging.getLogger(__name__)
+
+FILE_FORMATS = {".csv": "csv", ".jsonl": "jsonl", ".ndjson": "jsonl"}
+TRUE_VALUES = {"true", "t", "yes", "y", "1"}
+
+# Size of chunks streamed to COPY
+CHUNK_SIZE = 1048576
+
+
+def open_input(path: str, compression: Optional[str] = None) -> BinaryIO:
+    """Opens a binary input stream, decompressing with gzip, xz or bz2 if
+    compression is given or inferred from the file extension.
+
+    Args:
+        path (str): Path to input file
+        compression (Optional[str]): gzip, xz, bz2 or None. Defaults to None (infer from extension).
+
+    Returns:
+        BinaryIO: Input stream
+    """
+    return open_compressed(path, "rb", compression)
+
+
+def get_file_format(path: str) -> str:
+    """Gets file format (csv or jsonl) from file extension ignoring any
+    compression extension.
+
+    Args:
+        path (str): Path to file
+
+    Returns:
+        str: csv or jsonl
+    """
+    for suffix in COMPRESSION_SUFFIXES:
+        if path.endswith(suffix):
+            path = path[: -len(suffix)]
+            break
+    for suffix, file_format in FILE_FORMATS.items():
+        if path.endswith(suffix):
+            return file_format
+    raise ValueError(f"Cannot determine file format of {path}!")
+
+
+def get_column_mapping(
+    table: Table, headers: List[str], column_map: Optional[Dict[str, str]] = None
+) -> List[Optional[str]]:
+    """Maps file headers to table columns. A header maps to a column if it is
+    given in column_map, is the column name or, ignoring case and converting
+    spaces, hyphens and camel case to snake case, matches the column name.
+
+    Args:
+        table (Table): Table to load
+        headers (List[str]): File headers
+        column_map (Optional[Dict[str, str]]): Header to column name. Defaults to None.
+
+    Returns:
+        List[Optional[str]]: Column name for each header or None if unmapped
+    """
+    columns = table.c.keys()
+    normalised_columns = {column.lower(): column for column in columns}
+    mapping = []
+    for header in headers:
+        if column_map and header in column_map:
+            column = column_map[header]
+        elif header in columns:
+            column = header
+        else:
+            normalised = camel_to_snake_case(
+                header.strip().replace(" ", "_").replace("-", "_")
+            )
+            column = normalised_columns.get(normalised.replace("__", "_"))
+        if column is None:
+            logger.warning(f"Ignoring {header} which is not a column of {table.name}")
+        mapping.append(column)
+    return mapping
+
+
+def _parse_datetime(value: str) -> datetime:
+    if value.endswith("Z"):
+        value = f"{value[:-1]}+00:00"
+    return datetime.fromisoformat(value)
+
+
+def get_parser(python_type: Any) -> Callable[[Any], Any]:
+    """Gets a function that parses string values from a file into the given
+    Python type. Empty strings become None. Values that are not strings (eg.
+    from JSON) are passed through.
+
+    Args:
+        python_type (Any): Python type of column
+
+    Returns:
+        Callable[[Any], Any]: Parser
+    """
+    if python_type is bool:
+
+        def parse(value: str) -> bool:
+            return value.lower() in TRUE_VALUES
+
+    elif python_type is datetime:
+        parse = _parse_datetime
+    elif python_type is date:
+        parse = date.fromisoformat
+    elif python_type in (int, float, Decimal):
+        parse = python_type
+    else:
+        return lambda value: None if value == "" else value
+
+    def parser(value: Any) -> Any:
+        if not isinstance(value, str):
+            return value
+        if value == "":
+            return None
+        return parse(value)
+
+    return parser
+
+
+def read_csv_records(
+    stream: BinaryIO, delimiter: str = ","
+) -> Tuple[List[str], Iterator[List[str]]]:
+    """Reads headers and rows of values from a CSV stream. Empty lines are
+    skipped and a row with fewer values than there are headers raises a
+    ValueError giving its line number.
+
+    Args:
+        stream (BinaryIO): Input stream
+        delimiter (str): CSV delimiter. Defaults to ",".
+
+    Returns:
+        Tuple[List[str], Iterator[List[str]]]: (Headers, rows of values)
+    """
+    text_stream = io.TextIOWrapper(stream, encoding="utf-8", newline="")
+    reader = csv.reader(text_stream, delimiter=delimiter)
+    headers = next(reader, [])
+
+    def rows() -> Iterator[List[str]]:
+        for row in reader:
+            if not row:
+                continue
+            if len(row) < len(headers):
+                raise ValueError(
+                    f"Line {reader.line_num} has {len(row)} values but there are {len(headers)} headers!"
+                )
+            yield row
+
+    return headers, rows()
+
+
+def read_json_records(stream: BinaryIO) -> Iterator[Dict[str, Any]]:
+    """Reads records from a JSON Lines stream skipping empty lines.
+
+    Args:
+        stream (BinaryIO): Input stream
+
+    Returns:
+        Iterator[Dict[str, Any]]: Records
+    """
+    text_stream = io.TextIOWrapper(stream, encoding="utf-8", newline="")
+    for line in text_stream:
+        if line.strip():
+            yield json.loads(line)
+
+
+def _copy_csv(
+    connection: Connection,
+    table: Table,
+    path: str,
+    compression: Optional[str],
+    columns: List[str],
+    delimiter: str,
+) -> int:
+    preparer = connection.dialect.identifier_preparer
+    column_names = ", ".join(preparer.quote(column) for column in columns)
+    delimiter = delimiter.replace("'", "''")
+    copy_sql = (
+        f"COPY {preparer.format_table(table)} ({column_names}) FROM STDIN "
+        f"WITH (FORMAT csv, HEADER true, DELIMITER '{delimiter}')"
+    )
+    driver_connection = connection.connection.driver_connection
+    with driver_connection.cursor() as cursor:
+        with open_input(path, compression) as stream:
+            with cursor.copy(copy_sql) as copy:
+                while data := stream.read(CHUNK_SIZE):
+                    copy.write(data)
+        return cursor.rowcount
+
+
+def use_raw_copy(
+    dialect: Dialect, table: Table, mapping: List[Optional[str]], file_format: str
+) -> bool:
+    """Whether a file can be streamed straight into COPY for the server to
+    parse its values. This requires a CSV file whose every header maps to a
+    column, PostgreSQL with psycopg, a table that is not partitioned and
+    columns whose values are not converted before binding (by a
+    TypeDecorator or a type's bind processor) as COPY would bypass that.
+
+    Args:
+        dialect (Dialect): SQLAlchemy dialect
+        table (Table): Table to load
+        mapping (List[Optional[str]]): Column name for each header or None if unmapped
+        file_format (str): csv or jsonl
+
+    Returns:
+        bool: Whether to use COPY on the raw file
+    """
+    if file_format != "csv":
+        return False
+    if dialect.name != "postgresql" or dialect.driver != "psycopg":
+        return False
+    if not all(mapping) or get_partitioning(table):
+        return False
+    for column in mapping:
+        column_type = table.c[column].type
+        if isinstance(column_type, TypeDecorator):
+            return False
+        if column_type.dialect_impl(dialect).bind_processor(dialect) is not None:
+            return False
+    return True
+
+
+def load_file(
+    connection: Connection,
+    table: Table,
+    path: str,
+    file_format: Optional[str] = None,
+    compression: Optional[str] = None,
+    column_map: Optional[Dict[str, str]] = None,
+    delimiter: str = ",",
+    batch_size: int = 10000,
+) -> int:
+    """Loads a CSV or JSON Lines file, optionally compressed with gzip, xz or
+    bz2, into a table with constant memory use. Headers are mapped to columns
+    with get_column_mapping. With PostgreSQL and psycopg, if every CSV header
+    maps to a column and no column converts values before binding (see
+    use_raw_copy), the file is streamed straight into COPY and the server
+    parses the values. Otherwise, values are parsed according to the column
+    types and inserted in batches of batch_size (using COPY for PostgreSQL).
+
+    Args:
+        connection (Connection): SQLAlchemy connection
+        table (Table): Table to load
+        path (str): Path to file
+        file_format (Optional[str]): csv or jsonl. Defaults to None (infer from extension).
+        compression (Optional[str]): Compression. Defaults to None (infer from extension).
+        column_map (Optional[Dict[str, str]]): Header to column name. Defaults to None.
+        delimiter (str): CSV delimiter. Defaults to ",".
+        batch_size (int): Rows per batch. Defaults to 10000.
+
+    Returns:
+        int: Number of rows loaded
+    """
+    if file_format is None:
+        file_format = get_file_format(path)
+    if file_format not in ("csv", "jsonl"):
+        raise ValueError(f"Unknown file format {file_format}!")
+    use_copy = False
+    with open_input(path, compression) as stream:
+        if file_format == "jsonl":
+            records = read_json_records(stream)
+            count = _load_json_records(
+                connection, table, records, column_map, batch_size
+            )
+        else:
+            headers, rows = read_csv_records(stream, delimiter)
+            mapping = get_column_mapping(table, headers, column_map)
+            use_copy = use_raw_copy(connection.dialect, table, mapping, file_format)
+            if not use_copy:
+                count = _load_csv_rows(connection, table, rows, mapping, batch_size)
+    if use_copy:
+        count = _copy_csv(connection, table, path, compression, mapping, delimiter)
+    logger.info(f"Loaded {count} rows from {path} into {table.name}")
+    return count
+
+
+def _load_csv_rows(
+    connection: Connection,
+    table: Table,
+    rows: Iterator[List[str]],
+    mapping: List[Optional[str]],
+    batch_size: int,
+) -> int:
+    indices = [i for i, column in enumerate(mapping) if column]
+    columns = [mapping[i] for i in indices]
+    parsers = [get_parser(get_python_type(table.c[c])) for c in columns]
+    count = 0
+    batch = [[] for _ in columns]
+    for row in rows:
+        for values, parser, index in zip(batch, parsers, indices):
+            values.append(parser(row[index]))
+        if len(batch[0]) == batch_size:
+            count += _insert_batch(connection, table, columns, batch)
+            batch = [[] for _ in columns]
+    if columns and batch[0]:
+        count += _insert_batch(connection, table, columns, batch)
+    return count
+
+
+def _load_json_records(
+    connection: Connection,
+    table: Table,
+    records: Iterator[Dict[str, Any]],
+    column_map: Optional[Dict[str, str]],
+    batch_size: int,
+) -> int:
+    # Keys are mapped to columns as they are first seen, so keys need not
+    # all appear in the first record
+    key_columns = {}
+    parsers = {}
+    count = 0
+    batch = []
+    for record in records:
+        row = {}
+        for key, value in record.items():
+            if key not in key_columns:
+                column = get_column_mapping(table, [key], column_map)[0]
+                key_columns[key] = column
+                if column:
+                    parsers[column] = get_parser(get_python_type(table.c[column]))
+            column = key_columns[key]
+            if column:
+                row[column] = parsers[column](value)
+        batch.append(row)
+        if len(batch) == batch_size:
+            count += _insert_records(connection, table, batch)
+            batch = []
+    if batch:
+        count += _insert_records(connection, table, batch)
+    return count
+
+
+def _insert_records(
+    connection: Connection, table: Table, records: List[Dict[str, Any]]
+) -> int:
+    # Columns absent from every record in the batch are left to their defaults
+    columns = list(dict.fromkeys(column for record in records for column in record))
+    if not columns:
+        return 0
+    batch = [[record.get(column) for record in records] for column in columns]
+    return _insert_batch(connection, table, columns, batch)
+
+
+def _insert_batch(
+    connection: Connection, table: Table, columns: List[str], batch: List[List]
+) -> int:
+    partitioning = get_partitioning(table)
+    if partitioning and partitioning["column"] in columns:
+        values = batch[columns.index(partitioning["column"])]
+        create_partitions(connection, table, values)
+    num_rows = len(batch[0])
+    insert_columns(connection, table, dict(zip(columns, batch)), 0, num_rows)
+    return num_rows
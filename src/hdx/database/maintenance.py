@@ -0,0 +1,138 @@
+"""Post load maintenance: refreshing planner statistics and vacuuming"""
+
+import logging
+import threading
+import time
+from typing import Dict, Iterable, List, Optional
+
+from sqlalchemy import Engine
+
+logger = logging.getLogger(__name__)
+
+
+def analyze_tables(
+    engine: Engine, table_names: Iterable[str], vacuum: bool = False
+) -> float:
+    """Refresh planner statistics for tables. In PostgreSQL, ANALYZE (or
+    VACUUM ANALYZE if vacuum is True) is run for each table. In SQLite, ANALYZE
+    is run for each table followed by PRAGMA optimize (and VACUUM of the whole
+    database if vacuum is True).
+
+    Args:
+        engine (Engine): SQLAlchemy engine
+        table_names (Iterable[str]): Names of tables (optionally schema qualified)
+        vacuum (bool): Whether to also vacuum. Defaults to False.
+
+    Returns:
+        float: Time taken in seconds
+    """
+    start = time.perf_counter()
+    dialect = engine.dialect
+    preparer = dialect.identifier_preparer
+    table_names = sorted(set(table_names))
+    quoted_names = [
+        ".".join(preparer.quote(part) for part in table_name.split("."))
+        for table_name in table_names
+    ]
+    # VACUUM cannot run inside a transaction
+    with engine.connect().execution_options(isolation_level="AUTOCOMMIT") as connection:
+        if dialect.name == "postgresql":
+            command = "VACUUM ANALYZE" if vacuum else "ANALYZE"
+            for quoted_name in quoted_names:
+                connection.exec_driver_sql(f"{command} {quoted_name}")
+        elif dialect.name == "sqlite":
+            for quoted_name in quoted_names:
+                connection.exec_driver_sql(f"ANALYZE {quoted_name}")
+            connection.exec_driver_sql("PRAGMA optimize")
+            if vacuum:
+                connection.exec_driver_sql("VACUUM")
+    seconds = time.perf_counter() - start
+    logger.info(f"Maintenance of {', '.join(table_names)} took {seconds:.3f} seconds")
+    return seconds
+
+
+class MaintenanceScheduler:
+    """Counts rows loaded into each table and runs analyze_tables for tables
+    once the rows loaded since their last maintenance reach threshold,
+    optionally in a background thread.
+
+    Args:
+        engine (Engine): SQLAlchemy engine
+        threshold (int): Number of rows loaded that triggers maintenance
+        vacuum (bool): Whether to also vacuum. Defaults to False.
+        background (bool): Whether to run in a background thread. Defaults to False.
+    """
+
+    def __init__(
+        self,
+        engine: Engine,
+        threshold: int,
+        vacuum: bool = False,
+        background: bool = False,
+    ) -> None:
+        self.engine = engine
+        self.threshold = threshold
+        self.vacuum = vacuum
+        self.background = background
+        self.row_counts: Dict[str, int] = {}
+        self.timings: List[Dict] = []
+        self._threads: List[threading.Thread] = []
+        self._lock = threading.Lock()
+
+    def record(self, table_name: str, rows: int) -> Optional[List[str]]:
+        """Record rows loaded into table, running maintenance if the threshold
+        is reached.
+
+        Args:
+            table_name (str): Name of table
+            rows (int): Number of rows loaded
+
+        Returns:
+            Optional[List[str]]: Tables for which maintenance was started or None
+        """
+        with self._lock:
+            self.row_counts[table_name] = self.row_counts.get(table_name, 0) + rows
+            table_names = [
+                name
+                for name, count in self.row_counts.items()
+                if count >= self.threshold
+            ]
+            for name in table_names:
+                del self.row_counts[name]
+        if not table_names:
+            return None
+        if self.background:
+            thread = threading.Thread(target=self.run, args=(table_names,), daemon=True)
+            thread.start()
+            self._threads.append(thread)
+        else:
+            self.run(table_names)
+        return table_names
+
+    def run(self, table_names: List[str]) -> None:
+        """Run maintenance for tables and record how long it took. Errors are
+        logged rather than raised as maintenance is not essential.
+
+        Args:
+            table_names (List[str]): Names of tables
+
+        Returns:
+            None
+        """
+        try:
+            seconds = analyze_tables(self.engine, table_names, vacuum=self.vacuum)
+        except Exception:
+            logger.exception(f"Maintenance of {', '.join(table_names)} failed!")
+            return
+        with self._lock:
+            self.timings.append({"tables": table_names, "seconds": seconds})
+
+    def wait(self) -> None:
+        """Wait for any maintenance running in background threads to finish.
+
+        Returns:
+            None
+        """
+        for thread in self._threads:
+            thread.join()
+        self._threads = []
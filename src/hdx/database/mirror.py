@@ -0,0 +1,298 @@
+"""Local SQLite read-through mirror of slowly changing tables"""
+
+import hashlib
+import logging
+import threading
+import time
+from datetime import datetime, timezone
+from typing import Any, Dict, List, Optional, Sequence, Type, Union
+
+from sqlalchemy import (
+    Column,
+    DateTime,
+    Engine,
+    MetaData,
+    String,
+    Table,
+    TableClause,
+    create_engine,
+    delete,
+    func,
+    insert,
+    select,
+    text,
+)
+from sqlalchemy.orm import DeclarativeBase, Session
+from sqlalchemy.pool import NullPool
+
+from .sqlite import PERFORMANCE_PRAGMAS, apply_sqlite_pragmas
+
+logger = logging.getLogger(__name__)
+
+MIRROR_STATE_TABLE = "hdx_mirror_state"
+
+
+def get_local_table(table: TableClause, metadata: MetaData) -> Table:
+    """Get a table for the local mirror of a table or view with the same name
+    and column types but without a schema, foreign keys or other constraints
+    so that declarative models can query the mirror.
+
+    Args:
+        table (TableClause): Table or view to mirror
+        metadata (MetaData): Metadata of local database
+
+    Returns:
+        Table: Local table
+    """
+    return Table(
+        table.name,
+        metadata,
+        *(
+            Column(column.name, column.type, primary_key=column.primary_key)
+            for column in table.columns
+        ),
+    )
+
+
+def _get_order_columns(table: TableClause) -> Sequence[Column]:
+    primary_key = [column for column in table.columns if column.primary_key]
+    if primary_key:
+        return primary_key
+    return list(table.columns)
+
+
+def get_table_hash(engine: Engine, table: TableClause) -> str:
+    """Get a hash of the contents of a table or view. In PostgreSQL, the hash
+    is computed by the server so only the hash is transferred. For other
+    dialects, the rows are streamed and hashed locally.
+
+    Args:
+        engine (Engine): SQLAlchemy engine
+        table (TableClause): Table or view
+
+    Returns:
+        str: Hash of table contents
+    """
+    order_columns = _get_order_columns(table)
+    with engine.connect() as connection:
+        if engine.dialect.name == "postgresql":
+            preparer = engine.dialect.identifier_preparer
+            order_by = ", ".join(f"t.{preparer.quote(c.name)}" for c in order_columns)
+            statement = text(
+                f"SELECT md5(string_agg(md5(CAST(t AS text)), '' ORDER BY {order_by})) "
+                f"FROM {preparer.format_table(table)} AS t"
+            )
+            return connection.execute(statement).scalar() or ""
+        digest = hashlib.sha256()
+        statement = select(table).order_by(*order_columns)
+        result = connection.execution_options(stream_results=True).execute(statement)
+        for rows in result.partitions(10000):
+            for row in rows:
+                digest.update(repr(tuple(row)).encode("utf-8"))
+        return digest.hexdigest()
+
+
+class SQLiteMirror:
+    """Mirrors tables or views from a source database into a local SQLite file
+    tuned for reads (memory mapped with the performance pragmas of
+    sqlite_profile). The mirror can be queried with the same declarative
+    models through get_session as long as table names do not clash.
+
+    Tables with a change timestamp column given in timestamp_columns are
+    refreshed incrementally by copying rows changed since the latest
+    timestamp in the mirror (replacing rows with the same primary key). Note
+    that deletions are not detected this way. Other tables are refreshed by
+    comparing a hash of their contents with that of the last refresh and
+    copying them in full if it differs.
+
+    If refresh_interval is given, refresh runs every refresh_interval seconds
+    in a background thread. Refreshes can also be made on demand with
+    refresh.
+
+    Args:
+        engine (Engine): SQLAlchemy engine of source database
+        path (str): Path to local SQLite file
+        tables (List[Union[Type[DeclarativeBase], TableClause]]): Tables or views to mirror
+        timestamp_columns (Optional[Dict[str, str]]): Table name to change timestamp column. Defaults to None.
+        refresh_interval (Optional[float]): Seconds between refreshes. Defaults to None.
+        batch_size (int): Rows copied per batch. Defaults to 10000.
+    """
+
+    def __init__(
+        self,
+        engine: Engine,
+        path: str,
+        tables: List[Union[Type[DeclarativeBase], TableClause]],
+        timestamp_columns: Optional[Dict[str, str]] = None,
+        refresh_interval: Optional[float] = None,
+        batch_size: int = 10000,
+    ) -> None:
+        self.source_engine = engine
+        self.path = path
+        self.timestamp_columns = timestamp_columns or {}
+        self.refresh_interval = refresh_interval
+        self.batch_size = batch_size
+        self.tables = [getattr(table, "__table__", table) for table in tables]
+        self.engine = create_engine(f"sqlite:///{path}", poolclass=NullPool)
+        apply_sqlite_pragmas(self.engine, PERFORMANCE_PRAGMAS)
+        self.metadata = MetaData()
+        self.local_tables = {
+            table.fullname: get_local_table(table, self.metadata)
+            for table in self.tables
+        }
+        self.state = Table(
+            MIRROR_STATE_TABLE,
+            self.metadata,
+            Column("table_name", String, primary_key=True),
+            Column("hash", String),
+            Column("refreshed", DateTime(timezone=True)),
+        )
+        self.metadata.create_all(self.engine)
+        self.timings: List[Dict] = []
+        self._lock = threading.Lock()
+        self._stop = threading.Event()
+        self._thread = None
+        if refresh_interval:
+            self.start()
+
+    def get_engine(self) -> Engine:
+        """Returns SQLAlchemy engine of local mirror.
+
+        Returns:
+            Engine: SQLAlchemy engine
+        """
+        return self.engine
+
+    def get_session(self) -> Session:
+        """Returns a new SQLAlchemy session reading from the local mirror.
+
+        Returns:
+            Session: SQLAlchemy session
+        """
+        return Session(bind=self.engine)
+
+    def _copy(self, statement: Any, local_table: Table, replace: bool) -> int:
+        count = 0
+        insert_statement = insert(local_table)
+        if replace:
+            insert_statement = insert_statement.prefix_with("OR REPLACE")
+        with self.source_engine.connect() as source:
+            result = source.execution_options(stream_results=True).execute(statement)
+            with self.engine.begin() as connection:
+                if not replace:
+                    connection.execute(delete(local_table))
+                for rows in result.partitions(self.batch_size):
+                    connection.execute(
+                        insert_statement, [dict(row._mapping) for row in rows]
+                    )
+                    count += len(rows)
+        return count
+
+    def _set_state(self, table_name: str, table_hash: Optional[str]) -> None:
+        with self.engine.begin() as connection:
+            connection.execute(
+                insert(self.state).prefix_with("OR REPLACE"),
+                {
+                    "table_name": table_name,
+                    "hash": table_hash,
+                    "refreshed": datetime.now(timezone.utc),
+                },
+            )
+
+    def refresh_table(self, table: TableClause) -> int:
+        """Refresh mirror of one table or view.
+
+        Args:
+            table (TableClause): Table or view
+
+        Returns:
+            int: Number of rows copied
+        """
+        local_table = self.local_tables[table.fullname]
+        timestamp_column = self.timestamp_columns.get(table.name)
+        if timestamp_column:
+            with self.engine.connect() as connection:
+                latest = connection.execute(
+                    select(func.max(local_table.c[timestamp_column]))
+                ).scalar()
+            statement = select(table)
+            if latest is not None:
+                # >= so that rows changed in the same instant are not missed
+                statement = statement.where(table.c[timestamp_column] >= latest)
+            count = self._copy(statement, local_table, True)
+            self._set_state(table.fullname, None)
+            return count
+        table_hash = get_table_hash(self.source_engine, table)
+        with self.engine.connect() as connection:
+            previous_hash = connection.execute(
+                select(self.state.c.hash).where(
+                    self.state.c.table_name == table.fullname
+                )
+            ).scalar()
+        if table_hash == previous_hash:
+            return 0
+        count = self._copy(select(table), local_table, False)
+        self._set_state(table.fullname, table_hash)
+        return count
+
+    def refresh(self, table_names: Optional[List[str]] = None) -> Dict[str, int]:
+        """Refresh mirror of all tables or those given in table_names.
+
+        Args:
+            table_names (Optional[List[str]]): Names of tables. Defaults to None (all tables).
+
+        Returns:
+            Dict[str, int]: Number of rows copied for each table
+        """
+        counts = {}
+        with self._lock:
+            start = time.perf_counter()
+            for table in self.tables:
+                if table_names is not None and table.fullname not in table_names:
+                    continue
+                counts[table.fullname] = self.refresh_table(table)
+            seconds = time.perf_counter() - start
+            self.timings.append({"rows": counts, "seconds": seconds})
+        logger.info(f"Refreshed mirror {self.path} in {seconds:.3f} seconds")
+        return counts
+
+    def _run(self) -> None:
+        while not self._stop.wait(self.refresh_interval):
+            try:
+                self.refresh()
+            except Exception:
+                logger.exception(f"Refresh of mirror {self.path} failed!")
+
+    def start(self) -> None:
+        """Start refreshing every refresh_interval seconds in a background
+        thread.
+
+        Returns:
+            None
+        """
+        if self._thread is not None:
+            return
+        self._stop.clear()
+        self._thread = threading.Thread(target=self._run, daemon=True)
+        self._thread.start()
+
+    def stop(self) -> None:
+        """Stop refreshing in the background.
+
+        Returns:
+            None
+        """
+        if self._thread is None:
+            return
+        self._stop.set()
+        self._thread.join()
+        self._thread = None
+
+    def close(self) -> None:
+        """Stop refreshing and dispose of local engine.
+
+        Returns:
+            None
+        """
+        self.stop()
+        self.engine.dispose()
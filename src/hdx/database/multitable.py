@@ -0,0 +1,103 @@
+"""Loading related tables in foreign key order"""
+
+import logging
+from itertools import islice
+from typing import Any, Iterable, List
+
+from sqlalchemy import Connection, Engine, Table, insert
+from sqlalchemy.sql.ddl import sort_tables
+
+from .columnar import (
+    get_columns,
+    get_num_rows,
+    insert_columns,
+    is_columnar,
+    slice_column,
+)
+from .partitioning import create_partitions, get_partitioning
+
+logger = logging.getLogger(__name__)
+
+
+def can_load_concurrently(engine: Engine) -> bool:
+    """Whether tables can be loaded concurrently on separate connections of
+    an engine. This is not the case for SQLite which only allows one writer.
+
+    Args:
+        engine (Engine): SQLAlchemy engine
+
+    Returns:
+        bool: Whether tables can be loaded concurrently
+    """
+    return engine.dialect.name != "sqlite"
+
+
+def get_load_levels(tables: Iterable[Table]) -> List[List[Table]]:
+    """Groups tables into levels such that every table only has foreign keys
+    to tables in earlier levels (or to tables not in tables). Tables in the
+    same level are independent of each other so can be loaded concurrently
+    once earlier levels are loaded. Self referencing foreign keys are ignored.
+
+    Args:
+        tables (Iterable[Table]): Tables to load
+
+    Returns:
+        List[List[Table]]: Levels of tables in dependency order
+    """
+    tables = list(tables)
+    levels = {}
+    for table in sort_tables(tables):
+        level = 0
+        for foreign_key in table.foreign_keys:
+            parent = foreign_key.column.table
+            if parent is not table and parent in levels:
+                level = max(level, levels[parent] + 1)
+        levels[table] = level
+    grouped = [[] for _ in range(max(levels.values(), default=-1) + 1)]
+    for table, level in levels.items():
+        grouped[level].append(table)
+    return grouped
+
+
+def insert_rows(
+    connection: Connection, table: Table, rows: Any, batch_size: int = 1000
+) -> int:
+    """Inserts rows into table in batches without committing. Rows can be an
+    iterable (eg. a generator) of dictionaries or column oriented (see
+    batch_populate). For partitioned tables in PostgreSQL, any partitions
+    needed for each batch are created first.
+
+    Args:
+        connection (Connection): SQLAlchemy connection
+        table (Table): Table into which to insert
+        rows (Any): Iterable of dictionaries or columns
+        batch_size (int): Batch size. Defaults to 1000.
+
+    Returns:
+        int: Number of rows inserted
+    """
+    partitioning = get_partitioning(table)
+    if partitioning:
+        partition_column = partitioning["column"]
+    else:
+        partition_column = None
+    if is_columnar(rows):
+        columns = get_columns(rows)
+        num_rows = get_num_rows(columns)
+        for start in range(0, num_rows, batch_size):
+            stop = min(num_rows, start + batch_size)
+            if partition_column:
+                values = slice_column(columns[partition_column], start, stop)
+                create_partitions(connection, table, values)
+            insert_columns(connection, table, columns, start, stop)
+    else:
+        num_rows = 0
+        iterator = iter(rows)
+        while batch := list(islice(iterator, batch_size)):
+            if partition_column:
+                values = (row.get(partition_column) for row in batch)
+                create_partitions(connection, table, values)
+            connection.execute(insert(table), batch)
+            num_rows += len(batch)
+    logger.info(f"Inserted {num_rows} rows into {table.name}")
+    return num_rows
@@ -0,0 +1,212 @@
+"""Keyset pagination with opaque continuation tokens"""
+
+import base64
+import hashlib
+import hmac
+import json
+from datetime import date, datetime
+from decimal import Decimal
+from typing import Any, Iterator, List, NamedTuple, Optional, Sequence, Union
+
+from sqlalchemy import Column, Select, Table, inspect, literal, select, tuple_
+from sqlalchemy.orm import Session
+
+
+class Page(NamedTuple):
+    """A page of rows with the token for the next page or None if it is the
+    last page."""
+
+    rows: List[Any]
+    token: Optional[str]
+
+
+def _default(value: Any) -> Any:
+    if isinstance(value, datetime):
+        return {"datetime": value.isoformat()}
+    if isinstance(value, date):
+        return {"date": value.isoformat()}
+    if isinstance(value, Decimal):
+        return {"decimal": str(value)}
+    raise TypeError(f"Cannot encode {value!r} in token!")
+
+
+def _object_hook(value: dict) -> Any:
+    if "datetime" in value:
+        return datetime.fromisoformat(value["datetime"])
+    if "date" in value:
+        return date.fromisoformat(value["date"])
+    if "decimal" in value:
+        return Decimal(value["decimal"])
+    return value
+
+
+def _encode(data: bytes) -> str:
+    return base64.urlsafe_b64encode(data).decode("ascii").rstrip("=")
+
+
+def _decode(data: str) -> bytes:
+    return base64.urlsafe_b64decode(data + "=" * (-len(data) % 4))
+
+
+def _sign(payload: str, secret: Union[str, bytes]) -> str:
+    if isinstance(secret, str):
+        secret = secret.encode("utf-8")
+    digest = hmac.new(secret, payload.encode("ascii"), hashlib.sha256).digest()
+    return _encode(digest)
+
+
+def encode_token(
+    names: Sequence[str],
+    values: Sequence[Any],
+    secret: Union[str, bytes, None] = None,
+) -> str:
+    """Encode the key column names and key values of the last row of a page
+    as an opaque, URL safe continuation token, signed with HMAC-SHA256 if
+    secret is given.
+
+    Args:
+        names (Sequence[str]): Key column names
+        values (Sequence[Any]): Key values
+        secret (Union[str, bytes, None]): Secret for signing. Defaults to None.
+
+    Returns:
+        str: Continuation token
+    """
+    data = json.dumps(
+        {"c": list(names), "v": list(values)}, default=_default, separators=(",", ":")
+    )
+    payload = _encode(data.encode("utf-8"))
+    if secret is None:
+        return payload
+    return f"{payload}.{_sign(payload, secret)}"
+
+
+def decode_token(
+    token: str, names: Sequence[str], secret: Union[str, bytes, None] = None
+) -> List[Any]:
+    """Decode a continuation token made by encode_token for the given key
+    column names, verifying its signature if secret is given.
+
+    Args:
+        token (str): Continuation token
+        names (Sequence[str]): Key column names
+        secret (Union[str, bytes, None]): Secret for signing. Defaults to None.
+
+    Returns:
+        List[Any]: Key values
+    """
+    payload, _, signature = token.partition(".")
+    if secret is not None:
+        if not hmac.compare_digest(signature, _sign(payload, secret)):
+            raise ValueError("Invalid continuation token signature!")
+    try:
+        data = json.loads(_decode(payload), object_hook=_object_hook)
+        key_names = data["c"]
+        values = data["v"]
+    except (ValueError, TypeError, KeyError):
+        raise ValueError("Invalid continuation token!")
+    if key_names != list(names) or len(values) != len(names):
+        raise ValueError("Continuation token is for a different ordering!")
+    return values
+
+
+def get_key_columns(
+    statement: Select, order_by: Optional[Sequence[Column]] = None
+) -> List[Column]:
+    """Get the columns giving a unique ordering for keyset pagination: those
+    in order_by or the primary key of the table the statement selects from.
+
+    Args:
+        statement (Select): SQLAlchemy select
+        order_by (Optional[Sequence[Column]]): Unique ordering. Defaults to None.
+
+    Returns:
+        List[Column]: Key columns
+    """
+    if order_by:
+        key_columns = []
+        for column in order_by:
+            # ORM attributes eg. DBTestValue.id
+            if hasattr(column, "__clause_element__"):
+                column = column.__clause_element__()
+            key_columns.append(column)
+        return key_columns
+    froms = statement.get_final_froms()
+    if len(froms) != 1 or not isinstance(froms[0], Table):
+        raise ValueError("order_by must be given unless selecting from one table!")
+    key_columns = list(froms[0].primary_key)
+    if not key_columns:
+        raise ValueError(f"Table {froms[0].name} has no primary key!")
+    return key_columns
+
+
+def paginate(
+    session: Session,
+    selectable: Any,
+    page_size: int = 1000,
+    order_by: Optional[Sequence[Column]] = None,
+    token: Optional[str] = None,
+    secret: Union[str, bytes, None] = None,
+) -> Iterator[Page]:
+    """Iterate through pages of the results of a mapped table or select using
+    keyset pagination: rows are ordered by the primary key (or the unique
+    ordering given in order_by) and each page starts after the key of the
+    last row of the previous one with WHERE (k1, k2) > (:last), so every page
+    costs the same however deep it is. Each page has a continuation token from
+    which the next page can be fetched (eg. by an API client) by passing it in
+    token. For mapped tables, pages contain ORM instances. For selects, they
+    contain rows and the key columns must be selected.
+
+    Args:
+        session (Session): SQLAlchemy session
+        selectable (Any): Mapped table or select
+        page_size (int): Rows per page. Defaults to 1000.
+        order_by (Optional[Sequence[Column]]): Unique ordering. Defaults to None (primary key).
+        token (Optional[str]): Continuation token. Defaults to None (first page).
+        secret (Union[str, bytes, None]): Secret for signing tokens. Defaults to None.
+
+    Returns:
+        Iterator[Page]: Pages
+    """
+    if isinstance(selectable, Select):
+        statement = selectable
+        mapper = None
+    else:
+        statement = select(selectable)
+        mapper = inspect(selectable)
+    key_columns = get_key_columns(statement, order_by)
+    names = [column.name for column in key_columns]
+    if mapper is None:
+
+        def get_key(row: Any) -> List[Any]:
+            return [row._mapping[column] for column in key_columns]
+
+    else:
+        keys = [mapper.get_property_by_column(column).key for column in key_columns]
+
+        def get_key(row: Any) -> List[Any]:
+            return [getattr(row, key) for key in keys]
+
+    statement = statement.order_by(None).order_by(*key_columns)
+    values = decode_token(token, names, secret) if token else None
+    while True:
+        page_statement = statement
+        if values is not None:
+            last = [
+                literal(value, type_=column.type)
+                for column, value in zip(key_columns, values)
+            ]
+            if len(key_columns) == 1:
+                condition = key_columns[0] > last[0]
+            else:
+                condition = tuple_(*key_columns) > tuple_(*last)
+            page_statement = statement.where(condition)
+        # Fetch one row more than the page size to find if there is a next page
+        result = session.execute(page_statement.limit(page_size + 1))
+        rows = result.scalars().all() if mapper else result.all()
+        if len(rows) <= page_size:
+            yield Page(rows, None)
+            return
+        rows = rows[:page_size]
+        values = get_key(rows[-1])
+        yield Page(rows, encode_token(names, values, secret))
@@ -0,0 +1,331 @@
+"""Declarative range and list partitioned tables for PostgreSQL"""
+
+import hashlib
+import logging
+import re
+from datetime import date, datetime, timezone
+from typing import Any, Dict, Iterable, List, Optional, Tuple, Union
+
+from sqlalchemy import Connection, Table, literal, text
+
+logger = logging.getLogger(__name__)
+
+INTERVALS = ("day", "month", "year")
+# Longest identifier in bytes that PostgreSQL does not truncate
+MAX_IDENTIFIER_LENGTH = 63
+
+
+def partition_by_range(
+    column: str, interval: Union[str, int], **table_args: Any
+) -> Dict[str, Any]:
+    """Get table arguments declaring that a table is range partitioned in
+    PostgreSQL on a date, datetime or integer column. Partitions cover one
+    interval (day, month, year or an integer step) and are created
+    automatically when rows are loaded with batch_populate. Note that in
+    PostgreSQL the primary key must include the partition column. Use as:
+    __table_args__ = partition_by_range("date", "month").
+
+    Args:
+        column (str): Partition column
+        interval (Union[str, int]): day, month, year or integer step
+        **table_args: Other table arguments
+
+    Returns:
+        Dict[str, Any]: Table arguments
+    """
+    if isinstance(interval, str) and interval not in INTERVALS:
+        raise ValueError(f"Unknown interval {interval}!")
+    return _table_args("range", column, interval, table_args)
+
+
+def partition_by_list(column: str, **table_args: Any) -> Dict[str, Any]:
+    """Get table arguments declaring that a table is list partitioned in
+    PostgreSQL with one partition per distinct value of a column. Partitions
+    are created automatically when rows are loaded with batch_populate. Note
+    that in PostgreSQL the primary key must include the partition column. Use
+    as: __table_args__ = partition_by_list("country").
+
+    Args:
+        column (str): Partition column
+        **table_args: Other table arguments
+
+    Returns:
+        Dict[str, Any]: Table arguments
+    """
+    return _table_args("list", column, None, table_args)
+
+
+def _table_args(
+    strategy: str,
+    column: str,
+    interval: Union[str, int, None],
+    table_args: Dict[str, Any],
+) -> Dict[str, Any]:
+    info = dict(table_args.pop("info", {}))
+    info["partition"] = {"strategy": strategy, "column": column, "interval": interval}
+    table_args["info"] = info
+    table_args["postgresql_partition_by"] = f"{strategy.upper()} ({column})"
+    return table_args
+
+
+def get_partitioning(table: Table) -> Optional[Dict[str, Any]]:
+    """Get partitioning declared for table with partition_by_range or
+    partition_by_list.
+
+    Args:
+        table (Table): SQLAlchemy table
+
+    Returns:
+        Optional[Dict[str, Any]]: Dictionary with keys strategy, column and interval or None
+    """
+    return table.info.get("partition")
+
+
+def _utc(value: datetime) -> datetime:
+    if value.tzinfo:
+        return value.astimezone(timezone.utc)
+    return value
+
+
+def _next_date(value: date, interval: str) -> date:
+    match interval:
+        case "day":
+            return date.fromordinal(value.toordinal() + 1)
+        case "month":
+            if value.month == 12:
+                return value.replace(year=value.year + 1, month=1)
+            return value.replace(month=value.month + 1)
+        case _:
+            return value.replace(year=value.year + 1)
+
+
+def get_range_bounds(value: Any, interval: Union[str, int]) -> Tuple[str, Any, Any]:
+    """Get the suffix of the partition name and the lower (inclusive) and upper
+    (exclusive) bounds of the range partition containing value.
+
+    Args:
+        value (Any): Date, datetime or integer value
+        interval (Union[str, int]): day, month, year or integer step
+
+    Returns:
+        Tuple[str, Any, Any]: (Partition name suffix, lower bound, upper bound)
+    """
+    if isinstance(interval, int):
+        lower = value // interval * interval
+        return f"p{lower}".replace("-", "m"), lower, lower + interval
+    if isinstance(value, datetime):
+        value = _utc(value)
+        lower = value.replace(hour=0, minute=0, second=0, microsecond=0)
+    else:
+        lower = value
+    if interval != "day":
+        lower = lower.replace(day=1)
+    if interval == "year":
+        lower = lower.replace(month=1)
+    formats = {"day": "%Y%m%d", "month": "%Y%m", "year": "%Y"}
+    return f"p{lower.strftime(formats[interval])}", lower, _next_date(lower, interval)
+
+
+def get_list_suffix(value: Any) -> str:
+    """Get the suffix of the partition name for a list partition value: the
+    value in lower case with non word characters replaced by underscores
+    followed by a short hash of the value so that values differing only in
+    case or punctuation get different suffixes.
+
+    Args:
+        value (Any): Partition value
+
+    Returns:
+        str: Partition name suffix
+    """
+    text = re.sub(r"\W", "_", str(value)).lower()
+    digest = hashlib.sha256(repr(value).encode("utf-8")).hexdigest()[:8]
+    return f"{text}_{digest}"
+
+
+def get_partition_name(table_name: str, suffix: str) -> str:
+    """Get the name of the partition of a table with a suffix from
+    get_range_bounds or get_list_suffix. Names longer than PostgreSQL allows
+    are shortened by truncating the table name and any list value text while
+    keeping the final part of the suffix (the range or the hash of the list
+    value) so that names stay distinct.
+
+    Args:
+        table_name (str): Table name
+        suffix (str): Partition name suffix
+
+    Returns:
+        str: Partition name
+    """
+    name = f"{table_name}_{suffix}"
+    encoded = name.encode("utf-8")
+    if len(encoded) <= MAX_IDENTIFIER_LENGTH:
+        return name
+    kept = f"_{suffix.rsplit('_', 1)[-1]}".encode("utf-8")
+    prefix = encoded[: MAX_IDENTIFIER_LENGTH - len(kept)]
+    # Do not split multibyte characters
+    return f"{prefix.decode('utf-8', errors='ignore')}{kept.decode('utf-8')}"
+
+
+def _render(connection: Connection, table: Table, column: str, value: Any) -> str:
+    statement = literal(value, type_=table.c[column].type)
+    return str(
+        statement.compile(
+            dialect=connection.dialect, compile_kwargs={"literal_binds": True}
+        )
+    )
+
+
+def _get_qualified_name(connection: Connection, table: Table, name: str) -> str:
+    preparer = connection.dialect.identifier_preparer
+    if table.schema:
+        return f"{preparer.quote_schema(table.schema)}.{preparer.quote(name)}"
+    return preparer.quote(name)
+
+
+def get_partition_names(connection: Connection, table: Table) -> List[str]:
+    """Get names of existing partitions of table.
+
+    Args:
+        connection (Connection): SQLAlchemy connection
+        table (Table): Partitioned table
+
+    Returns:
+        List[str]: Partition names
+    """
+    rows = connection.execute(
+        text(
+            "SELECT c.relname FROM pg_inherits i JOIN pg_class c ON c.oid = i.inhrelid "
+            "WHERE i.inhparent = CAST(:parent AS regclass) ORDER BY c.relname"
+        ),
+        {"parent": connection.dialect.identifier_preparer.format_table(table)},
+    )
+    return [row[0] for row in rows]
+
+
+def create_partitions(
+    connection: Connection, table: Table, values: Iterable[Any]
+) -> List[str]:
+    """Create any partitions of table needed to hold the given values of the
+    partition column. Only PostgreSQL is supported: for other dialects
+    nothing is done.
+
+    Args:
+        connection (Connection): SQLAlchemy connection
+        table (Table): Partitioned table
+        values (Iterable[Any]): Values of partition column
+
+    Returns:
+        List[str]: Names of partitions created
+    """
+    partitioning = get_partitioning(table)
+    if partitioning is None or connection.dialect.name != "postgresql":
+        return []
+    column = partitioning["column"]
+    preparer = connection.dialect.identifier_preparer
+    parent = preparer.format_table(table)
+    partitions = {}
+    for value in set(values):
+        if value is None:
+            continue
+        if partitioning["strategy"] == "range":
+            suffix, lower, upper = get_range_bounds(value, partitioning["interval"])
+            lower = _render(connection, table, column, lower)
+            upper = _render(connection, table, column, upper)
+            bounds = f"FROM ({lower}) TO ({upper})"
+        else:
+            suffix = get_list_suffix(value)
+            bounds = f"IN ({_render(connection, table, column, value)})"
+        partitions[get_partition_name(table.name, suffix)] = bounds
+    existing = set(get_partition_names(connection, table))
+    created = []
+    for name, bounds in sorted(partitions.items()):
+        if name in existing:
+            continue
+        qualified_name = _get_qualified_name(connection, table, name)
+        connection.exec_driver_sql(
+            f"CREATE TABLE IF NOT EXISTS {qualified_name} PARTITION OF {parent} FOR VALUES {bounds}"
+        )
+        logger.info(f"Created partition {name} of {table.name}")
+        created.append(name)
+    return created
+
+
+def drop_partitions(
+    connection: Connection,
+    table: Table,
+    before: Optional[Any] = None,
+    values: Optional[Iterable[Any]] = None,
+) -> List[str]:
+    """Drop whole partitions of table as a bulk retention operation: range
+    partitions that lie entirely before the value before or list partitions
+    for the given values. For dialects other than PostgreSQL, the
+    corresponding rows are deleted instead. Exactly the argument matching the
+    partitioning strategy must be given: before for range and values for list.
+
+    Args:
+        connection (Connection): SQLAlchemy connection
+        table (Table): Partitioned table
+        before (Optional[Any]): Drop range partitions before this. Defaults to None.
+        values (Optional[Iterable[Any]]): Drop list partitions for these. Defaults to None.
+
+    Returns:
+        List[str]: Names of partitions dropped (or table name if rows deleted)
+    """
+    partitioning = get_partitioning(table)
+    if partitioning is None:
+        raise ValueError(f"Table {table.name} is not partitioned!")
+    if partitioning["strategy"] == "range":
+        if before is None or values is not None:
+            raise ValueError(
+                f"Table {table.name} is range partitioned so give before and not values!"
+            )
+    elif values is None or before is not None:
+        raise ValueError(
+            f"Table {table.name} is list partitioned so give values and not before!"
+        )
+    else:
+        values = list(values)
+    column = table.c[partitioning["column"]]
+    if connection.dialect.name != "postgresql":
+        if partitioning["strategy"] == "range":
+            _, lower, _ = get_range_bounds(before, partitioning["interval"])
+            condition = column < lower
+        else:
+            condition = column.in_(values)
+        connection.execute(table.delete().where(condition))
+        return [table.name]
+    if partitioning["strategy"] == "range":
+        suffix, _, _ = get_range_bounds(before, partitioning["interval"])
+        limit = _get_range_key(suffix)
+        names = []
+        for name in get_partition_names(connection, table):
+            suffix = name.rsplit("_", 1)[-1]
+            if name != get_partition_name(table.name, suffix):
+                continue
+            key = _get_range_key(suffix)
+            if key is not None and key < limit:
+                names.append(name)
+    else:
+        existing = set(get_partition_names(connection, table))
+        names = [
+            get_partition_name(table.name, get_list_suffix(value)) for value in values
+        ]
+        names = [name for name in names if name in existing]
+    for name in names:
+        qualified_name = _get_qualified_name(connection, table, name)
+        connection.exec_driver_sql(f"DROP TABLE {qualified_name}")
+        logger.info(f"Dropped partition {name} of {table.name}")
+    return names
+
+
+def _get_range_key(suffix: str) -> Optional[int]:
+    # Range partition suffixes encode their lower bounds as integers that sort
+    # in the same order eg. p202401 or pm100
+    match = re.fullmatch(r"p(m?)(\d+)", suffix)
+    if match is None:
+        return None
+    key = int(match.group(2))
+    if match.group(1):
+        return -key
+    return key
@@ -1,9 +1,12 @@
 """PostgreSQL specific utilities"""
 
+import hashlib
 import logging
 import subprocess
 import time
-from os import environ
+from os import environ, walk
+from os.path import isdir, join, relpath
+from typing import Dict, List, Optional, Tuple
 
 from .dburi import get_params_from_connection_uri, remove_driver_from_uri
 
@@ -25,6 +28,9 @@ class PostgresError(Exception):
     pass
 
 
+RESTORE_LOG_TABLE = "hdx_restore_log"
+
+
 def wait_for_postgresql(db_uri: str) -> None:
     """Waits for PostgreSQL database to be up
 
@@ -47,45 +53,179 @@ def wait_for_postgresql(db_uri: str) -> None:
             time.sleep(1)
 
 
-def restore_from_pgfile(db_uri: str, pg_restore_file: str) -> str:
+def _get_connection_args(db_uri: str) -> Tuple[List[str], Dict[str, str]]:
+    db_params = get_params_from_connection_uri(db_uri)
+    args = []
+    for key, value in db_params.items():
+        match key:
+            case "database":
+                args.append("-d")
+            case "host":
+                args.append("-h")
+            case "port":
+                args.append("-p")
+            case "username":
+                args.append("-U")
+            case _:
+                continue
+        args.append(f"{value}")
+    env = environ.copy()
+    password = db_params.get("password")
+    if password:
+        env["PGPASSWORD"] = password
+    return args, env
+
+
+def _check_process(
+    process: subprocess.CompletedProcess, subprocess_params: List[str]
+) -> None:
+    try:
+        process.check_returncode()
+    except subprocess.CalledProcessError as ex:
+        command = " ".join(subprocess_params)
+        raise PostgresError(
+            f"{command} failed. Return code: {process.returncode}. Error: {process.stderr}"
+        ) from ex
+
+
+def get_file_checksum(path: str, chunk_size: int = 1048576) -> str:
+    """Get SHA-256 checksum of a file, reading it in chunks so that large files
+    are not loaded into memory. For a directory (eg. a pg_dump directory format
+    dump), the relative paths and contents of all files are hashed in sorted
+    order.
+
+    Args:
+        path (str): Path to file or directory
+        chunk_size (int): Size of chunks to read. Defaults to 1048576.
+
+    Returns:
+        str: Hex digest of checksum
+    """
+    if isdir(path):
+        paths = []
+        for root, _, filenames in walk(path):
+            for filename in filenames:
+                paths.append(join(root, filename))
+        paths = sorted(paths)
+    else:
+        paths = [path]
+    checksum = hashlib.sha256()
+    for filepath in paths:
+        if filepath != path:
+            checksum.update(relpath(filepath, path).encode("utf-8"))
+        with open(filepath, "rb") as f:
+            while chunk := f.read(chunk_size):
+                checksum.update(chunk)
+    return checksum.hexdigest()
+
+
+def get_restore_checksum(db_uri: str) -> Optional[str]:
+    """Get checksum of the file most recently restored into the database by
+    restore_from_pgfile with record_checksum set to True.
+
+    Args:
+        db_uri (str): Connection URI
+
+    Returns:
+        Optional[str]: Checksum or None if no restore recorded
+    """
+    with psycopg.connect(remove_driver_from_uri(db_uri)) as connection:
+        exists = connection.execute(
+            "SELECT to_regclass(%s)", (RESTORE_LOG_TABLE,)
+        ).fetchone()[0]
+        if exists is None:
+            return None
+        row = connection.execute(
+            f"SELECT checksum FROM {RESTORE_LOG_TABLE} ORDER BY restored_at DESC LIMIT 1"
+        ).fetchone()
+    if row is None:
+        return None
+    return row[0]
+
+
+def record_restore_checksum(
+    db_uri: str, pg_restore_file: str, checksum: str, seconds: float
+) -> None:
+    """Record checksum of restored file, the time of the restore and how long
+    it took in a bookkeeping table in the database.
+
+    Args:
+        db_uri (str): Connection URI
+        pg_restore_file (str): Path to the pg_restore database file
+        checksum (str): Checksum of restored file
+        seconds (float): Time taken by restore in seconds
+
+    Returns:
+        None
+    """
+    with psycopg.connect(remove_driver_from_uri(db_uri)) as connection:
+        connection.execute(
+            f"CREATE TABLE IF NOT EXISTS {RESTORE_LOG_TABLE} ("
+            "checksum TEXT NOT NULL, restore_file TEXT NOT NULL, "
+            "restored_at TIMESTAMPTZ NOT NULL DEFAULT now(), "
+            "seconds DOUBLE PRECISION)"
+        )
+        connection.execute(
+            f"INSERT INTO {RESTORE_LOG_TABLE} (checksum, restore_file, seconds) "
+            "VALUES (%s, %s, %s)",
+            (checksum, pg_restore_file, seconds),
+        )
+
+
+def restore_from_pgfile(
+    db_uri: str,
+    pg_restore_file: str,
+    jobs: Optional[int] = None,
+    record_checksum: bool = False,
+    force: bool = False,
+) -> str:
     """Restore database from a pg_restore file created by pg_backup using the
-    pg_restore command.
+    pg_restore command. pg_restore_file can be a file in custom or tar format
+    (optionally xz compressed) or a directory created with the directory
+    format. For the directory and custom formats, the restore can be run in
+    parallel by setting jobs. An xz compressed file is streamed into
+    pg_restore which cannot then run in parallel, so jobs more than 1 raises
+    a ValueError.
+
+    If record_checksum is True, a checksum of the file and the time of the
+    restore are recorded in a bookkeeping table in the database and the
+    restore is skipped if the checksum matches that of the last restore unless
+    force is True.
 
     Args:
         db_uri (str): Connection URI
         pg_restore_file (str): Path to the pg_restore database file
+        jobs (Optional[int]): Number of parallel jobs. Defaults to None.
+        record_checksum (bool): Record checksum and skip if unchanged. Defaults to False.
+        force (bool): Restore even if checksum unchanged. Defaults to False.
 
     Returns:
-        str: Output from the pg_restore command
+        str: Output from the pg_restore command (empty if skipped)
     """
-    db_params = get_params_from_connection_uri(db_uri)
-    if pg_restore_file[-3:] == ".xz":
+    compressed = pg_restore_file[-3:] == ".xz"
+    if compressed and jobs and jobs > 1:
+        raise ValueError(
+            f"Cannot restore {pg_restore_file} with {jobs} jobs as xz compressed files are restored from a stream!"
+        )
+    if record_checksum:
+        checksum = get_file_checksum(pg_restore_file)
+        if not force and get_restore_checksum(db_uri) == checksum:
+            logger.info(f"Skipping restore of unchanged {pg_restore_file}")
+            return ""
+        start = time.perf_counter()
+    if compressed:
         decompress = subprocess.Popen(
             ("unxz", "-c", "-d", pg_restore_file), stdout=subprocess.PIPE
         ).stdout
     else:
         decompress = None
     subprocess_params = ["pg_restore", "-c"]
-    for key, value in db_params.items():
-        match key:
-            case "database":
-                subprocess_params.append("-d")
-            case "host":
-                subprocess_params.append("-h")
-            case "port":
-                subprocess_params.append("-p")
-            case "username":
-                subprocess_params.append("-U")
-            case _:
-                continue
-        subprocess_params.append(f"{value}")
-
+    connection_args, env = _get_connection_args(db_uri)
+    subprocess_params.extend(connection_args)
+    if jobs and not decompress:
+        subprocess_params.append(f"-j{jobs}")
     if not decompress:
         subprocess_params.append(pg_restore_file)
-    env = environ.copy()
-    password = db_params.get("password")
-    if password:
-        env["PGPASSWORD"] = password
     process = subprocess.run(
         subprocess_params,
         env=env,
@@ -93,14 +233,104 @@ def restore_from_pgfile(db_uri: str, pg_restore_file: str) -> str:
         encoding="utf-8",
         stdin=decompress,
     )
-    try:
-        process.check_returncode()
-    except subprocess.CalledProcessError as ex:
-        command = " ".join(subprocess_params)
-        raise PostgresError(
-            f"{command} failed. Return code: {process.returncode}. Error: {process.stderr}"
-        ) from ex
+    _check_process(process, subprocess_params)
 
     for line in process.stdout.splitlines():
         logger.info(line)
+    if record_checksum:
+        seconds = time.perf_counter() - start
+        record_restore_checksum(db_uri, pg_restore_file, checksum, seconds)
     return process.stdout
+
+
+def dump_to_pgfile(
+    db_uri: str,
+    pg_dump_file: str,
+    file_format: str = "custom",
+    jobs: Optional[int] = None,
+    tables: Optional[List[str]] = None,
+    exclude_tables: Optional[List[str]] = None,
+    schemas: Optional[List[str]] = None,
+    exclude_schemas: Optional[List[str]] = None,
+    compress: Optional[int] = None,
+) -> str:
+    """Dump database to a file using the pg_dump command that can be restored
+    with restore_from_pgfile. file_format can be custom, directory, tar or
+    plain. The directory format writes a directory and can be run in parallel
+    by setting jobs. If pg_dump_file ends in .xz, pg_dump output is streamed
+    from stdout through xz. Tables and schemas can be included or excluded
+    using the patterns accepted by pg_dump. compress is the compression level
+    used by pg_dump itself.
+
+    Args:
+        db_uri (str): Connection URI
+        pg_dump_file (str): Path to the output file or directory
+        file_format (str): custom, directory, tar or plain. Defaults to "custom".
+        jobs (Optional[int]): Number of parallel jobs (directory format only). Defaults to None.
+        tables (Optional[List[str]]): Tables to include. Defaults to None (all).
+        exclude_tables (Optional[List[str]]): Tables to exclude. Defaults to None.
+        schemas (Optional[List[str]]): Schemas to include. Defaults to None (all).
+        exclude_schemas (Optional[List[str]]): Schemas to exclude. Defaults to None.
+        compress (Optional[int]): pg_dump compression level. Defaults to None.
+
+    Returns:
+        str: Output from the pg_dump command
+    """
+    formats = {"custom": "c", "directory": "d", "tar": "t", "plain": "p"}
+    if file_format not in formats:
+        raise PostgresError(f"Unknown pg_dump format {file_format}!")
+    compress_xz = pg_dump_file[-3:] == ".xz"
+    if file_format == "directory":
+        if compress_xz:
+            raise PostgresError("Directory format cannot be xz compressed!")
+    elif jobs:
+        raise PostgresError("Parallel jobs are only supported by directory format!")
+    subprocess_params = ["pg_dump", f"-F{formats[file_format]}"]
+    connection_args, env = _get_connection_args(db_uri)
+    subprocess_params.extend(connection_args)
+    if jobs:
+        subprocess_params.append(f"-j{jobs}")
+    if compress is not None:
+        subprocess_params.append(f"-Z{compress}")
+    for flag, patterns in (
+        ("-t", tables),
+        ("-T", exclude_tables),
+        ("-n", schemas),
+        ("-N", exclude_schemas),
+    ):
+        for pattern in patterns or ():
+            subprocess_params.extend((flag, pattern))
+    if not compress_xz:
+        subprocess_params.extend(("-f", pg_dump_file))
+        process = subprocess.run(
+            subprocess_params,
+            env=env,
+            capture_output=True,
+            encoding="utf-8",
+        )
+    else:
+        with open(pg_dump_file, "wb") as output:
+            compress_process = subprocess.Popen(
+                ("xz", "-c"), stdin=subprocess.PIPE, stdout=output
+            )
+            try:
+                process = subprocess.run(
+                    subprocess_params,
+                    env=env,
+                    stdout=compress_process.stdin,
+                    stderr=subprocess.PIPE,
+                    encoding="utf-8",
+                )
+            finally:
+                compress_process.stdin.close()
+                compress_process.wait()
+        if compress_process.returncode:
+            raise PostgresError(
+                f"xz failed. Return code: {compress_process.returncode}"
+            )
+    _check_process(process, subprocess_params)
+
+    output = process.stdout or ""
+    for line in output.splitlines():
+        logger.info(line)
+    return output
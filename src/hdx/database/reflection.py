@@ -0,0 +1,84 @@
+"""Concurrent reflection of several schemas into namespaced classes"""
+
+import logging
+import time
+from concurrent.futures import ThreadPoolExecutor
+from typing import Any, Optional, Sequence
+
+from sqlalchemy import Engine, MetaData, Table
+from sqlalchemy.ext.automap import automap_base
+
+from .views import mark_reflected_views
+
+logger = logging.getLogger(__name__)
+
+
+def reflect_schema(engine: Engine, schema: str) -> MetaData:
+    """Reflect the tables and views of one schema on its own connection.
+    Foreign keys to other schemas are not followed.
+
+    Args:
+        engine (Engine): SQLAlchemy engine
+        schema (str): Schema name
+
+    Returns:
+        MetaData: Reflected metadata
+    """
+    start = time.perf_counter()
+    metadata = MetaData()
+    with engine.connect() as connection:
+        metadata.reflect(connection, schema=schema, views=True, resolve_fks=False)
+        mark_reflected_views(metadata, connection, schema)
+    seconds = time.perf_counter() - start
+    logger.info(
+        f"Reflected {len(metadata.tables)} tables of {schema} in {seconds:.3f} seconds"
+    )
+    return metadata
+
+
+def _remove_unresolved_foreign_keys(metadata: MetaData) -> None:
+    # Foreign keys to tables in schemas that were not reflected cannot be
+    # mapped by automap
+    for table in metadata.tables.values():
+        for constraint in list(table.foreign_key_constraints):
+            referred = constraint.elements[0].target_fullname.rsplit(".", 1)[0]
+            if referred in metadata.tables:
+                continue
+            table.constraints.discard(constraint)
+            for element in constraint.elements:
+                element.parent.foreign_keys.discard(element)
+                table.foreign_keys.discard(element)
+
+
+def _modulename_for_table(cls: Any, tablename: str, table: Table) -> str:
+    return table.schema
+
+
+def reflect_schemas(
+    engine: Engine, schemas: Sequence[str], parallel: Optional[int] = None
+) -> Any:
+    """Reflect several schemas concurrently, each on its own connection,
+    merging the results into one automap base whose classes are namespaced
+    by schema: base.by_module.schema.table. Foreign keys between reflected
+    schemas are preserved while those to other schemas are dropped.
+
+    Args:
+        engine (Engine): SQLAlchemy engine
+        schemas (Sequence[str]): Schema names
+        parallel (Optional[int]): Number of schemas reflected at once. Defaults to None (all).
+
+    Returns:
+        Any: Automap base
+    """
+    with ThreadPoolExecutor(max_workers=parallel or len(schemas)) as executor:
+        metadatas = list(
+            executor.map(lambda schema: reflect_schema(engine, schema), schemas)
+        )
+    merged = MetaData()
+    for metadata in metadatas:
+        for table in metadata.tables.values():
+            table.to_metadata(merged)
+    _remove_unresolved_foreign_keys(merged)
+    Base = automap_base(metadata=merged)
+    Base.prepare(modulename_for_table=_modulename_for_table)
+    return Base
@@ -0,0 +1,110 @@
+"""SQLite specific utilities"""
+
+import logging
+import sqlite3
+from os.path import exists
+from typing import Any, Dict, Optional
+
+from sqlalchemy import Engine, create_engine, event
+from sqlalchemy.pool import StaticPool
+
+logger = logging.getLogger(__name__)
+
+# Pragmas for local and test databases trading durability on power loss for
+# speed: WAL journal with fewer fsyncs, memory mapped reads, a 64MB page cache
+# and temporary tables in memory
+PERFORMANCE_PRAGMAS = {
+    "journal_mode": "WAL",
+    "synchronous": "NORMAL",
+    "mmap_size": 268435456,
+    "cache_size": -65536,
+    "temp_store": "MEMORY",
+}
+
+
+def get_sqlite_pragmas(profile: Any) -> Dict[str, Any]:
+    """Get pragmas for a SQLite performance profile: True for
+    PERFORMANCE_PRAGMAS or a dictionary of pragmas overriding them.
+
+    Args:
+        profile (Any): True or dictionary of pragmas
+
+    Returns:
+        Dict[str, Any]: Dictionary of pragmas
+    """
+    pragmas = dict(PERFORMANCE_PRAGMAS)
+    if isinstance(profile, dict):
+        pragmas.update(profile)
+    return pragmas
+
+
+def apply_sqlite_pragmas(engine: Engine, pragmas: Dict[str, Any]) -> None:
+    """Set pragmas on every connection made by a SQLite engine using an engine
+    connect event.
+
+    Args:
+        engine (Engine): SQLAlchemy engine
+        pragmas (Dict[str, Any]): Dictionary of pragmas
+
+    Returns:
+        None
+    """
+
+    def set_pragmas(dbapi_connection: Any, _: Any) -> None:
+        cursor = dbapi_connection.cursor()
+        for key, value in pragmas.items():
+            cursor.execute(f"PRAGMA {key}={value}")
+        cursor.close()
+
+    event.listen(engine, "connect", set_pragmas)
+
+
+def create_memory_engine(
+    path: Optional[str] = None, pragmas: Optional[Dict[str, Any]] = None
+) -> Engine:
+    """Create an engine for an in memory SQLite database shared by all
+    threads, copying the database at path into it if path exists.
+
+    Args:
+        path (Optional[str]): Path to SQLite database file. Defaults to None.
+        pragmas (Optional[Dict[str, Any]]): Dictionary of pragmas. Defaults to None.
+
+    Returns:
+        Engine: SQLAlchemy engine
+    """
+    engine = create_engine(
+        "sqlite://",
+        poolclass=StaticPool,
+        connect_args={"check_same_thread": False},
+        echo=False,
+    )
+    if pragmas:
+        apply_sqlite_pragmas(engine, pragmas)
+    if path and exists(path):
+        source = sqlite3.connect(path)
+        try:
+            with engine.connect() as connection:
+                source.backup(connection.connection.driver_connection)
+        finally:
+            source.close()
+        logger.info(f"Copied {path} into memory")
+    return engine
+
+
+def backup_to_file(engine: Engine, path: str) -> None:
+    """Back up a SQLite database (eg. an in memory one) to a file.
+
+    Args:
+        engine (Engine): SQLAlchemy engine
+        path (str): Path to SQLite database file
+
+    Returns:
+        None
+    """
+    destination = sqlite3.connect(path)
+    try:
+        with engine.connect() as connection:
+            connection.connection.driver_connection.backup(destination)
+    finally:
+        destination.close()
+    logger.info(f"Backed up database to {path}")
@@ -0,0 +1,285 @@
+"""Statement and lock timeouts and cancellation of running statements"""
+
+import logging
+import threading
+import time
+from contextlib import contextmanager
+from typing import Any, Iterator, Optional
+
+from sqlalchemy import Connection, Engine, event
+from sqlalchemy.orm import Session
+
+logger = logging.getLogger(__name__)
+
+# Number of SQLite virtual machine instructions between deadline checks
+SQLITE_PROGRESS_STEPS = 1000
+# Python's sqlite3 default busy timeout in seconds
+SQLITE_BUSY_TIMEOUT = 5.0
+
+
+def _milliseconds(seconds: Optional[float]) -> int:
+    # 0 disables timeouts in PostgreSQL and busy waiting in SQLite
+    if seconds is None:
+        return 0
+    return max(int(seconds * 1000), 1)
+
+
+class StatementTimeouts:
+    """Applies default statement and lock timeouts to every connection
+    checked out from an engine, allows them to be overridden per session and
+    tracks the connections sessions are using so that their running
+    statements can be cancelled from another thread.
+
+    In PostgreSQL, statement_timeout and lock_timeout are set. In SQLite,
+    lock_timeout sets busy_timeout and the statement timeout is enforced by a
+    progress handler that interrupts statements running past their deadline.
+
+    Args:
+        engine (Engine): SQLAlchemy engine
+        statement_timeout (Optional[float]): Default statement timeout in seconds. Defaults to None.
+        lock_timeout (Optional[float]): Default lock timeout in seconds. Defaults to None.
+    """
+
+    def __init__(
+        self,
+        engine: Engine,
+        statement_timeout: Optional[float] = None,
+        lock_timeout: Optional[float] = None,
+    ) -> None:
+        self.engine = engine
+        self.dialect = engine.dialect.name
+        self.statement_timeout = statement_timeout
+        self.lock_timeout = lock_timeout
+        self._active = {}
+        self._lock = threading.Lock()
+        event.listen(engine, "checkout", self._checkout)
+        event.listen(engine, "checkin", self._checkin)
+        if self.dialect == "sqlite":
+            event.listen(engine, "before_cursor_execute", self._set_deadline)
+
+    def remove(self) -> None:
+        """Remove event listeners from engine.
+
+        Returns:
+            None
+        """
+        event.remove(self.engine, "checkout", self._checkout)
+        event.remove(self.engine, "checkin", self._checkin)
+        if self.dialect == "sqlite":
+            event.remove(self.engine, "before_cursor_execute", self._set_deadline)
+
+    def _checkout(
+        self, dbapi_connection: Any, connection_record: Any, connection_proxy: Any
+    ) -> None:
+        info = connection_record.info
+        if "hdx_timeouts" not in info:
+            self._prepare(dbapi_connection, info)
+            if self.statement_timeout is not None or self.lock_timeout is not None:
+                self._apply(
+                    dbapi_connection, info, self.statement_timeout, self.lock_timeout
+                )
+                if self.dialect == "postgresql":
+                    # Make the settings outlive the reset on return to the pool
+                    dbapi_connection.commit()
+        with self._lock:
+            self._active[id(dbapi_connection)] = dbapi_connection
+
+    def _checkin(self, dbapi_connection: Any, connection_record: Any) -> None:
+        if dbapi_connection is None:
+            return
+        with self._lock:
+            self._active.pop(id(dbapi_connection), None)
+        timeouts = connection_record.info.get("hdx_timeouts")
+        if timeouts and timeouts.pop("override", False):
+            # In PostgreSQL, SET LOCAL has been undone by the reset on return
+            if self.dialect == "sqlite":
+                self._apply(
+                    dbapi_connection,
+                    connection_record.info,
+                    self.statement_timeout,
+                    self.lock_timeout,
+                )
+            else:
+                timeouts["statement_timeout"] = self.statement_timeout
+                timeouts["lock_timeout"] = self.lock_timeout
+
+    def _prepare(self, dbapi_connection: Any, info: dict) -> None:
+        timeouts = {}
+        info["hdx_timeouts"] = timeouts
+        if self.dialect != "sqlite":
+            return
+
+        def handler() -> bool:
+            deadline = timeouts.get("deadline")
+            return deadline is not None and time.monotonic() > deadline
+
+        dbapi_connection.set_progress_handler(handler, SQLITE_PROGRESS_STEPS)
+
+    def _set_deadline(
+        self,
+        connection: Connection,
+        cursor: Any,
+        statement: str,
+        parameters: Any,
+        context: Any,
+        executemany: bool,
+    ) -> None:
+        timeouts = connection.info.get("hdx_timeouts")
+        if timeouts is None:
+            return
+        seconds = timeouts.get("statement_timeout")
+        if seconds is None:
+            timeouts["deadline"] = None
+        else:
+            timeouts["deadline"] = time.monotonic() + seconds
+
+    def _apply(
+        self,
+        dbapi_connection: Any,
+        info: dict,
+        statement_timeout: Optional[float],
+        lock_timeout: Optional[float],
+        local: bool = False,
+    ) -> None:
+        timeouts = info["hdx_timeouts"]
+        timeouts["statement_timeout"] = statement_timeout
+        timeouts["lock_timeout"] = lock_timeout
+        cursor = dbapi_connection.cursor()
+        if self.dialect == "postgresql":
+            command = "SET LOCAL" if local else "SET"
+            cursor.execute(
+                f"{command} statement_timeout = {_milliseconds(statement_timeout)}"
+            )
+            cursor.execute(f"{command} lock_timeout = {_milliseconds(lock_timeout)}")
+        elif self.dialect == "sqlite":
+            if lock_timeout is None:
+                lock_timeout = SQLITE_BUSY_TIMEOUT
+            cursor.execute(f"PRAGMA busy_timeout = {_milliseconds(lock_timeout)}")
+        cursor.close()
+
+    def add_session(self, session: Session) -> None:
+        """Track the connection a session is using so that timeout overrides
+        can be applied to it when its transactions begin and its running
+        statement can be cancelled.
+
+        Args:
+            session (Session): SQLAlchemy session
+
+        Returns:
+            None
+        """
+        if not event.contains(session, "after_begin", self._after_begin):
+            event.listen(session, "after_begin", self._after_begin)
+            event.listen(session, "after_transaction_end", self._after_transaction_end)
+
+    def _after_begin(
+        self, session: Session, transaction: Any, connection: Connection
+    ) -> None:
+        dbapi_connection = connection.connection.dbapi_connection
+        session.info["hdx_connection"] = (connection, dbapi_connection)
+        override = session.info.get("hdx_timeouts")
+        if override is not None:
+            self._override(dbapi_connection, connection.info, *override)
+
+    def _after_transaction_end(self, session: Session, transaction: Any) -> None:
+        if transaction.parent is None:
+            session.info.pop("hdx_connection", None)
+
+    def _override(
+        self,
+        dbapi_connection: Any,
+        info: dict,
+        statement_timeout: Optional[float],
+        lock_timeout: Optional[float],
+    ) -> None:
+        if "hdx_timeouts" not in info:
+            self._prepare(dbapi_connection, info)
+        self._apply(dbapi_connection, info, statement_timeout, lock_timeout, True)
+        # Restored when the connection is returned to the pool
+        info["hdx_timeouts"]["override"] = True
+
+    @contextmanager
+    def timeout(
+        self,
+        session: Session,
+        statement_timeout: Optional[float] = None,
+        lock_timeout: Optional[float] = None,
+    ) -> Iterator[Session]:
+        """Context manager that overrides the statement and lock timeouts of
+        the transactions of a session begun within it including the current
+        one, restoring the previous timeouts on exit. The override is kept in
+        session.info and applied when each transaction begins, so it
+        continues after a commit or rollback within the block. In PostgreSQL,
+        the override is made with SET LOCAL. Statements running past their
+        timeout raise sqlalchemy.exc.OperationalError.
+
+        Args:
+            session (Session): SQLAlchemy session
+            statement_timeout (Optional[float]): Statement timeout in seconds. Defaults to None (no timeout).
+            lock_timeout (Optional[float]): Lock timeout in seconds. Defaults to None (default lock timeout).
+
+        Returns:
+            Iterator[Session]: SQLAlchemy session
+        """
+        if lock_timeout is None:
+            lock_timeout = self.lock_timeout
+        self.add_session(session)
+        previous = session.info.get("hdx_timeouts")
+        session.info["hdx_timeouts"] = (statement_timeout, lock_timeout)
+        current = session.info.get("hdx_connection")
+        if current is not None:
+            connection, dbapi_connection = current
+            self._override(
+                dbapi_connection, connection.info, statement_timeout, lock_timeout
+            )
+        error = False
+        try:
+            yield session
+        except BaseException:
+            error = True
+            raise
+        finally:
+            if previous is None:
+                session.info.pop("hdx_timeouts", None)
+                previous = (self.statement_timeout, self.lock_timeout)
+            else:
+                session.info["hdx_timeouts"] = previous
+            # Only the connection of the transaction in progress if any needs
+            # restoring as others were restored when returned to the pool
+            current = session.info.get("hdx_connection")
+            if current is not None:
+                connection, dbapi_connection = current
+                if error and self.dialect == "postgresql":
+                    # The transaction must be rolled back which undoes SET LOCAL
+                    timeouts = connection.info["hdx_timeouts"]
+                    timeouts["statement_timeout"], timeouts["lock_timeout"] = previous
+                else:
+                    self._override(dbapi_connection, connection.info, *previous)
+
+    def cancel(self, session: Session) -> int:
+        """Cancel the statement running on the connection a session added
+        with add_session is using. This is intended to be called from another
+        thread. In PostgreSQL, a cancel request is sent to the server. In
+        SQLite, the connection is interrupted. A cancelled statement raises
+        sqlalchemy.exc.OperationalError in the thread running it.
+
+        Args:
+            session (Session): SQLAlchemy session
+
+        Returns:
+            int: Number of connections cancelled (0 or 1)
+        """
+        current = session.info.get("hdx_connection")
+        if current is None:
+            return 0
+        dbapi_connection = current[1]
+        with self._lock:
+            # The connection must still be in use
+            if self._active.get(id(dbapi_connection)) is not dbapi_connection:
+                return 0
+            if self.dialect == "sqlite":
+                dbapi_connection.interrupt()
+            else:
+                dbapi_connection.cancel()
+        logger.info("Cancelled running statement")
+        return 1
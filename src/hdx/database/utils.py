@@ -1,6 +1,14 @@
 """Other utilities"""
 
+import bz2
+import gzip
+import lzma
 import re
+from typing import IO, Any, Optional
+
+from sqlalchemy import Column
+
+COMPRESSION_SUFFIXES = {".gz": "gzip", ".xz": "xz", ".bz2": "bz2"}
 
 
 def camel_to_snake_case(string: str) -> str:
@@ -15,3 +23,50 @@ def camel_to_snake_case(string: str) -> str:
     """
     string = re.sub(r"((?<=[a-z0-9])[A-Z]|(?!^)[A-Z](?=[a-z]))", r"_\1", string)
     return string.lower().lstrip("_")
+
+
+def get_python_type(column: Column) -> Optional[Any]:
+    """Get the Python type of values of a column. For type decorators like
+    ConversionNoTZ, the Python type of the underlying type is returned.
+
+    Args:
+        column (Column): SQLAlchemy column
+
+    Returns:
+        Optional[Any]: Python type or None if it cannot be determined
+    """
+    column_type = getattr(column.type, "impl_instance", column.type)
+    try:
+        return column_type.python_type
+    except NotImplementedError:
+        return None
+
+
+def open_compressed(path: str, mode: str, compression: Optional[str] = None) -> IO:
+    """Open a binary file, compressing or decompressing with gzip, xz or bz2
+    if compression is given or inferred from the file extension.
+
+    Args:
+        path (str): Path to file
+        mode (str): Mode eg. "rb" or "wb"
+        compression (Optional[str]): gzip, xz, bz2 or None. Defaults to None (infer from extension).
+
+    Returns:
+        IO: File object
+    """
+    if compression is None:
+        for suffix, value in COMPRESSION_SUFFIXES.items():
+            if path.endswith(suffix):
+                compression = value
+                break
+    match compression:
+        case None:
+            return open(path, mode)
+        case "gzip":
+            return gzip.open(path, mode)
+        case "xz":
+            return lzma.open(path, mode)
+        case "bz2":
+            return bz2.open(path, mode)
+        case _:
+            raise ValueError(f"Unknown compression {compression}!")
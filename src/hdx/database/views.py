@@ -43,6 +43,25 @@ def view_doesnt_exist(ddl, target, connection, **kw):
     return not view_exists(ddl, target, connection, **kw)
 
 
+def mark_reflected_views(metadata, bind, schema=None):
+    """Mark tables of metadata reflected from views so that the query cache
+    treats them as depending on every table.
+
+    Args:
+        metadata (MetaData): Reflected metadata
+        bind (Union[Engine, Connection]): SQLAlchemy engine or connection
+        schema (Optional[str]): Schema reflected. Defaults to None.
+
+    Returns:
+        None
+    """
+    for name in sa.inspect(bind).get_view_names(schema=schema):
+        key = f"{schema}.{name}" if schema else name
+        table = metadata.tables.get(key)
+        if table is not None:
+            table.info["view"] = None
+
+
 def view(name, metadata, selectable):
     t = sa.table(
         name,
@@ -52,6 +71,8 @@ def view(name, metadata, selectable):
         ),
     )
     t.primary_key.update(c for c in t.c if c.primary_key)
+    # Lets the query cache find the tables the view depends on
+    t.info = {"view": selectable}
 
     sa.event.listen(
         metadata,
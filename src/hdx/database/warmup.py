@@ -0,0 +1,131 @@
+"""Warming up connection pools, catalog caches and shared buffers"""
+
+import logging
+import time
+from concurrent.futures import ThreadPoolExecutor
+from typing import Dict, List, Optional, Sequence, Union
+
+from sqlalchemy import Connection, Engine, Executable, text
+from sqlalchemy.exc import SQLAlchemyError
+from sqlalchemy.pool import QueuePool
+
+logger = logging.getLogger(__name__)
+
+
+def get_pool_size(engine: Engine) -> int:
+    """Get the number of connections kept by the engine's pool or 1 if the
+    pool does not keep connections (eg. NullPool).
+
+    Args:
+        engine (Engine): SQLAlchemy engine
+
+    Returns:
+        int: Pool size
+    """
+    size = getattr(engine.pool, "size", None)
+    if size is None:
+        return 1
+    return size()
+
+
+def get_pool_capacity(engine: Engine) -> Optional[int]:
+    """Get the maximum number of connections that the engine's pool can have
+    checked out at once (pool size plus maximum overflow) or None if there is
+    no limit.
+
+    Args:
+        engine (Engine): SQLAlchemy engine
+
+    Returns:
+        Optional[int]: Pool capacity or None if unlimited
+    """
+    pool = engine.pool
+    if not isinstance(pool, QueuePool) or pool._max_overflow < 0:
+        return None
+    return pool.size() + pool._max_overflow
+
+
+def _run_queries(
+    connection: Connection, queries: Sequence[Union[str, Executable]]
+) -> None:
+    for query in queries:
+        if isinstance(query, str):
+            query = text(query)
+        connection.execute(query).all()
+    connection.rollback()
+
+
+def warm_connections(
+    engine: Engine,
+    connections: int,
+    queries: Optional[Sequence[Union[str, Executable]]] = None,
+) -> Dict[str, float]:
+    """Open connections in parallel so that they are kept by the engine's
+    pool and run warmup queries on each of them (eg. to populate per
+    connection catalog caches). All connections are held open until every one
+    has been opened so that they are distinct, so connections cannot be more
+    than the pool capacity (see get_pool_capacity).
+
+    Args:
+        engine (Engine): SQLAlchemy engine
+        connections (int): Number of connections
+        queries (Optional[Sequence[Union[str, Executable]]]): Warmup queries. Defaults to None.
+
+    Returns:
+        Dict[str, float]: Time in seconds taken to connect and run queries
+    """
+    capacity = get_pool_capacity(engine)
+    if capacity is not None and connections > capacity:
+        raise ValueError(
+            f"Cannot open {connections} connections at once as the pool capacity is {capacity}!"
+        )
+    opened: List[Connection] = []
+    timings = {}
+    with ThreadPoolExecutor(max_workers=connections) as executor:
+        start = time.perf_counter()
+        try:
+            futures = [executor.submit(engine.connect) for _ in range(connections)]
+            for future in futures:
+                opened.append(future.result())
+            timings["connect"] = time.perf_counter() - start
+            if queries:
+                start = time.perf_counter()
+                futures = [
+                    executor.submit(_run_queries, connection, queries)
+                    for connection in opened
+                ]
+                for future in futures:
+                    future.result()
+                timings["queries"] = time.perf_counter() - start
+        finally:
+            for connection in opened:
+                connection.close()
+    return timings
+
+
+def prewarm_relations(engine: Engine, relations: Sequence[str]) -> None:
+    """Load tables and indexes into PostgreSQL shared buffers with the
+    pg_prewarm extension, which must be installed in the database. For other
+    dialects, nothing is done. Failures are logged rather than raised as
+    warming up is not essential. The number of blocks loaded for each
+    relation is logged.
+
+    Args:
+        engine (Engine): SQLAlchemy engine
+        relations (Sequence[str]): Names of tables and indexes (optionally schema qualified)
+
+    Returns:
+        None
+    """
+    if engine.dialect.name != "postgresql":
+        return
+    statement = text("SELECT pg_prewarm(CAST(:relation AS regclass))")
+    with engine.connect() as connection:
+        for relation in relations:
+            try:
+                blocks = connection.execute(statement, {"relation": relation}).scalar()
+                connection.commit()
+                logger.info(f"Prewarmed {blocks} blocks of {relation}")
+            except SQLAlchemyError as ex:
+                connection.rollback()
+                logger.warning(f"Could not prewarm {relation}: {ex}")
@@ -1,9 +1,9 @@
 import subprocess
-from collections import namedtuple
 
 import psycopg
 import pytest
 from sqlalchemy.exc import SQLAlchemyError
+from sqlalchemy.orm import Session
 from sshtunnel import SSHTunnelForwarder
 
 from . import PsycopgConnection
@@ -45,14 +45,8 @@ def mock_SSHTunnelForwarder(monkeypatch):
         TestDatabase.stopped = True
 
     def create_session(_, engine, table_base, reflect):
-        class Session:
-            bind = namedtuple("Bind", "engine")
-
-            def close(self):
-                return None
-
-        Session.bind.engine = engine
-        return Session(), table_base
+        # The session does not connect until it is used
+        return Session(engine), table_base
 
     try:
         monkeypatch.setattr(SSHTunnelForwarder, "__init__", init)
@@ -102,16 +96,20 @@ def mock_engine():
 def mock_subprocess(monkeypatch):
     class CompletedProcess:
         stdout = "WORKED!"
+        args = None
+        kwargs = None
 
         @staticmethod
         def check_returncode():
             return
 
     def run(*args, **kwargs):
+        CompletedProcess.args = args[0]
+        CompletedProcess.kwargs = kwargs
         return CompletedProcess()
 
     try:
         monkeypatch.setattr(subprocess, "run", run)
-        yield
+        yield CompletedProcess
     finally:
         monkeypatch.delattr(subprocess, "run")
@@ -0,0 +1,55 @@
+"""SQLAlchemy classes representing partitioned rows. Hold test data for a
+time series partitioned by month and values partitioned by country."""
+
+from datetime import datetime
+
+from sqlalchemy.orm import Mapped, mapped_column
+
+from hdx.database.no_timezone import Base
+from hdx.database.partitioning import partition_by_list, partition_by_range
+
+
+class DBTestSeries(Base):
+    """
+    __table_args__ = partition_by_range("date", "month", info={"source": "test"})
+
+    id: Mapped[int] = mapped_column(primary_key=True)
+    date: Mapped[datetime] = mapped_column(primary_key=True)
+    value: Mapped[float] = mapped_column()
+    """
+
+    __table_args__ = partition_by_range("date", "month", info={"source": "test"})
+
+    id: Mapped[int] = mapped_column(primary_key=True)
+    date: Mapped[datetime] = mapped_column(primary_key=True)
+    value: Mapped[float] = mapped_column()
+
+    def __repr__(self) -> str:
+        """String representation of DBTestSeries row
+
+        Returns:
+            str: String representation of DBTestSeries row
+        """
+        return f"<Test series id={self.id}, date={str(self.date)}, value={self.value}>"
+
+
+class DBTestCountry(Base):
+    """
+    __table_args__ = partition_by_list("country")
+
+    id: Mapped[int] = mapped_column(primary_key=True)
+    country: Mapped[str] = mapped_column(primary_key=True)
+    """
+
+    __table_args__ = partition_by_list("country")
+
+    id: Mapped[int] = mapped_column(primary_key=True)
+    country: Mapped[str] = mapped_column(primary_key=True)
+
+    def __repr__(self) -> str:
+        """String representation of DBTestCountry row
+
+        Returns:
+            str: String representation of DBTestCountry row
+        """
+        return f"<Test country id={self.id}, country={self.country}>"
@@ -0,0 +1,87 @@
+"""SQLAlchemy classes representing related rows. Hold test data for regions,
+locations within them, sources and readings taken at locations from sources."""
+
+from sqlalchemy import ForeignKey
+from sqlalchemy.orm import Mapped, mapped_column
+
+from hdx.database.no_timezone import Base
+
+
+class DBTestRegion(Base):
+    """
+    id: Mapped[int] = mapped_column(primary_key=True)
+    name: Mapped[str] = mapped_column()
+    """
+
+    id: Mapped[int] = mapped_column(primary_key=True)
+    name: Mapped[str] = mapped_column()
+
+    def __repr__(self) -> str:
+        """String representation of DBTestRegion row
+
+        Returns:
+            str: String representation of DBTestRegion row
+        """
+        return f"<Test region id={self.id}, name={self.name}>"
+
+
+class DBTestLocation(Base):
+    """
+    id: Mapped[int] = mapped_column(primary_key=True)
+    region_id: Mapped[int] = mapped_column(ForeignKey("db_test_region.id"))
+    parent_id: Mapped[int] = mapped_column(
+        ForeignKey("db_test_location.id"), nullable=True
+    )
+    """
+
+    id: Mapped[int] = mapped_column(primary_key=True)
+    region_id: Mapped[int] = mapped_column(ForeignKey("db_test_region.id"))
+    parent_id: Mapped[int] = mapped_column(
+        ForeignKey("db_test_location.id"), nullable=True
+    )
+
+    def __repr__(self) -> str:
+        """String representation of DBTestLocation row
+
+        Returns:
+            str: String representation of DBTestLocation row
+        """
+        return f"<Test location id={self.id}, region_id={self.region_id}, parent_id={self.parent_id}>"
+
+
+class DBTestSource(Base):
+    """
+    id: Mapped[int] = mapped_column(primary_key=True)
+    """
+
+    id: Mapped[int] = mapped_column(primary_key=True)
+
+    def __repr__(self) -> str:
+        """String representation of DBTestSource row
+
+        Returns:
+            str: String representation of DBTestSource row
+        """
+        return f"<Test source id={self.id}>"
+
+
+class DBTestReading(Base):
+    """
+    id: Mapped[int] = mapped_column(primary_key=True)
+    location_id: Mapped[int] = mapped_column(ForeignKey("db_test_location.id"))
+    source_id: Mapped[int] = mapped_column(ForeignKey("db_test_source.id"))
+    value: Mapped[float] = mapped_column()
+    """
+
+    id: Mapped[int] = mapped_column(primary_key=True)
+    location_id: Mapped[int] = mapped_column(ForeignKey("db_test_location.id"))
+    source_id: Mapped[int] = mapped_column(ForeignKey("db_test_source.id"))
+    value: Mapped[float] = mapped_column()
+
+    def __repr__(self) -> str:
+        """String representation of DBTestReading row
+
+        Returns:
+            str: String representation of DBTestReading row
+        """
+        return f"<Test reading id={self.id}, location_id={self.location_id}, value={self.value}>"
@@ -0,0 +1,67 @@
+"""SQLAlchemy class representing DBTestValue row. Holds test data for values."""
+
+from datetime import datetime, timezone
+from typing import Any, Callable, Dict, List, Union
+
+from sqlalchemy.orm import Mapped, mapped_column
+
+from hdx.database.no_timezone import Base
+
+NOW = datetime(2024, 1, 1, tzinfo=timezone.utc)
+
+
+class DBTestValue(Base):
+    """
+    id: Mapped[int] = mapped_column(primary_key=True)
+    name: Mapped[str] = mapped_column()
+    value: Mapped[float] = mapped_column()
+    updated: Mapped[datetime] = mapped_column()
+    """
+
+    id: Mapped[int] = mapped_column(primary_key=True)
+    name: Mapped[str] = mapped_column()
+    value: Mapped[float] = mapped_column()
+    updated: Mapped[datetime] = mapped_column()
+
+    def __repr__(self) -> str:
+        """String representation of DBTestValue row
+
+        Returns:
+            str: String representation of DBTestValue row
+        """
+        return f"<Test value id={self.id}, name={self.name}, value={self.value}>"
+
+
+def make_rows(
+    start: int,
+    stop: int,
+    name: Union[str, Callable[[int], str]] = "a",
+    value: Union[float, Callable[[int], float]] = 1.0,
+    updated: Union[datetime, Callable[[int], datetime]] = NOW,
+) -> List[Dict[str, Any]]:
+    """Make DBTestValue rows with ids from start to stop (exclusive). name,
+    value and updated can be constants or functions of the id.
+
+    Args:
+        start (int): First id
+        stop (int): Id after the last
+        name (Union[str, Callable[[int], str]]): Name. Defaults to "a".
+        value (Union[float, Callable[[int], float]]): Value. Defaults to 1.0.
+        updated (Union[datetime, Callable[[int], datetime]]): Updated. Defaults to NOW.
+
+    Returns:
+        List[Dict[str, Any]]: DBTestValue rows
+    """
+
+    def get(field: Any, i: int) -> Any:
+        return field(i) if callable(field) else field
+
+    return [
+        {
+            "id": i,
+            "name": get(name, i),
+            "value": get(value, i),
+            "updated": get(updated, i),
+        }
+        for i in range(start, stop)
+    ]
@@ -0,0 +1,79 @@
+"""Batching Utility Tests"""
+
+import sqlite3
+from os.path import exists, join
+
+from sqlalchemy.exc import OperationalError, ProgrammingError
+
+from hdx.database.batching import (
+    SQLITE_MAX_VARIABLES,
+    AdaptiveBatchSizer,
+    Checkpoint,
+    get_max_batch_size,
+    is_transient_error,
+)
+
+
+class TestBatching:
+    def test_get_max_batch_size(self):
+        assert get_max_batch_size("postgresql", 10) == 6553
+        assert get_max_batch_size("postgresql", 100000) == 1
+        assert get_max_batch_size("sqlite", 2) == SQLITE_MAX_VARIABLES // 2
+        assert get_max_batch_size("mysql", 10) is None
+
+    def test_adaptive_batch_sizer(self):
+        sizer = AdaptiveBatchSizer("postgresql", 100, initial_batch_size=1000)
+        assert sizer.max_batch_size == 655
+        assert sizer.next_batch_size() == 655
+        sizer.record(655, 2.0)
+        assert sizer.next_batch_size() == 327
+        sizer.record(327, 0.1)
+        assert sizer.next_batch_size() == 654
+        sizer.record(654, 0.0)
+        assert sizer.next_batch_size() == 655
+        sizer.record(20, 5.0)
+        assert sizer.next_batch_size() == 655
+        metrics = sizer.metrics
+        assert metrics["batch_sizes"] == [655, 327, 654, 20]
+        assert metrics["rows"] == 1656
+        assert metrics["adaptive"] is True
+
+        sizer = AdaptiveBatchSizer(
+            "postgresql", 100, initial_batch_size=1000, adaptive=False
+        )
+        assert sizer.max_batch_size is None
+        sizer.record(1000, 10.0)
+        assert sizer.next_batch_size() == 1000
+
+        sizer = AdaptiveBatchSizer(
+            "mysql", 5, initial_batch_size=100, min_batch_size=50
+        )
+        sizer.record(100, 100.0)
+        assert sizer.next_batch_size() == 50
+
+    def test_is_transient_error(self):
+        error = sqlite3.OperationalError("database is locked")
+        assert is_transient_error(OperationalError("INSERT", {}, error)) is True
+        error = sqlite3.OperationalError("no such table: x")
+        assert is_transient_error(OperationalError("INSERT", {}, error)) is False
+
+        class SerializationFailure(Exception):
+            sqlstate = "40001"
+
+        error = SerializationFailure("could not serialize access")
+        assert is_transient_error(ProgrammingError("INSERT", {}, error)) is True
+        error = OperationalError("INSERT", {}, Exception("closed"))
+        error.connection_invalidated = True
+        assert is_transient_error(error) is True
+        assert is_transient_error(ValueError("database is locked")) is False
+
+    def test_checkpoint(self, tmp_path):
+        path = join(tmp_path, "checkpoint.json")
+        checkpoint = Checkpoint(path, "table1")
+        assert checkpoint.load() == 0
+        checkpoint.save(2000)
+        assert checkpoint.load() == 2000
+        assert Checkpoint(path, "table2").load() == 0
+        checkpoint.clear()
+        assert exists(path) is False
+        checkpoint.clear()
@@ -0,0 +1,63 @@
+"""Bulk Delete and Update Tests"""
+
+from os.path import join
+
+import pytest
+from sqlalchemy import func, select
+
+from .dbtestdate import DBTestDate
+from .dbtestvalue import DBTestValue, make_rows
+from hdx.database import Database
+from hdx.database.batching import SQLITE_MAX_VARIABLES
+from hdx.database.bulk import get_chunk_size, get_key_columns
+
+
+class TestBulk:
+    def test_get_key_columns(self):
+        assert get_key_columns(DBTestValue.__table__, None) == ["id"]
+        assert get_key_columns(DBTestValue.__table__, ("id", "name")) == ["id", "name"]
+        assert get_key_columns(DBTestDate.__table__, None) == ["test_date"]
+
+    def test_get_chunk_size(self):
+        assert get_chunk_size("postgresql", 2) == 100000
+        assert get_chunk_size("postgresql", 1, chunk_size=500) == 500
+        assert get_chunk_size("sqlite", 1) == SQLITE_MAX_VARIABLES
+        assert get_chunk_size("sqlite", 2, 2) == (SQLITE_MAX_VARIABLES - 2) // 2
+        assert get_chunk_size("sqlite", 1, chunk_size=10) == 10
+        assert get_chunk_size("mysql", 1) == 1000
+
+    def test_delete_update_by_keys(self, tmp_path):
+        dbpath = join(tmp_path, "test_bulk.db")
+        with Database(database=dbpath, port=None, dialect="sqlite") as database:
+            rows = make_rows(0, 100, name=lambda i: f"n{i % 3}")
+            database.batch_populate(rows, DBTestValue)
+            session = database.get_session()
+
+            count = database.delete_by_keys(
+                DBTestValue, (i for i in range(0, 100, 2)), chunk_size=7
+            )
+            assert count == 50
+            assert session.scalar(select(func.count(DBTestValue.id))) == 50
+            assert database.delete_by_keys(DBTestValue, [0, 2, 1000]) == 0
+
+            keys = [(1, "n1"), (3, "n1"), (5, "n2"), (7, "n1")]
+            count = database.update_by_keys(
+                DBTestValue,
+                keys,
+                {"value": 2.0},
+                key_columns=["id", "name"],
+                chunk_size=3,
+            )
+            # (3, "n1") does not match as 3 % 3 == 0
+            assert count == 3
+            statement = select(DBTestValue.id).where(DBTestValue.value == 2.0)
+            assert session.scalars(statement).all() == [1, 5, 7]
+
+            count = database.delete_by_keys(
+                DBTestValue, [(1, "n1"), (9, "n0")], key_columns=("id", "name")
+            )
+            assert count == 2
+            assert session.scalar(select(func.count(DBTestValue.id))) == 48
+
+            with pytest.raises(ValueError):
+                database.update_by_keys(DBTestValue, [1], {})
@@ -0,0 +1,176 @@
+"""Query Cache Tests"""
+
+from datetime import datetime, timezone
+from os.path import join
+
+from sqlalchemy import func, select, table, text, update
+
+from .dbtestdate import DBTestDate, date_view_params
+from .dbtestvalue import NOW, DBTestValue, make_rows
+from hdx.database import Database
+from hdx.database.cache import (
+    ALL_TABLES,
+    QueryCache,
+    get_statement_tables,
+    get_written_tables,
+)
+from hdx.database.reflection import reflect_schema
+
+
+class TestCache:
+    now = datetime(2024, 1, 1, tzinfo=timezone.utc)
+
+    def test_query_cache(self, tmp_path, monkeypatch):
+        cache = QueryCache(max_entries=2, ttl=10)
+        cache.set("a", ["table1"], [1])
+        cache.set("b", ["table2"], [2])
+        assert cache.get("a") == [1]
+        cache.set("c", ["table1", "table2"], [3])
+        assert cache.get("b") is None
+        cache.invalidate(["public.table1"])
+        assert cache.get("a") is None
+        assert cache.get("c") is None
+        cache.set("d", ["table3"], [4])
+        cache.invalidate_sql('UPDATE "table3" SET x = 1')
+        assert cache.get("d") is None
+        cache.set("e", ["table3"], [5])
+        cache.invalidate_sql("SELECT * FROM table3")
+        assert cache.get("e") == [5]
+        cache.invalidate_sql("DROP TABLE table4")
+        assert cache.get("e") is None
+        cache.set("f", ["table3"], [6])
+        monkeypatch.setattr("time.time", lambda: 1e12)
+        assert cache.get("f") is None
+        assert cache.get_stats() == {
+            "hits": 2,
+            "misses": 6,
+            "hit_rate": 0.25,
+            "entries": 0,
+        }
+
+        path = join(tmp_path, "cache")
+        cache = QueryCache(path=path)
+        cache.set("a", ["table1"], [1])
+        cache.set("b", ["table2"], [2])
+        cache.close()
+        cache = QueryCache(path=path)
+        assert cache.get("a") == [1]
+        # The table index is rebuilt from the on disk store
+        cache.invalidate(["table2"])
+        assert cache.get("b") is None
+        assert cache.get("a") == [1]
+        cache.invalidate()
+        cache.close()
+        cache = QueryCache(path=path)
+        assert cache.get("a") is None
+        cache.close()
+
+    def test_writes(self):
+        assert get_written_tables('INSERT INTO "public"."t1" VALUES (1)') == {"t1"}
+        assert get_written_tables("DROP TABLE t1") == {ALL_TABLES}
+        assert get_written_tables("SELECT * FROM t1") == set()
+        cache = QueryCache()
+        cache.set("a", ["t1"], [1])
+        cache.set("b", ["t2"], [2])
+        version = cache.get_version(["t1"])
+        cache.begin_write(["t1"])
+        assert cache.get("a") is None
+        assert cache.get("b") == [2]
+        assert cache.get_version(["t1"]) is None
+        assert cache.get_version(["t2"]) is not None
+        # Rows read before or during a write are not cached
+        cache.set("a", ["t1"], [1], version)
+        assert cache.get("a") is None
+        cache.end_write(["t1"])
+        cache.set("a", ["t1"], [1], version)
+        assert cache.get("a") is None
+        version = cache.get_version(["t1"])
+        cache.set("a", ["t1"], [3], version)
+        assert cache.get("a") == [3]
+        cache.begin_write([ALL_TABLES])
+        assert cache.get_stats()["entries"] == 0
+        assert cache.get_version(["t2"]) is None
+        cache.end_write([ALL_TABLES])
+        assert cache.get_version(["t2"]) is not None
+
+    def test_execute_cached(self, tmp_path):
+        statement = select(DBTestValue.name).where(DBTestValue.value > 1)
+        assert get_statement_tables(statement) == {"db_test_value"}
+        dbpath = join(tmp_path, "test_cache.db")
+        with Database(
+            database=dbpath, port=None, dialect="sqlite", query_cache=True
+        ) as database:
+            rows = [
+                {"id": 1, "name": "a", "value": 1.0, "updated": self.now},
+                {"id": 2, "name": "b", "value": 2.0, "updated": self.now},
+            ]
+            database.batch_populate(rows, DBTestValue)
+            cache = database.get_query_cache()
+            assert database.execute_cached(statement) == [("b",)]
+            assert database.execute_cached(statement) == [("b",)]
+            assert cache.get_stats()["hits"] == 1
+            other = select(DBTestValue.name).where(DBTestValue.value > 0)
+            assert len(database.execute_cached(other)) == 2
+            assert cache.get_stats()["misses"] == 2
+
+            database.batch_populate(
+                [{"id": 3, "name": "c", "value": 3.0, "updated": self.now}],
+                DBTestValue,
+            )
+            assert database.execute_cached(statement) == [("b",), ("c",)]
+
+            session = database.get_session()
+            session.execute(update(DBTestValue).values(value=0))
+            session.commit()
+            assert database.execute_cached(statement) == []
+
+            # Uncommitted writes are neither cached nor left in the cache
+            session.execute(update(DBTestValue).values(value=99))
+            assert database.execute_cached(statement) == [("a",), ("b",), ("c",)]
+            session.rollback()
+            assert database.execute_cached(statement) == []
+            assert database.execute_cached(statement) == []
+
+            database.execute_cached(statement)
+            session.execute(text("DELETE FROM db_test_value"))
+            session.commit()
+            assert cache.get_stats()["entries"] == 0
+            database.invalidate_cache()
+
+        with Database(database=dbpath, port=None, dialect="sqlite") as database:
+            assert database.get_query_cache() is None
+            assert database.execute_cached(statement) == []
+            database.invalidate_cache(["db_test_value"])
+
+    def test_execute_cached_unknown_tables(self, tmp_path):
+        count = text("SELECT count(*) FROM db_test_value")
+        assert get_statement_tables(count) == {ALL_TABLES}
+        assert get_statement_tables(select(table("db_test_value"))) == {ALL_TABLES}
+        dbpath = join(tmp_path, "test_cache.db")
+        with Database(
+            database=dbpath,
+            port=None,
+            dialect="sqlite",
+            query_cache=True,
+            prepare_fn=lambda: Database.prepare_views([date_view_params]),
+        ) as database:
+            # Text statements depend on every table
+            database.batch_populate(make_rows(0, 3), DBTestValue)
+            assert database.execute_cached(count) == [(3,)]
+            database.batch_populate(make_rows(3, 6), DBTestValue)
+            assert database.execute_cached(count) == [(6,)]
+            database.delete_by_keys(DBTestValue, [0, 1])
+            assert database.execute_cached(count) == [(4,)]
+            assert database.execute_cached(count) == [(4,)]
+
+            # Views depend on the tables they select from
+            date_view = database.get_prepare_results()[0]
+            statement = select(func.count()).select_from(date_view)
+            assert get_statement_tables(statement) == {"date_view", "db_test_date"}
+            assert database.execute_cached(statement) == [(0,)]
+            database.batch_populate([{"test_date": NOW}], DBTestDate)
+            assert database.execute_cached(statement) == [(1,)]
+
+            metadata = reflect_schema(database.get_engine(), "main")
+            view = metadata.tables["main.date_view"]
+            assert get_statement_tables(select(view)) == {ALL_TABLES}
@@ -0,0 +1,170 @@
+"""Columnar Input Tests"""
+
+from array import array
+from datetime import datetime, timedelta, timezone
+from os.path import join
+from types import SimpleNamespace
+
+import pytest
+from sqlalchemy import Column, Integer, MetaData, Table, func, select
+from sqlalchemy.dialects.postgresql import psycopg
+
+from .dbtestvalue import DBTestValue
+from hdx.database import Database
+from hdx.database.columnar import (
+    get_columns,
+    get_num_rows,
+    has_missing_defaults,
+    insert_columns,
+    is_columnar,
+    slice_column,
+)
+
+
+class MockCopy:
+    def __init__(self, cursor, sql):
+        cursor.statements.append(sql)
+        self.rows = cursor.rows
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc_value, traceback):
+        return None
+
+    def write_row(self, row):
+        self.rows.append(row)
+
+
+class MockCursor:
+    def __init__(self):
+        self.statements = []
+        self.rows = []
+        self.closed = False
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc_value, traceback):
+        self.closed = True
+
+    def copy(self, sql):
+        return MockCopy(self, sql)
+
+
+class MockConnection:
+    dialect = psycopg.dialect()
+
+    def __init__(self):
+        self.cursor = MockCursor()
+        self.connection = SimpleNamespace(
+            driver_connection=SimpleNamespace(cursor=lambda: self.cursor)
+        )
+        self.executed = []
+
+    def execute(self, statement, rows):
+        self.executed.append((str(statement), rows))
+
+
+class TestColumnar:
+    start = datetime(2024, 1, 1, tzinfo=timezone.utc)
+
+    @pytest.fixture(scope="function")
+    def database(self, tmp_path):
+        dbpath = join(tmp_path, "test_columnar.db")
+        with Database(database=dbpath, port=None, dialect="sqlite") as database:
+            yield database
+
+    def test_columnar_utilities(self):
+        assert is_columnar([{"a": 1}]) is False
+        assert is_columnar({"a": [1]}) is True
+        columns = get_columns({"a": [1, 2], "b": array("d", [0.5, 1.5])})
+        assert get_num_rows(columns) == 2
+        assert get_num_rows({}) == 0
+        with pytest.raises(ValueError):
+            get_num_rows({"a": [1, 2], "b": [1]})
+        assert slice_column(columns["b"], 1, 2) == [1.5]
+        assert slice_column(range(5), 1, 3) == [1, 2]
+
+    def test_insert_columns_copy(self):
+        assert has_missing_defaults(DBTestValue.__table__, ["id"]) is False
+        connection = MockConnection()
+        columns = {
+            "id": [1, 2, 3],
+            "name": ["a", "b", "c"],
+            "updated": [self.start, self.start, None],
+        }
+        insert_columns(connection, DBTestValue.__table__, columns, 1, 3)
+        assert connection.cursor.statements == [
+            "COPY db_test_value (id, name, updated) FROM STDIN"
+        ]
+        # ConversionNoTZ is applied
+        assert connection.cursor.rows == [
+            (2, "b", datetime(2024, 1, 1)),
+            (3, "c", None),
+        ]
+        assert connection.cursor.closed is True
+        assert connection.executed == []
+
+        # Python side defaults of missing columns are not applied by COPY
+        table = Table(
+            "defaults",
+            MetaData(),
+            Column("id", Integer, primary_key=True),
+            Column("flag", Integer, default=7),
+        )
+        assert has_missing_defaults(table, ["id"]) is True
+        assert has_missing_defaults(table, ["id", "flag"]) is False
+        connection = MockConnection()
+        insert_columns(connection, table, {"id": [1, 2]}, 0, 2)
+        assert connection.cursor.statements == []
+        assert connection.executed[0][1] == [{"id": 1}, {"id": 2}]
+        insert_columns(connection, table, {"id": [1], "flag": [2]}, 0, 1)
+        assert connection.cursor.statements == ["COPY defaults (id, flag) FROM STDIN"]
+        assert connection.cursor.rows == [(1, 2)]
+
+    def test_batch_populate_columns(self, database):
+        num_rows = 25
+        columns = {
+            "id": range(num_rows),
+            "name": [f"name{i}" for i in range(num_rows)],
+            "value": array("d", (i / 2 for i in range(num_rows))),
+            "updated": [self.start + timedelta(i) for i in range(num_rows)],
+        }
+        database.batch_populate(columns, DBTestValue, batch_size=10)
+        assert database.get_batch_metrics()["batch_sizes"] == [10, 10, 5]
+        session = database.get_session()
+        row = session.execute(
+            select(DBTestValue).where(DBTestValue.id == 24)
+        ).scalar_one()
+        assert row.name == "name24"
+        assert row.value == 12.0
+        assert row.updated == self.start + timedelta(24)
+
+    def test_batch_populate_numpy(self, database):
+        np = pytest.importorskip("numpy")
+        columns = {
+            "id": np.arange(5),
+            "name": np.array(["a", "b", "c", "d", "e"]),
+            "value": np.linspace(0, 1, 5),
+            "updated": [self.start] * 5,
+        }
+        database.batch_populate(columns, DBTestValue, batch_size=2)
+        session = database.get_session()
+        assert session.execute(select(func.sum(DBTestValue.value))).scalar() == 2.5
+
+    def test_batch_populate_arrow(self, database):
+        pa = pytest.importorskip("pyarrow")
+        record_batch = pa.RecordBatch.from_pydict(
+            {
+                "id": [1, 2, 3],
+                "name": ["a", "b", "c"],
+                "value": [1.0, 2.0, 3.0],
+                "updated": [self.start + timedelta(i) for i in range(3)],
+            }
+        )
+        database.batch_populate(record_batch, DBTestValue, batch_size=2)
+        session = database.get_session()
+        rows = session.execute(select(DBTestValue).order_by(DBTestValue.id)).all()
+        assert [row[0].name for row in rows] == ["a", "b", "c"]
+        assert rows[2][0].updated == self.start + timedelta(2)
@@ -0,0 +1,87 @@
+"""Compact Row Tests"""
+
+from datetime import datetime, timezone
+from os.path import join
+from shutil import copyfile
+
+import pytest
+from sqlalchemy import select
+
+from .dbtestvalue import DBTestValue
+from hdx.database import Database
+from hdx.database.compact import get_attribute_names, make_row_class
+
+
+class TestCompact:
+    now = datetime(2024, 1, 1, tzinfo=timezone.utc)
+
+    def test_make_row_class(self):
+        assert get_attribute_names(["a", "class", "1b", "a", "_c"]) == [
+            "a",
+            "_1",
+            "_2",
+            "_3",
+            "_4",
+        ]
+        Row = make_row_class("Row", ["a", "b"])
+        row = Row(1, "x")
+        assert row.a == 1
+        assert row.b == "x"
+        assert not hasattr(row, "__dict__")
+        assert row == Row(1, "x")
+        assert row != Row(2, "x")
+        assert row != (1, "x")
+        assert repr(row) == "Row(a=1, b='x')"
+        assert row._astuple() == (1, "x")
+        Row = make_row_class("Row", ["a", "b"], "namedtuple")
+        assert Row(1, "x") == (1, "x")
+        with pytest.raises(ValueError):
+            make_row_class("Row", ["a"], "dict")
+
+    def test_read_compact(self, tmp_path):
+        dbpath = join(tmp_path, "test_compact.db")
+        with Database(database=dbpath, port=None, dialect="sqlite") as database:
+            rows = {
+                "id": range(5),
+                "name": list("abcde"),
+                "value": [0.5] * 5,
+                "updated": [self.now] * 5,
+            }
+            database.batch_populate(rows, DBTestValue)
+            results = list(database.read_compact(DBTestValue, batch_size=2))
+            assert len(results) == 5
+            assert type(results[0]).__name__ == "DbTestValue"
+            assert results[4].name == "e"
+            assert results[4].updated == self.now
+            results = list(
+                database.read_compact(
+                    select(DBTestValue.id, DBTestValue.updated).where(
+                        DBTestValue.id > 2
+                    ),
+                    row_type="namedtuple",
+                )
+            )
+            assert results == [(3, self.now), (4, self.now)]
+
+    def test_read_compact_reflected(self, tmp_path):
+        dbpath = join(tmp_path, "test_compact_reflect.db")
+        copyfile(join("tests", "fixtures", "test.db"), dbpath)
+        with Database(
+            database=dbpath, port=None, dialect="sqlite", reflect=True
+        ) as database:
+            Table1 = database.get_reflected_classes().table1
+            (row,) = database.read_compact(Table1)
+            assert row.col1 == "wfrefds"
+            assert row.date1 == datetime(
+                1993, 9, 23, 14, 12, 56, 111000, tzinfo=timezone.utc
+            )
+        with Database(
+            database=dbpath,
+            port=None,
+            dialect="sqlite",
+            reflect=True,
+            db_has_tz=True,
+        ) as database:
+            Table1 = database.get_reflected_classes().table1
+            (row,) = database.read_compact(Table1, row_type="namedtuple")
+            assert row.date1 == datetime(1993, 9, 23, 14, 12, 56, 111000)
@@ -1,15 +1,18 @@
 """Database Utility Tests"""
 
-from datetime import datetime, timezone
+import sqlite3
+from datetime import datetime, timedelta, timezone
 from os import remove
 from os.path import exists, join
 from tempfile import gettempdir
 
 import pytest
 from sqlalchemy import select
+from sqlalchemy.exc import OperationalError
 
 from .dbtestdate import DBTestDate, date_view_params
 from hdx.database import Database, DatabaseError
+from hdx.database.batching import SQLITE_MAX_VARIABLES
 from hdx.database.no_timezone import Base as NoTZBase
 
 
@@ -47,9 +50,78 @@ class TestDatabase:
             dbdatabase.batch_populate(rows, DBTestDate)
             dbtestdate = dbsession.execute(select(DBTestDate)).all()[1][0].test_date
             assert dbtestdate == now
+            metrics = dbdatabase.get_batch_metrics()
+            assert metrics["batch_sizes"] == [1]
+            assert metrics["adaptive"] is False
+
+            rows = [
+                {"test_date": datetime(2024, 1, 1, tzinfo=timezone.utc) + timedelta(i)}
+                for i in range(25)
+            ]
+            dbdatabase.batch_populate(rows, DBTestDate, batch_size=10, adaptive=True)
+            metrics = dbdatabase.get_batch_metrics()
+            assert sum(metrics["batch_sizes"]) == 25
+            assert metrics["batch_sizes"][0] == 10
+            assert metrics["max_batch_size"] == SQLITE_MAX_VARIABLES
+            assert len(dbsession.execute(select(DBTestDate)).all()) == 27
 
         remove(dbpath)
 
+    def test_batch_populate_resume(self, tmp_path, monkeypatch):
+        dbpath = join(tmp_path, "test_resume.db")
+        checkpoint_file = join(tmp_path, "checkpoint.json")
+        rows = [
+            {"test_date": datetime(2024, 1, 1, tzinfo=timezone.utc) + timedelta(i)}
+            for i in range(10)
+        ]
+        with Database(database=dbpath, port=None, dialect="sqlite") as dbdatabase:
+            dbsession = dbdatabase.get_session()
+            execute = dbsession.execute
+            calls = {"count": 0}
+
+            def failing_execute(*args, **kwargs):
+                calls["count"] += 1
+                if calls["count"] in fail_on:
+                    raise OperationalError(
+                        "INSERT", {}, sqlite3.OperationalError(error_message)
+                    )
+                return execute(*args, **kwargs)
+
+            monkeypatch.setattr(dbsession, "execute", failing_execute)
+            fail_on = (3,)
+            error_message = "no such table: db_test_date"
+            with pytest.raises(OperationalError):
+                dbdatabase.batch_populate(
+                    rows,
+                    DBTestDate,
+                    batch_size=2,
+                    commit_every=1,
+                    checkpoint_file=checkpoint_file,
+                )
+            assert len(execute(select(DBTestDate)).all()) == 4
+            assert exists(checkpoint_file)
+
+            calls["count"] = 0
+            fail_on = (2, 3)
+            error_message = "database is locked"
+            dbdatabase.batch_populate(
+                rows,
+                DBTestDate,
+                batch_size=2,
+                commit_every=2,
+                checkpoint_file=checkpoint_file,
+                retries=2,
+                retry_backoff=0,
+            )
+            assert dbdatabase.get_batch_metrics()["retries"] == 2
+            assert len(execute(select(DBTestDate)).all()) == 10
+            assert not exists(checkpoint_file)
+
+            calls["count"] = 0
+            fail_on = (1, 2)
+            with pytest.raises(OperationalError):
+                dbdatabase.batch_populate(rows, DBTestDate, retries=1, retry_backoff=0)
+
     def test_errors(self):
         with pytest.raises(DatabaseError):
             Database.create_session()
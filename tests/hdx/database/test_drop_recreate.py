@@ -1,3 +1,10 @@
+from datetime import datetime, timezone
+from os.path import join
+
+from sqlalchemy import func, inspect, select
+
+from .dbtestdate import DBTestDate, date_view_params
+from .dbtestvalue import DBTestValue
 from hdx.database import Database
 
 
@@ -13,3 +20,33 @@ def test_recreate_schema(mock_engine):
     assert Database.recreate_schema(mock_engine, db_uri) is True
     db_uri = "Error"
     assert Database.recreate_schema(mock_engine, db_uri) is False
+
+
+def test_truncate_schema(tmp_path):
+    def prepare_fn():
+        return Database.prepare_views([date_view_params])
+
+    dbpath = join(tmp_path, "test_truncate.db")
+    now = datetime(2024, 1, 1, tzinfo=timezone.utc)
+    with Database(
+        database=dbpath, port=None, dialect="sqlite", prepare_fn=prepare_fn
+    ) as database:
+        database.batch_populate([{"test_date": now}], DBTestDate)
+        rows = [{"id": i, "name": "a", "value": 1.0, "updated": now} for i in range(5)]
+        database.batch_populate(rows, DBTestValue)
+        engine = database.get_engine()
+        assert Database.truncate_schema(engine, batch_size=2, vacuum=True) is True
+        session = database.get_session()
+        assert session.execute(select(func.count(DBTestValue.id))).scalar() == 0
+        date_view = database.get_prepare_results()[0]
+        assert session.execute(select(date_view)).all() == []
+        assert "date_view" in inspect(engine).get_view_names()
+        database.batch_populate(rows, DBTestValue)
+        assert session.execute(select(func.count(DBTestValue.id))).scalar() == 5
+
+    with Database(
+        database=dbpath, port=None, dialect="sqlite", truncate_schema=True
+    ) as database:
+        session = database.get_session()
+        assert session.execute(select(func.count(DBTestValue.id))).scalar() == 0
+        assert Database.truncate_schema(database.get_engine(), "missing") is False
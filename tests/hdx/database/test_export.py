@@ -0,0 +1,145 @@
+"""Export Tests"""
+
+import csv
+import gzip
+from datetime import datetime, timedelta, timezone
+from os.path import join
+
+import pytest
+from sqlalchemy.dialects import postgresql
+
+from .dbtestdate import DBTestDate
+from .dbtestvalue import DBTestValue
+from hdx.database import Database, DatabaseError
+from hdx.database.export import open_output, shared_snapshot
+
+
+class MockResult:
+    def __init__(self, row):
+        self.row = row
+
+    def one(self):
+        return self.row
+
+    def scalar_one(self):
+        return self.row[0]
+
+
+class MockConnection:
+    def __init__(self):
+        self.options = {}
+        self.statements = []
+        self.closed = False
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *args):
+        self.closed = True
+
+    def execution_options(self, **options):
+        self.options.update(options)
+        return self
+
+    def exec_driver_sql(self, statement):
+        self.statements.append(statement)
+        return MockResult(("00000003-0000001B-1",))
+
+    def execute(self, statement):
+        self.statements.append(str(statement))
+        return MockResult((1, 10))
+
+
+class MockEngine:
+    dialect = postgresql.psycopg.dialect()
+
+    def __init__(self):
+        self.connection = MockConnection()
+
+    def connect(self):
+        return self.connection
+
+
+class TestExport:
+    start = datetime(2024, 1, 1, tzinfo=timezone.utc)
+
+    @pytest.fixture(scope="function")
+    def database(self, tmp_path):
+        dbpath = join(tmp_path, "test_export.db")
+        with Database(database=dbpath, port=None, dialect="sqlite") as database:
+            rows = {
+                "id": range(1, 101),
+                "name": [f"name{i}" for i in range(1, 101)],
+                "value": [i * 1.5 for i in range(1, 101)],
+                "updated": [self.start + timedelta(hours=i) for i in range(1, 101)],
+            }
+            database.batch_populate(rows, DBTestValue)
+            yield database
+
+    def test_open_output(self, tmp_path):
+        path = join(tmp_path, "test.csv.gz")
+        with open_output(path) as output:
+            output.write(b"a,b\n")
+        with gzip.open(path, "rt") as f:
+            assert f.read() == "a,b\n"
+        with pytest.raises(ValueError):
+            open_output(path, "zip")
+
+    def test_export_csv(self, database, tmp_path):
+        path = join(tmp_path, "test.csv")
+        assert database.export_table(DBTestValue, path, batch_size=30) == 100
+        with open(path, encoding="utf-8") as f:
+            rows = list(csv.reader(f))
+        assert rows[0] == ["id", "name", "value", "updated"]
+        assert rows[1] == ["1", "name1", "1.5", "2024-01-01 01:00:00+00:00"]
+        assert len(rows) == 101
+
+        path = join(tmp_path, "test.csv.gz")
+        assert (
+            database.export_table(DBTestValue, path, parallel=3, batch_size=10) == 100
+        )
+        with gzip.open(path, "rt", encoding="utf-8") as f:
+            rows = list(csv.reader(f))
+        assert rows[0] == ["id", "name", "value", "updated"]
+        assert sorted(int(row[0]) for row in rows[1:]) == list(range(1, 101))
+
+        with pytest.raises(DatabaseError):
+            database.export_table(DBTestDate, path, parallel=2)
+        with pytest.raises(ValueError):
+            database.export_table(DBTestValue, path, file_format="xml")
+
+    def test_export_parquet(self, database, tmp_path):
+        parquet = pytest.importorskip("pyarrow.parquet")
+        path = join(tmp_path, "test.parquet")
+        assert (
+            database.export_table(
+                DBTestValue, path, file_format="parquet", parallel=4, batch_size=7
+            )
+            == 100
+        )
+        table = parquet.read_table(path).sort_by("id")
+        assert table.num_rows == 100
+        assert table.column("name")[99].as_py() == "name100"
+        assert table.column("updated")[0].as_py() == self.start + timedelta(hours=1)
+
+    def test_shared_snapshot(self, database):
+        engine = MockEngine()
+        key_column = DBTestValue.__table__.c.id
+        with shared_snapshot(engine, key_column, 2) as (ranges, snapshot):
+            assert ranges == [(1, 6), (6, 11)]
+            assert snapshot == "00000003-0000001B-1"
+            connection = engine.connection
+            assert connection.options == {"isolation_level": "REPEATABLE READ"}
+            # The key ranges are computed in the exported snapshot
+            assert connection.statements[0] == "SELECT pg_export_snapshot()"
+            assert connection.statements[1].startswith("SELECT min(")
+            assert connection.closed is False
+        assert connection.closed is True
+        with shared_snapshot(engine, None, 2) as (ranges, snapshot):
+            assert ranges == [None]
+            assert snapshot is None
+        # Other dialects have no snapshot to share
+        engine = database.get_engine()
+        with shared_snapshot(engine, key_column, 2) as (ranges, snapshot):
+            assert ranges == [(1, 51), (51, 101)]
+            assert snapshot is None
@@ -0,0 +1,147 @@
+"""Loader Tests"""
+
+import gzip
+import json
+import lzma
+from datetime import date, datetime, timezone
+from os.path import join
+
+import pytest
+from sqlalchemy import (
+    Boolean,
+    Column,
+    Float,
+    Integer,
+    MetaData,
+    String,
+    Table,
+    func,
+    select,
+)
+from sqlalchemy.dialects import postgresql, sqlite
+
+from .dbtestvalue import DBTestValue
+from hdx.database import Database
+from hdx.database.loaders import (
+    get_column_mapping,
+    get_file_format,
+    get_parser,
+    load_file,
+    use_raw_copy,
+)
+
+
+class TestLoaders:
+    def test_get_file_format(self):
+        assert get_file_format("data.csv") == "csv"
+        assert get_file_format("data.csv.gz") == "csv"
+        assert get_file_format("data.ndjson.xz") == "jsonl"
+        with pytest.raises(ValueError):
+            get_file_format("data.txt")
+
+    def test_get_column_mapping(self):
+        table = DBTestValue.__table__
+        mapping = get_column_mapping(
+            table,
+            ["ID", "Name", "Value ", "Last Updated", "extra"],
+            {"Last Updated": "updated"},
+        )
+        assert mapping == ["id", "name", "value", "updated", None]
+        assert get_column_mapping(table, ["UpdatedValue"]) == [None]
+
+    def test_use_raw_copy(self):
+        psycopg = postgresql.psycopg.dialect()
+        table = Table(
+            "plain",
+            MetaData(),
+            Column("id", Integer, primary_key=True),
+            Column("name", String),
+            Column("value", Float),
+        )
+        mapping = ["id", "name", "value"]
+        assert use_raw_copy(psycopg, table, mapping, "csv") is True
+        assert use_raw_copy(psycopg, table, mapping, "jsonl") is False
+        assert use_raw_copy(psycopg, table, ["id", None], "csv") is False
+        assert (
+            use_raw_copy(postgresql.psycopg2.dialect(), table, mapping, "csv") is False
+        )
+        assert use_raw_copy(sqlite.dialect(), table, mapping, "csv") is False
+        # updated is a TypeDecorator converting datetimes before binding
+        table = DBTestValue.__table__
+        mapping = ["id", "name", "value", "updated"]
+        assert use_raw_copy(psycopg, table, mapping, "csv") is False
+        assert use_raw_copy(psycopg, table, mapping[:3], "csv") is True
+        # Boolean has a bind processor
+        table = Table("flags", MetaData(), Column("flag", Boolean))
+        assert use_raw_copy(psycopg, table, ["flag"], "csv") is False
+
+    def test_get_parser(self):
+        assert get_parser(int)("12") == 12
+        assert get_parser(int)("") is None
+        assert get_parser(int)(12) == 12
+        assert get_parser(bool)("Yes") is True
+        assert get_parser(bool)("no") is False
+        assert get_parser(date)("2024-02-01") == date(2024, 2, 1)
+        assert get_parser(datetime)("2024-02-01T10:00:00Z") == datetime(
+            2024, 2, 1, 10, tzinfo=timezone.utc
+        )
+        assert get_parser(str)("") is None
+        assert get_parser(None)("a") == "a"
+
+    def test_load_file(self, tmp_path):
+        csv_path = join(tmp_path, "values.csv.gz")
+        with gzip.open(csv_path, "wt", encoding="utf-8", newline="") as f:
+            f.write("ID,Name,Value,Updated,Ignored\n")
+            for i in range(25):
+                f.write(f"{i},name{i},{i / 2},2024-01-01T00:00:00Z,x\n")
+        jsonl_path = join(tmp_path, "values.jsonl.xz")
+        with lzma.open(jsonl_path, "wt", encoding="utf-8") as f:
+            for i in range(25, 30):
+                record = {
+                    "id": i,
+                    "name": f"name{i}",
+                    "value": i / 2,
+                    "updated": "2024-01-02T12:00:00+01:00",
+                }
+                f.write(f"{json.dumps(record)}\n\n")
+        dbpath = join(tmp_path, "test_loaders.db")
+        with Database(database=dbpath, port=None, dialect="sqlite") as database:
+            assert database.load_file(csv_path, DBTestValue, batch_size=10) == 25
+            assert database.load_file(jsonl_path, DBTestValue) == 5
+            session = database.get_session()
+            assert session.execute(select(func.count(DBTestValue.id))).scalar() == 30
+            row = session.execute(
+                select(DBTestValue).where(DBTestValue.id == 29)
+            ).scalar_one()
+            assert row.value == 14.5
+            assert row.updated == datetime(2024, 1, 2, 11, tzinfo=timezone.utc)
+            with pytest.raises(ValueError):
+                database.load_file(csv_path, DBTestValue, file_format="xml")
+
+    def test_load_file_uneven(self, tmp_path):
+        csv_path = join(tmp_path, "short.csv")
+        with open(csv_path, "w", encoding="utf-8") as f:
+            f.write("id,name,value\n1,a,1.5\n\n2,b\n")
+        jsonl_path = join(tmp_path, "uneven.jsonl")
+        with open(jsonl_path, "w", encoding="utf-8") as f:
+            f.write('{"id": 1, "name": "a"}\n')
+            f.write('{"id": 2, "Value": "2.5", "extra": true}\n')
+        table = Table(
+            "plain",
+            MetaData(),
+            Column("id", Integer, primary_key=True),
+            Column("name", String),
+            Column("value", Float),
+        )
+        dbpath = join(tmp_path, "test_loaders.db")
+        with Database(database=dbpath, port=None, dialect="sqlite") as database:
+            engine = database.get_engine()
+            table.create(engine)
+            with engine.begin() as connection:
+                with pytest.raises(ValueError, match="Line 4 has 2 values"):
+                    load_file(connection, table, csv_path)
+            with engine.begin() as connection:
+                # Keys first seen after the first record are still loaded
+                assert load_file(connection, table, jsonl_path) == 2
+                rows = connection.execute(select(table).order_by(table.c.id)).all()
+                assert rows == [(1, "a", None), (2, None, 2.5)]
@@ -0,0 +1,52 @@
+"""Maintenance Tests"""
+
+from os.path import join
+
+from sqlalchemy import text
+
+from .dbtestdate import DBTestDate
+from .dbtestvalue import DBTestValue, make_rows
+from hdx.database import Database
+from hdx.database.maintenance import MaintenanceScheduler
+
+
+class TestMaintenance:
+    def test_maintenance_scheduler(self, tmp_path):
+        dbpath = join(tmp_path, "test_scheduler.db")
+        with Database(database=dbpath, port=None, dialect="sqlite") as database:
+            engine = database.get_engine()
+            scheduler = MaintenanceScheduler(engine, 10)
+            assert scheduler.record("db_test_value", 6) is None
+            assert scheduler.record("db_test_date", 6) is None
+            assert scheduler.record("db_test_value", 6) == ["db_test_value"]
+            assert scheduler.row_counts == {"db_test_date": 6}
+            assert scheduler.timings[0]["tables"] == ["db_test_value"]
+            scheduler.run(["missing"])
+            assert len(scheduler.timings) == 1
+            with engine.connect() as connection:
+                statement = text(
+                    "SELECT name FROM sqlite_master WHERE name = 'sqlite_stat1'"
+                )
+                assert connection.execute(statement).scalar() == "sqlite_stat1"
+
+    def test_post_load_maintenance(self, tmp_path):
+        dbpath = join(tmp_path, "test_maintenance.db")
+        with Database(
+            database=dbpath,
+            port=None,
+            dialect="sqlite",
+            maintenance_threshold=10,
+            maintenance_vacuum=True,
+            maintenance_background=True,
+        ) as database:
+            database.batch_populate(make_rows(0, 6), DBTestValue)
+            assert database.get_maintenance_timings() == []
+            database.batch_populate(make_rows(6, 12), DBTestValue)
+            timings = database.get_maintenance_timings()
+            assert timings[0]["tables"] == ["db_test_value"]
+            assert timings[0]["seconds"] > 0
+            seconds = database.run_maintenance([DBTestValue, DBTestDate])
+            assert seconds > 0
+
+        with Database(database=dbpath, port=None, dialect="sqlite") as database:
+            assert database.get_maintenance_timings() == []
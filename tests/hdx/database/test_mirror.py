@@ -0,0 +1,69 @@
+"""Mirror Tests"""
+
+import time
+from datetime import timedelta
+from os.path import join
+
+from sqlalchemy import select, update
+
+from .dbtestdate import DBTestDate
+from .dbtestvalue import NOW, DBTestValue, make_rows
+from hdx.database import Database
+from hdx.database.mirror import get_table_hash
+
+
+class TestMirror:
+    def test_mirror(self, tmp_path):
+        dbpath = join(tmp_path, "test_source.db")
+        mirrorpath = join(tmp_path, "test_mirror.db")
+        with Database(database=dbpath, port=None, dialect="sqlite") as database:
+            rows = make_rows(0, 5, updated=lambda i: NOW - timedelta(days=5 - i))
+            database.batch_populate(rows, DBTestValue)
+            database.batch_populate([{"test_date": NOW}], DBTestDate)
+            engine = database.get_engine()
+            table_hash = get_table_hash(engine, DBTestValue.__table__)
+            assert table_hash == get_table_hash(engine, DBTestValue.__table__)
+            mirror = database.create_mirror(
+                mirrorpath,
+                [DBTestValue, DBTestDate],
+                timestamp_columns={"db_test_value": "updated"},
+            )
+            assert mirror.timings[0]["rows"] == {"db_test_value": 5, "db_test_date": 1}
+            with mirror.get_session() as session:
+                rows = session.scalars(select(DBTestValue)).all()
+                assert [row.id for row in rows] == [0, 1, 2, 3, 4]
+                assert rows[4].updated == NOW - timedelta(days=1)
+                assert session.scalar(select(DBTestDate.test_date)) == NOW
+
+            # Unchanged tables are skipped and only rows changed since the
+            # latest timestamp in the mirror are copied
+            later = NOW + timedelta(days=1)
+            session = database.get_session()
+            session.execute(
+                update(DBTestValue)
+                .where(DBTestValue.id == 2)
+                .values(value=2.0, updated=later)
+            )
+            session.commit()
+            database.batch_populate(make_rows(5, 7, updated=later), DBTestValue)
+            assert mirror.refresh() == {"db_test_value": 4, "db_test_date": 0}
+            session.execute(update(DBTestDate).values(test_date=later))
+            session.commit()
+            assert mirror.refresh(["db_test_date"]) == {"db_test_date": 1}
+            with mirror.get_session() as mirror_session:
+                assert mirror_session.get(DBTestValue, 2).value == 2.0
+                assert len(mirror_session.scalars(select(DBTestValue)).all()) == 7
+                assert mirror_session.scalar(select(DBTestDate.test_date)) == later
+
+            # Refresh in the background
+            mirror.refresh_interval = 0.05
+            mirror.start()
+            database.batch_populate(make_rows(7, 8, updated=later), DBTestValue)
+            for _ in range(100):
+                with mirror.get_session() as mirror_session:
+                    if mirror_session.get(DBTestValue, 7):
+                        break
+                time.sleep(0.05)
+            else:
+                raise AssertionError("Mirror not refreshed in background!")
+            mirror.stop()
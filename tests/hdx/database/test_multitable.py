@@ -0,0 +1,130 @@
+"""Multi-table Load Tests"""
+
+from os.path import join
+
+import pytest
+from sqlalchemy import create_engine, func, select
+from sqlalchemy.exc import IntegrityError
+
+from .dbtestrelated import DBTestLocation, DBTestReading, DBTestRegion, DBTestSource
+from hdx.database import Database
+from hdx.database.multitable import can_load_concurrently, get_load_levels
+from hdx.database.no_timezone import Base
+
+
+class TestMultiTable:
+    def tables(self, reading_ids):
+        regions = ({"id": i, "name": f"region{i}"} for i in range(3))
+        locations = [
+            {"id": i, "region_id": i % 3, "parent_id": None if i == 0 else 0}
+            for i in range(10)
+        ]
+        sources = {"id": [1, 2]}
+        readings = [
+            {"id": i, "location_id": i % 10, "source_id": 1 + i % 2, "value": 1.5}
+            for i in reading_ids
+        ]
+        # Deliberately out of dependency order
+        return {
+            DBTestReading: readings,
+            DBTestLocation: locations,
+            DBTestSource: sources,
+            DBTestRegion: regions,
+        }
+
+    def count(self, session, table):
+        return session.scalar(select(func.count()).select_from(table))
+
+    def test_get_load_levels(self):
+        tables = [
+            DBTestReading.__table__,
+            DBTestLocation.__table__,
+            DBTestSource.__table__,
+            DBTestRegion.__table__,
+        ]
+        levels = get_load_levels(tables)
+        assert len(levels) == 3
+        assert set(levels[0]) == {DBTestRegion.__table__, DBTestSource.__table__}
+        assert levels[1] == [DBTestLocation.__table__]
+        assert levels[2] == [DBTestReading.__table__]
+        assert get_load_levels([DBTestReading.__table__]) == [[DBTestReading.__table__]]
+        assert get_load_levels([]) == []
+
+    def test_populate_tables(self, tmp_path):
+        dbpath = join(tmp_path, "test_multitable.db")
+        with Database(
+            database=dbpath,
+            port=None,
+            dialect="sqlite",
+            sqlite_profile={"foreign_keys": "ON"},
+        ) as database:
+            counts = database.populate_tables(self.tables(range(25)), batch_size=7)
+            assert counts == {
+                "db_test_region": 3,
+                "db_test_source": 2,
+                "db_test_location": 10,
+                "db_test_reading": 25,
+            }
+            session = database.get_session()
+            assert self.count(session, DBTestReading) == 25
+
+            # Duplicate reading ids fail the whole load when atomic
+            database.drop_all()
+            Base.metadata.create_all(database.get_engine())
+            with pytest.raises(IntegrityError):
+                database.populate_tables(self.tables([1, 2, 2]))
+            assert self.count(session, DBTestRegion) == 0
+            assert self.count(session, DBTestReading) == 0
+
+            # Errors raised by generators also roll back the whole load
+            def readings():
+                yield {"id": 1, "location_id": 1, "source_id": 1, "value": 1.5}
+                raise ValueError("Bad reading!")
+
+            tables = self.tables([])
+            tables[DBTestReading] = readings()
+            with pytest.raises(ValueError):
+                database.populate_tables(tables)
+            session.commit()
+            assert self.count(session, DBTestRegion) == 0
+            assert self.count(session, DBTestReading) == 0
+
+            # but earlier tables are kept when committing per table
+            with pytest.raises(IntegrityError):
+                database.populate_tables(
+                    self.tables([1, 2, 2]), atomic=False, parallel=2
+                )
+            assert self.count(session, DBTestRegion) == 3
+            assert self.count(session, DBTestLocation) == 10
+            assert self.count(session, DBTestReading) == 0
+
+    def test_populate_tables_parallel(self, tmp_path, monkeypatch):
+        assert can_load_concurrently(create_engine("sqlite://")) is False
+        # Load tables concurrently in SQLite whose busy timeout serialises the
+        # writers
+        monkeypatch.setattr(
+            "hdx.database.database.can_load_concurrently", lambda engine: True
+        )
+        dbpath = join(tmp_path, "test_multitable.db")
+        with Database(
+            database=dbpath,
+            port=None,
+            dialect="sqlite",
+            sqlite_profile={"foreign_keys": "ON"},
+        ) as database:
+            counts = database.populate_tables(
+                self.tables(range(25)), batch_size=7, atomic=False, parallel=2
+            )
+            assert counts["db_test_reading"] == 25
+            session = database.get_session()
+            assert self.count(session, DBTestSource) == 2
+            assert self.count(session, DBTestReading) == 25
+
+            database.drop_all()
+            Base.metadata.create_all(database.get_engine())
+            with pytest.raises(IntegrityError):
+                database.populate_tables(
+                    self.tables([1, 2, 2]), atomic=False, parallel=2
+                )
+            assert self.count(session, DBTestRegion) == 3
+            assert self.count(session, DBTestReading) == 0
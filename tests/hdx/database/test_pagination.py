@@ -0,0 +1,77 @@
+"""Pagination Tests"""
+
+from datetime import timedelta
+from decimal import Decimal
+from os.path import join
+
+import pytest
+from sqlalchemy import select
+
+from .dbtestdate import DBTestDate
+from .dbtestvalue import NOW, DBTestValue, make_rows
+from hdx.database import Database
+from hdx.database.pagination import decode_token, encode_token
+
+
+class TestPagination:
+    def test_tokens(self):
+        values = [1, "a", NOW, NOW.date(), Decimal("1.5"), None]
+        names = ["a", "b", "c", "d", "e", "f"]
+        token = encode_token(names, values)
+        assert "." not in token
+        assert decode_token(token, names) == values
+        token = encode_token(names, values, secret="secret")
+        assert decode_token(token, names, secret="secret") == values
+        with pytest.raises(ValueError, match="signature"):
+            decode_token(token, names, secret="other")
+        payload, signature = token.split(".")
+        forged = encode_token(names, [2, *values[1:]])
+        with pytest.raises(ValueError, match="signature"):
+            decode_token(f"{forged}.{signature}", names, secret="secret")
+        with pytest.raises(ValueError, match="different ordering"):
+            decode_token(encode_token(["id"], [1]), ["name", "id"])
+        with pytest.raises(ValueError, match="Invalid"):
+            decode_token("!!!", ["id"])
+
+    def test_paginate(self, tmp_path):
+        dbpath = join(tmp_path, "test_pagination.db")
+        with Database(database=dbpath, port=None, dialect="sqlite") as database:
+            rows = make_rows(0, 20, name=lambda i: f"n{i % 3}", value=float)
+            database.batch_populate(rows, DBTestValue)
+            pages = list(database.paginate(DBTestValue, page_size=7))
+            assert [len(page.rows) for page in pages] == [7, 7, 6]
+            assert [row.id for page in pages for row in page.rows] == list(range(20))
+            assert pages[-1].token is None
+
+            # Resume from a token as an API client would
+            page = next(database.paginate(DBTestValue, 7, token=pages[0].token))
+            assert page.rows[0].id == 7
+
+            statement = select(DBTestValue.name, DBTestValue.id).where(
+                DBTestValue.value < 15
+            )
+            order_by = [DBTestValue.name, DBTestValue.id]
+            pages = list(
+                database.paginate(statement, 4, order_by=order_by, secret=b"key")
+            )
+            rows = [tuple(row) for page in pages for row in page.rows]
+            assert rows == sorted((f"n{i % 3}", i) for i in range(15))
+            assert [len(page.rows) for page in pages] == [4, 4, 4, 3]
+            page = next(
+                database.paginate(
+                    statement, 4, order_by=order_by, token=pages[1].token, secret=b"key"
+                )
+            )
+            assert page.rows == pages[2].rows
+            with pytest.raises(ValueError):
+                next(database.paginate(statement, 4, order_by=order_by, token="x"))
+
+            dates = [{"test_date": NOW + timedelta(hours=i)} for i in range(5)]
+            database.batch_populate(dates, DBTestDate)
+            pages = list(database.paginate(DBTestDate, page_size=2))
+            assert [len(page.rows) for page in pages] == [2, 2, 1]
+            assert pages[2].rows[0].test_date == NOW + timedelta(hours=4)
+
+            # Exact multiple of the page size
+            pages = list(database.paginate(DBTestValue, page_size=10))
+            assert [len(page.rows) for page in pages] == [10, 10]
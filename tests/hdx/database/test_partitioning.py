@@ -0,0 +1,161 @@
+"""Partitioning Tests"""
+
+from datetime import date, datetime, timezone
+from os.path import join
+
+import pytest
+from sqlalchemy import MetaData, Table, func, select
+from sqlalchemy.dialects import postgresql
+from sqlalchemy.schema import CreateTable
+
+from .dbtestpartition import DBTestCountry, DBTestSeries
+from .dbtestvalue import DBTestValue
+from hdx.database import Database
+from hdx.database.partitioning import (
+    create_partitions,
+    drop_partitions,
+    get_list_suffix,
+    get_partition_name,
+    get_partition_names,
+    get_range_bounds,
+    partition_by_range,
+)
+
+
+class MockConnection:
+    dialect = postgresql.dialect()
+
+    def __init__(self, existing):
+        self.existing = existing
+        self.statements = []
+        self.parameters = []
+
+    def execute(self, statement, parameters):
+        self.parameters.append(parameters)
+        return [(name,) for name in self.existing]
+
+    def exec_driver_sql(self, statement):
+        self.statements.append(statement)
+
+
+class TestPartitioning:
+    def test_table_args(self):
+        table = DBTestSeries.__table__
+        assert table.info == {
+            "source": "test",
+            "partition": {"strategy": "range", "column": "date", "interval": "month"},
+        }
+        ddl = str(CreateTable(table).compile(dialect=postgresql.dialect()))
+        assert ddl.strip().endswith("PARTITION BY RANGE (date)")
+        with pytest.raises(ValueError):
+            partition_by_range("date", "week")
+
+    def test_get_bounds(self):
+        value = datetime(2024, 12, 31, 23, 0, tzinfo=timezone.utc)
+        assert get_range_bounds(value, "month") == (
+            "p202412",
+            datetime(2024, 12, 1, tzinfo=timezone.utc),
+            datetime(2025, 1, 1, tzinfo=timezone.utc),
+        )
+        assert get_range_bounds(date(2024, 2, 29), "day") == (
+            "p20240229",
+            date(2024, 2, 29),
+            date(2024, 3, 1),
+        )
+        assert get_range_bounds(date(2024, 2, 29), "year") == (
+            "p2024",
+            date(2024, 1, 1),
+            date(2025, 1, 1),
+        )
+        assert get_range_bounds(-5, 100) == ("pm100", -100, 0)
+        assert get_list_suffix("South Sudan") == "south_sudan_7d90829a"
+        # Values differing only in case or punctuation get different suffixes
+        assert get_list_suffix("a-b") == "a_b_bd7fe874"
+        assert get_list_suffix("a_b") == "a_b_734126aa"
+        assert get_list_suffix("A_B") != get_list_suffix("a_b")
+        assert get_list_suffix(1) != get_list_suffix("1")
+
+    def test_get_partition_name(self):
+        assert get_partition_name("series", "p202401") == "series_p202401"
+        # Long names are truncated keeping the range or hash
+        name = get_partition_name("t" * 60, "p202401")
+        assert name == f"{'t' * 55}_p202401"
+        suffix = get_list_suffix("Côte d'Ivoire" * 5)
+        name = get_partition_name("é" * 20, suffix)
+        assert len(name.encode("utf-8")) <= 63
+        assert name.startswith("é" * 20 + "_c")
+        assert name.endswith(suffix[-9:])
+
+    def test_create_drop_partitions(self):
+        table = DBTestSeries.__table__
+        connection = MockConnection(["db_test_series_p202401"])
+        values = [
+            datetime(2024, 1, 5, tzinfo=timezone.utc),
+            datetime(2024, 2, 5, tzinfo=timezone.utc),
+            datetime(2024, 2, 6, tzinfo=timezone.utc),
+        ]
+        assert create_partitions(connection, table, values) == [
+            "db_test_series_p202402"
+        ]
+        assert connection.statements == [
+            "CREATE TABLE IF NOT EXISTS db_test_series_p202402 PARTITION OF db_test_series "
+            "FOR VALUES FROM ('2024-02-01 00:00:00') TO ('2024-03-01 00:00:00')"
+        ]
+        connection = MockConnection(
+            ["db_test_series_p202312", "db_test_series_p202401", "db_test_series_old"]
+        )
+        dropped = drop_partitions(connection, table, before=datetime(2024, 1, 20))
+        assert dropped == ["db_test_series_p202312"]
+        assert connection.statements == ["DROP TABLE db_test_series_p202312"]
+
+        table = DBTestCountry.__table__
+        connection = MockConnection(["db_test_country_afg_d64013ed"])
+        assert create_partitions(connection, table, ["AFG", "SSD", None]) == [
+            "db_test_country_ssd_093c2c3e"
+        ]
+        assert connection.statements == [
+            "CREATE TABLE IF NOT EXISTS db_test_country_ssd_093c2c3e PARTITION OF "
+            "db_test_country FOR VALUES IN ('SSD')"
+        ]
+        assert drop_partitions(connection, table, values=["AFG", "YEM"]) == [
+            "db_test_country_afg_d64013ed"
+        ]
+
+        # The parent is quoted before being cast to regclass
+        connection = MockConnection([])
+        table = Table("Series", MetaData(), schema="My Schema")
+        assert get_partition_names(connection, table) == []
+        assert connection.parameters == [{"parent": '"My Schema"."Series"'}]
+
+    def test_partitioned_sqlite(self, tmp_path):
+        dbpath = join(tmp_path, "test_partitioning.db")
+        with Database(database=dbpath, port=None, dialect="sqlite") as database:
+            rows = [
+                {"id": i, "date": datetime(2024, i, 1, tzinfo=timezone.utc), "value": i}
+                for i in range(1, 7)
+            ]
+            database.batch_populate(rows, DBTestSeries)
+            assert database.create_partitions(DBTestSeries, [rows[0]["date"]]) == []
+            dropped = database.drop_partitions(
+                DBTestSeries, before=datetime(2024, 3, 15, tzinfo=timezone.utc)
+            )
+            assert dropped == ["db_test_series"]
+            session = database.get_session()
+            assert session.execute(select(func.count(DBTestSeries.id))).scalar() == 4
+            database.batch_populate(
+                {"id": [1, 2], "country": ["AFG", "SSD"]}, DBTestCountry
+            )
+            database.drop_partitions(DBTestCountry, values=["AFG"])
+            assert session.execute(select(DBTestCountry.country)).scalar_one() == "SSD"
+            with pytest.raises(ValueError):
+                database.drop_partitions(DBTestValue, before=1)
+            # Only the argument matching the strategy may be given
+            with pytest.raises(ValueError, match="give before"):
+                database.drop_partitions(DBTestSeries, values=[1])
+            with pytest.raises(ValueError, match="give before"):
+                database.drop_partitions(DBTestSeries, before=1, values=[1])
+            with pytest.raises(ValueError, match="give values"):
+                database.drop_partitions(DBTestCountry, before="AFG")
+            with pytest.raises(ValueError, match="give values"):
+                database.drop_partitions(DBTestCountry)
+            assert session.execute(select(DBTestCountry.country)).scalar_one() == "SSD"
@@ -1,10 +1,16 @@
 """PostgreSQL Utility Tests"""
 
+from os import mkdir
+from os.path import join
+
 import pytest
 
 from . import PsycopgConnection
+from hdx.database import postgresql
 from hdx.database.postgresql import (
     PostgresError,
+    dump_to_pgfile,
+    get_file_checksum,
     restore_from_pgfile,
     wait_for_postgresql,
 )
@@ -23,6 +29,134 @@ class TestPostgreSQL:
     def test_restore_from_pgfile(self, db_uri, mock_subprocess, mock_engine):
         pg_restore_file = "test.pg_restore"
         assert restore_from_pgfile(db_uri, pg_restore_file) == "WORKED!"
+        assert restore_from_pgfile(db_uri, "snapshot", jobs=4) == "WORKED!"
+        assert mock_subprocess.args == [
+            "pg_restore",
+            "-c",
+            "-d",
+            "mydatabase",
+            "-h",
+            "myserver",
+            "-p",
+            "1234",
+            "-U",
+            "myuser",
+            "-j4",
+            "snapshot",
+        ]
+        # A compressed file is restored from a stream so cannot use jobs
+        with pytest.raises(ValueError):
+            restore_from_pgfile(db_uri, "test.pg_restore.xz", jobs=4)
+
+    def test_get_file_checksum(self, tmp_path):
+        path = join(tmp_path, "test.pg_restore")
+        with open(path, "wb") as f:
+            f.write(b"snapshot")
+        checksum = get_file_checksum(path, chunk_size=3)
+        assert (
+            checksum
+            == "16a0eeb0791b6c92451fd284dd9f599e0a7dbe7f6ebea6e2d2d06c7f74aec112"
+        )
+        directory = join(tmp_path, "snapshot")
+        mkdir(directory)
+        with open(join(directory, "toc.dat"), "wb") as f:
+            f.write(b"snapshot")
+        assert get_file_checksum(directory) != checksum
+
+    def test_restore_from_pgfile_checksum(
+        self, db_uri, tmp_path, mock_subprocess, monkeypatch
+    ):
+        path = join(tmp_path, "test.pg_restore")
+        with open(path, "wb") as f:
+            f.write(b"snapshot")
+        recorded = []
+
+        def record_restore_checksum(_, pg_restore_file, checksum, seconds):
+            recorded.append(checksum)
+
+        monkeypatch.setattr(
+            postgresql,
+            "get_restore_checksum",
+            lambda _: recorded[-1] if recorded else None,
+        )
+        monkeypatch.setattr(
+            postgresql, "record_restore_checksum", record_restore_checksum
+        )
+        assert restore_from_pgfile(db_uri, path, record_checksum=True) == "WORKED!"
+        assert recorded == [get_file_checksum(path)]
+        assert restore_from_pgfile(db_uri, path, record_checksum=True) == ""
+        assert len(recorded) == 1
+        output = restore_from_pgfile(db_uri, path, record_checksum=True, force=True)
+        assert output == "WORKED!"
+        assert len(recorded) == 2
+
+    def test_dump_to_pgfile(self, db_uri, mock_subprocess):
+        assert dump_to_pgfile(db_uri, "test.pg_restore") == "WORKED!"
+        assert mock_subprocess.args[:2] == ["pg_dump", "-Fc"]
+        assert mock_subprocess.args[-2:] == ["-f", "test.pg_restore"]
+        dump_to_pgfile(
+            db_uri,
+            "snapshot",
+            file_format="directory",
+            jobs=4,
+            tables=["public.table1"],
+            exclude_schemas=["audit"],
+            compress=5,
+        )
+        assert mock_subprocess.args[:2] == ["pg_dump", "-Fd"]
+        assert mock_subprocess.args[10:] == [
+            "-j4",
+            "-Z5",
+            "-t",
+            "public.table1",
+            "-N",
+            "audit",
+            "-f",
+            "snapshot",
+        ]
+        with pytest.raises(PostgresError):
+            dump_to_pgfile(db_uri, "test.pg_restore", file_format="xml")
+        with pytest.raises(PostgresError):
+            dump_to_pgfile(db_uri, "test.pg_restore", jobs=4)
+        with pytest.raises(PostgresError):
+            dump_to_pgfile(db_uri, "snapshot.xz", file_format="directory")
+
+    def test_dump_to_pgfile_xz(self, db_uri, tmp_path, mock_subprocess, monkeypatch):
+        class Stdin:
+            closed = False
+
+            def close(self):
+                self.closed = True
+
+        class Popen:
+            returncode = 0
+            instances = []
+
+            def __init__(self, args, stdin=None, stdout=None):
+                self.args = args
+                self.stdin = Stdin()
+                self.stdout = stdout
+                Popen.instances.append(self)
+
+            def wait(self):
+                return self.returncode
+
+        monkeypatch.setattr(postgresql.subprocess, "Popen", Popen)
+        path = join(tmp_path, "snapshot.pg_restore.xz")
+        assert dump_to_pgfile(db_uri, path) == "WORKED!"
+        compress_process = Popen.instances[0]
+        assert compress_process.args == ("xz", "-c")
+        assert compress_process.stdout.name == path
+        # pg_dump writes to stdout which is piped into xz
+        assert mock_subprocess.args[:2] == ["pg_dump", "-Fc"]
+        assert "-f" not in mock_subprocess.args
+        assert mock_subprocess.kwargs["stdout"] is compress_process.stdin
+        assert compress_process.stdin.closed is True
+
+        Popen.returncode = 1
+        with pytest.raises(PostgresError, match="xz failed"):
+            dump_to_pgfile(db_uri, path)
+        assert Popen.instances[1].stdin.closed is True
 
     def test_restore_from_pgfile_raises(self, db_uri):
         pg_restore_file = "NOT_EXIST.pg_restore"
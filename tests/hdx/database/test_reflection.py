@@ -0,0 +1,56 @@
+"""Multi-schema Reflection Tests"""
+
+import sqlite3
+from os.path import join
+from shutil import copyfile
+
+from sqlalchemy import create_engine, event, select
+from sqlalchemy.pool import NullPool
+
+from hdx.database import Database
+from hdx.database.reflection import reflect_schema, reflect_schemas
+
+
+class TestReflection:
+    def create_engine(self, tmp_path):
+        dbpath = join(tmp_path, "test_main.db")
+        copyfile(join("tests", "fixtures", "test.db"), dbpath)
+        otherpath = join(tmp_path, "test_other.db")
+        connection = sqlite3.connect(otherpath)
+        connection.executescript(
+            "CREATE TABLE table1 (id INTEGER PRIMARY KEY, name TEXT);"
+            "CREATE TABLE child (id INTEGER PRIMARY KEY, "
+            "parent_id INTEGER REFERENCES table1(id));"
+            "INSERT INTO table1 VALUES (5, 'other');"
+            "INSERT INTO child VALUES (1, 5);"
+        )
+        connection.close()
+        engine = create_engine(f"sqlite:///{dbpath}", poolclass=NullPool)
+
+        @event.listens_for(engine, "connect")
+        def attach(dbapi_connection, _):
+            dbapi_connection.execute(f"ATTACH DATABASE '{otherpath}' AS other")
+
+        return engine
+
+    def test_reflect_schema(self, tmp_path):
+        engine = self.create_engine(tmp_path)
+        metadata = reflect_schema(engine, "other")
+        assert sorted(metadata.tables) == ["other.child", "other.table1"]
+        Base = reflect_schemas(engine, ["other"], parallel=1)
+        assert Base.by_module.other.child.__table__.schema == "other"
+        engine.dispose()
+
+    def test_reflect_schemas(self, tmp_path):
+        engine = self.create_engine(tmp_path)
+        with Database(engine=engine, reflect_schemas=["main", "other"]) as database:
+            classes = database.get_reflected_classes()
+            session = database.get_session()
+            row = session.execute(select(classes.main.table1)).scalar_one()
+            assert row.col1 == "wfrefds"
+            row = session.execute(select(classes.other.table1)).scalar_one()
+            assert row.name == "other"
+            child = session.execute(select(classes.other.child)).scalar_one()
+            assert child.parent_id == 5
+            # Relationships are generated from foreign keys within a schema
+            assert child.table1.name == "other"
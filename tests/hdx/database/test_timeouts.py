@@ -0,0 +1,107 @@
+"""Timeouts Tests"""
+
+import threading
+import time
+from os.path import join
+
+import pytest
+from sqlalchemy import text
+from sqlalchemy.exc import OperationalError
+
+from hdx.database import Database
+
+# Takes many seconds to run in SQLite
+SLOW_QUERY = text(
+    "WITH RECURSIVE c(x) AS (SELECT 1 UNION ALL SELECT x + 1 FROM c "
+    "WHERE x < 1000000000) SELECT count(*) FROM c"
+)
+
+
+class TestTimeouts:
+    def test_statement_timeout(self, tmp_path):
+        dbpath = join(tmp_path, "test_timeout.db")
+        with Database(
+            database=dbpath,
+            port=None,
+            dialect="sqlite",
+            statement_timeout=0.1,
+            lock_timeout=2,
+        ) as database:
+            session = database.get_session()
+            assert session.execute(text("PRAGMA busy_timeout")).scalar() == 2000
+            start = time.perf_counter()
+            with pytest.raises(OperationalError, match="interrupted"):
+                session.execute(SLOW_QUERY)
+            assert time.perf_counter() - start < 5
+            session.rollback()
+            assert session.execute(text("SELECT 1")).scalar() == 1
+
+    def test_timeout(self, tmp_path):
+        dbpath = join(tmp_path, "test_timeout.db")
+        with Database(database=dbpath, port=None, dialect="sqlite") as database:
+            session = database.get_session()
+            with database.timeout(0.1, lock_timeout=1) as timeout_session:
+                assert timeout_session is session
+                assert session.execute(text("PRAGMA busy_timeout")).scalar() == 1000
+                with pytest.raises(OperationalError, match="interrupted"):
+                    session.execute(SLOW_QUERY)
+            session.rollback()
+            assert session.execute(text("PRAGMA busy_timeout")).scalar() == 5000
+            statement = text("SELECT count(*) FROM (SELECT 1 UNION SELECT 2)")
+            assert session.execute(statement).scalar() == 2
+
+            # The override continues in transactions begun after a commit
+            with database.timeout(1.0, lock_timeout=3) as session:
+                session.execute(text("SELECT 1"))
+                session.commit()
+                assert session.execute(text("PRAGMA busy_timeout")).scalar() == 3000
+                session.commit()
+                with database.timeout(0.1):
+                    with pytest.raises(OperationalError, match="interrupted"):
+                        session.execute(SLOW_QUERY)
+                    session.rollback()
+                assert session.execute(text("PRAGMA busy_timeout")).scalar() == 3000
+            assert session.execute(text("PRAGMA busy_timeout")).scalar() == 5000
+            session.commit()
+            assert session.execute(text("PRAGMA busy_timeout")).scalar() == 5000
+
+    def test_cancel(self, tmp_path):
+        dbpath = join(tmp_path, "test_cancel.db")
+        with Database(database=dbpath, port=None, dialect="sqlite") as database:
+            assert database.cancel() == 0
+            session = database.get_session()
+            session.execute(text("SELECT 1"))
+            cancelled = []
+            timer = threading.Timer(0.2, lambda: cancelled.append(database.cancel()))
+            timer.start()
+            start = time.perf_counter()
+            with pytest.raises(OperationalError, match="interrupted"):
+                session.execute(SLOW_QUERY)
+            assert time.perf_counter() - start < 5
+            timer.join()
+            assert cancelled == [1]
+            session.rollback()
+
+            # Statements on other connections are not cancelled
+            statement = text(
+                "WITH RECURSIVE c(x) AS (SELECT 1 UNION ALL SELECT x + 1 FROM c "
+                "WHERE x < 3000000) SELECT count(*) FROM c"
+            )
+            results = []
+
+            def run_other():
+                with database.get_engine().connect() as connection:
+                    results.append(connection.execute(statement).scalar())
+
+            thread = threading.Thread(target=run_other)
+            thread.start()
+            timer = threading.Timer(0.2, lambda: cancelled.append(database.cancel()))
+            timer.start()
+            with pytest.raises(OperationalError, match="interrupted"):
+                session.execute(SLOW_QUERY)
+            timer.join()
+            thread.join()
+            assert cancelled == [1, 1]
+            assert results == [3000000]
+            session.rollback()
+            assert database.cancel() == 0
@@ -0,0 +1,66 @@
+"""Warmup Tests"""
+
+from os.path import join
+
+import pytest
+from sqlalchemy import create_engine, select
+from sqlalchemy.pool import QueuePool
+
+from .dbtestvalue import DBTestValue
+from hdx.database import Database
+from hdx.database.warmup import (
+    get_pool_capacity,
+    get_pool_size,
+    prewarm_relations,
+    warm_connections,
+)
+
+
+class TestWarmup:
+    def test_warm_connections(self, tmp_path):
+        dbpath = join(tmp_path, "test_warm.db")
+        with Database(database=dbpath, port=None, dialect="sqlite") as database:
+            engine = database.get_engine()
+            assert get_pool_size(engine) == 1
+            timings = warm_connections(engine, 2, ["SELECT 1"])
+            assert set(timings) == {"connect", "queries"}
+            assert get_pool_capacity(engine) is None
+            assert prewarm_relations(engine, ["db_test_value"]) is None
+
+    def test_pool_capacity(self, tmp_path):
+        dbpath = join(tmp_path, "test_capacity.db")
+        engine = create_engine(
+            f"sqlite:///{dbpath}", poolclass=QueuePool, pool_size=2, max_overflow=1
+        )
+        assert get_pool_capacity(engine) == 3
+        assert set(warm_connections(engine, 3)) == {"connect"}
+        # More connections than the pool can hold would block
+        with pytest.raises(ValueError):
+            warm_connections(engine, 4)
+        engine.dispose()
+        engine = create_engine(
+            f"sqlite:///{dbpath}", poolclass=QueuePool, pool_size=2, max_overflow=-1
+        )
+        assert get_pool_capacity(engine) is None
+        engine.dispose()
+
+    def test_warmup(self, tmp_path):
+        dbpath = join(tmp_path, "test_warmup.db")
+        with Database(database=dbpath, port=None, dialect="sqlite") as database:
+            assert database.get_warmup_timings() is None
+
+        warmup = {
+            "queries": ["SELECT count(*) FROM db_test_value", select(DBTestValue)],
+            "prewarm": ["db_test_value"],
+        }
+        with Database(
+            database=dbpath, port=None, dialect="sqlite", pool_size=3, warmup=warmup
+        ) as database:
+            engine = database.get_engine()
+            assert get_pool_size(engine) == 3
+            assert engine.pool.checkedin() == 3
+            timings = database.get_warmup_timings()
+            assert set(timings) == {"connect", "queries", "prewarm", "total"}
+            assert timings["total"] >= timings["connect"]
+            timings = database.warmup(connections=1)
+            assert set(timings) == {"connect", "total"}